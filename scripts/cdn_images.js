@@ -1,6 +1,12 @@
 /**
  * Hexo filter: replace relative image paths with CDN absolute paths.
  * In local dev mode, serves images from source/_posts/images/ via middleware.
+ *
+ * Images listed in source/_data/images.json (written by `python -m tools.diagrams build`)
+ * get width/height attributes and an inlined low-quality placeholder background in both
+ * modes, and in deploy mode are rewritten to their content-hashed, immutably cached file names.
+ * Images with dark theme variants are wrapped in a <picture> whose <source> is selected by
+ * prefers-color-scheme.
  */
 
 'use strict';
@@ -9,12 +15,74 @@ const path = require('path');
 const fs = require('fs');
 
 const CDN_BASE_URL = process.env.CDN_BASE_URL;
+const IMAGE_MANIFEST_PATH = path.join(hexo.source_dir, '_data', 'images.json');
+
+let imageManifest = {};
+let imageManifestMtime = 0;
+
+/** Load the image manifest, re-reading it only when the file changes. */
+function loadImageManifest() {
+  if (!fs.existsSync(IMAGE_MANIFEST_PATH)) return {};
+
+  const mtime = fs.statSync(IMAGE_MANIFEST_PATH).mtimeMs;
+  if (mtime !== imageManifestMtime) {
+    imageManifest = JSON.parse(fs.readFileSync(IMAGE_MANIFEST_PATH, 'utf8'));
+    imageManifestMtime = mtime;
+  }
+  return imageManifest;
+}
+
+/** Build the srcset of a manifest image's dark variants, hashed on the CDN or local. */
+function darkSrcset(name, entry, baseUrl) {
+  const stem = name.replace(/\.[^./]+$/, '');
+  return Object.entries(entry.dark.srcset)
+    .map(([density, key]) => {
+      const url = baseUrl ? `${baseUrl}/images/${entry.variants[key].file}` : `/images/${stem}${key}`;
+      return `${url} ${density}`;
+    })
+    .join(', ');
+}
+
+/**
+ * Add width/height and a placeholder background to <img> tags found in the image
+ * manifest and, when baseUrl is given, point their src at the content-hashed file on the CDN.
+ * Images with a dark variant are wrapped in <picture> with a prefers-color-scheme <source>.
+ */
+function rewriteManifestImages(str, baseUrl) {
+  const manifest = loadImageManifest();
+
+  return str.replace(/<img\s[^>]*>/g, (tag) => {
+    const match = tag.match(/(\ssrc=(["']))(?:\/\.\/|\.\/|\/)?images\/([^"']+)\2/);
+    const entry = match && manifest[match[3]];
+    if (!entry) return tag;
+
+    if (baseUrl) {
+      tag = tag.replace(match[0], `${match[1]}${baseUrl}/images/${entry.file}${match[2]}`);
+    }
+    if (!/\swidth=/.test(tag) && !/\sheight=/.test(tag)) {
+      tag = tag.replace(/^<img/, `<img width="${entry.width}" height="${entry.height}"`);
+    }
+    if (entry.placeholder && !/\sstyle=/.test(tag)) {
+      const { color, lqip } = entry.placeholder;
+      tag = tag.replace(/^<img/, `<img style="background:${color} url(${lqip}) center/cover no-repeat"`);
+    }
+    if (entry.dark) {
+      const { media, type } = entry.dark;
+      const srcset = darkSrcset(match[3], entry, baseUrl);
+      tag = `<picture><source media="${media}" type="${type}" srcset="${srcset}">${tag}</picture>`;
+    }
+    return tag;
+  });
+}
 
 if (CDN_BASE_URL) {
   const baseUrl = CDN_BASE_URL.replace(/\/+$/, '');
 
   // Deploy mode: rewrite img src to CDN URLs
   hexo.extend.filter.register('after_render:html', (str) => {
+    // Rewrite manifest images to their hashed names first
+    str = rewriteManifestImages(str, baseUrl);
+
     // Replace <img> src attributes
     str = str.replace(
       /(<img\s[^>]*src=["'])(?:\/\.\/|\.\/|\/)?images\//g,
@@ -38,6 +106,9 @@ if (CDN_BASE_URL) {
 
   hexo.log.info(`[CDN Images] Enabled, base URL: ${baseUrl}`);
 } else {
+  // Local dev mode: keep local paths but add dimensions from the manifest
+  hexo.extend.filter.register('after_render:html', (str) => rewriteManifestImages(str));
+
   // Local dev mode: serve /images/ from source/_posts/images/
   hexo.extend.filter.register('server_middleware', (app) => {
     app.use('/images/', (req, res, next) => {
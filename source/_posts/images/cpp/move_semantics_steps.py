@@ -0,0 +1,110 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+from tools.diagrams.animate import Animation
+from tools.diagrams.primitives import LinkStyle, PointerCollection, ShapeStyle, Sketch
+
+# 中文字体由构建工具统一配置（tools/diagrams/fonts.py）
+
+# 输出文件名（相对于脚本所在目录）；动画输出 APNG，另有同名 .webp 与 .gif
+OUTPUT = 'move_semantics_steps.png'
+
+# 颜色与样式与 move_semantics.py 一致
+color_obj = '#FFE0B2'        # 对象框 - 浅橙
+color_heap = '#C8E6C9'       # 堆内存 - 浅绿
+color_ptr = '#FF5722'        # 指针箭头 - 橙红
+color_null = '#BDBDBD'       # 空指针 - 灰色
+
+BOX = 'round,pad=0.02,rounding_size=0.1'
+OBJECT = ShapeStyle(facecolor=color_obj, edgecolor='#FF9800', linewidth=2, boxstyle=BOX)
+UNINIT_OBJECT = ShapeStyle(facecolor='#E0E0E0', edgecolor='#9E9E9E', linewidth=2, linestyle='--',
+                           boxstyle=BOX)
+MOVED_OBJECT = ShapeStyle(facecolor='#EEEEEE', edgecolor=color_null, linewidth=2, boxstyle=BOX)
+HEAP = ShapeStyle(facecolor=color_heap, edgecolor='#4CAF50', linewidth=2,
+                  boxstyle='round,pad=0.02,rounding_size=0.05')
+HEAP_DIVIDER = LinkStyle(color='#4CAF50', linewidth=1, head='-')
+POINTER = LinkStyle(color=color_ptr, mutation_scale=10)
+
+# 帧安排：第 0 帧为移动前，1..SLIDE 帧指针从 src 滑到 dst，最后一帧 src 置空
+SLIDE = 16
+FRAMES = SLIDE + 2
+
+SRC = (0.5, 2)
+DST = (6.3, 2)
+SIZE = (2.2, 1.5)
+HEAP_TARGET = (5.5, 4)
+
+CAPTIONS = [
+    'Buffer dst = std::move(src);',
+    'dst.data_ = src.data_;  // 只拷贝指针',
+    'src.data_ = nullptr;  // 源对象置空',
+]
+
+
+def _apply(collection, style):
+    """把单个方框集合切换为另一种样式"""
+    collection.set_facecolor(style.facecolor)
+    collection.set_edgecolor(style.edgecolor)
+    collection.set_linestyle(style.linestyle)
+
+
+def build_animation():
+    """绘制移动构造的分步动画：指针从 src 转交给 dst，src 随后置空"""
+    fig, ax = plt.subplots(figsize=(6.4, 4.2))
+    ax.set_xlim(0, 9)
+    ax.set_ylim(0, 5.3)
+    ax.axis('off')
+    ax.set_title('移动构造：资源转移过程', fontsize=14, fontweight='bold', pad=10)
+
+    # ---------- 背景：各帧不变 ----------
+    with Sketch(ax) as sketch:
+        sketch.cells((4, 4), [1, 2, 3, 4, 5], HEAP, HEAP_DIVIDER, label='堆内存 (未拷贝)')
+    for (x, y), name in ((SRC, 'src'), (DST, 'dst')):
+        ax.text(x + SIZE[0] / 2, y + SIZE[1] + 0.2, name, ha='center', fontsize=12,
+                fontweight='bold')
+
+    # ---------- 逐帧变化的部分 ----------
+    # 两个对象框各自成为一个集合，逐帧切换样式
+    sketch = Sketch(ax)
+    sketch.box(SRC, SIZE, OBJECT)
+    src_box, = sketch.flush()
+    sketch.box(DST, SIZE, UNINIT_OBJECT)
+    dst_box, = sketch.flush()
+
+    def fields(x):
+        return [ax.text(x + 0.15, SRC[1] + SIZE[1] - 0.4 - i * 0.5, '', ha='left', fontsize=9,
+                        family='monospace') for i in range(2)]
+
+    src_fields, dst_fields = fields(SRC[0]), fields(DST[0])
+    dst_note = ax.text(DST[0] + SIZE[0] / 2, DST[1] + 0.75, '(未初始化)', fontsize=10,
+                       ha='center', va='center', color='#666666')
+    pointer = ax.add_collection(PointerCollection([(0, 0)], [HEAP_TARGET], [0.1], POINTER),
+                                autolim=False)
+    caption = ax.text(4.5, 0.5, '', fontsize=11, ha='center',
+                      bbox=dict(boxstyle='round', facecolor='#FFF3E0', edgecolor='#FFB74D'))
+
+    def set_fields(texts, values, color):
+        for text, value in zip(texts, values):
+            text.set_text(value)
+            text.set_color(color)
+
+    def update(frame):
+        # 指针起点沿对象框顶边中点从 src 平移到 dst
+        t = np.clip(frame / SLIDE, 0, 1)
+        t = t * t * (3 - 2 * t)
+        start_x = (1 - t) * (SRC[0] + SIZE[0] / 2) + t * (DST[0] + SIZE[0] / 2)
+        pointer.set_positions([(start_x, SRC[1] + SIZE[1])], [HEAP_TARGET])
+
+        moved = frame > 0
+        emptied = frame == FRAMES - 1
+        _apply(dst_box, OBJECT if moved else UNINIT_OBJECT)
+        _apply(src_box, MOVED_OBJECT if emptied else OBJECT)
+        dst_note.set_visible(not moved)
+        set_fields(dst_fields, ['data_: 0x1234', 'size_: 5'] if moved else ['', ''], 'black')
+        set_fields(src_fields, ['data_: nullptr', 'size_: 0'] if emptied
+                   else ['data_: 0x1234', 'size_: 5'], '#9E9E9E' if emptied else 'black')
+        caption.set_text(CAPTIONS[2 if emptied else 1 if moved else 0])
+
+    fig.tight_layout()
+    return Animation(fig, [src_box, dst_box, pointer, *src_fields, *dst_fields, dst_note, caption],
+                     update, frames=FRAMES, interval=60, pauses={0: 1500, SLIDE: 800, FRAMES - 1: 2500})
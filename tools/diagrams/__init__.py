@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章配图构建工具
+
+source/_posts/images/ 下的每个绘图脚本约定：
+    - 定义 build_figure()，返回绘制完成但尚未保存的 matplotlib Figure
+    - 可选定义 OUTPUT，输出文件名（相对于脚本所在目录），默认为 <脚本名>.png
+    - 分步动画改为定义 build_animation()，返回 animate.Animation，输出 APNG/WebP/GIF
+栈帧、堆对象、指针这类图也可以只写一个 <名称>.diagram.yaml 描述文件，由 spec.py 渲染；
+对象图可以不写坐标，由 layout.py 自动布局。
+
+中文字体由构建工具统一注册（仓库内置的 Noto Sans CJK SC 子集，见 fonts.py），脚本无需设置。
+内存示意图常用的方框、指针、栈槽、堆对象等图元见 primitives.py，按样式批量绘制。
+每张图构建一次后同时输出 1x/2x 的 PNG、WebP、AVIF 以及精简后的 SVG 与其预压缩文件（见 export.py）。
+静态配图还会输出深色主题的 WebP，由同一个 Figure 换色后光栅化（见 theme.py）。
+文字尺寸、排版、字形位图与 SVG 字体子集存入持久文字缓存，各配图与之后的构建共用（见 textcache.py）。
+
+用法（在仓库根目录执行）：
+    python -m tools.diagrams build              # 增量构建被文章引用的配图（跳过未变化的）
+    python -m tools.diagrams build -p CPP移动语义  # 只构建某篇文章引用的配图
+    python -m tools.diagrams build --force      # 忽略缓存，全部重新渲染
+    python -m tools.diagrams build stack_frame  # 只构建指定配图
+    python -m tools.diagrams posts              # 文章 → 图片 → 脚本的依赖图与孤立文件
+    python -m tools.diagrams render specs/      # 批量渲染描述文件（预览，不更新缓存）
+    python -m tools.diagrams visual             # 与基准图逐像素比较，发现意外的视觉变化
+    python -m tools.diagrams bench              # 分阶段测量渲染耗时与内存
+    python -m tools.diagrams fonts <字体文件>    # 重新生成内置字体子集
+"""
+
+from .discover import Diagram, IMAGES_DIR, discover
+from .animate import Animation, export_animation
+from .assets import ImageManifest, hashed_name
+from .build import BuildResult, build_all, build_incremental, render_diagram
+from .cache import BuildManifest
+from .export import (ANIMATION_VARIANTS, DARK_VARIANTS, SAVE_KWARGS, VARIANTS, Artifact, Variant,
+                     export_figure, measure_tight_bbox, variant_path)
+from .fonts import FONT_FAMILY, register_fonts
+from .layout import GraphLayout, GraphNode, layout_graph
+from .optimize import OptimizedPNG, OptimizedSVG, optimize_png, optimize_svg
+from .placeholder import blurhash, placeholder
+from .posts import ImageRef, PostGraph, build_graph
+from .primitives import LinkStyle, PointerCollection, ShapeStyle, Sketch
+from .spec import DiagramSpec, FigurePool, SpecError, SpecRenderer, load_spec, render_spec
+from .textcache import TextCache, text_cache
+from .theme import THEMES, dark_color, themed
+from .timing import STAGES, Timings
+from .visual import VisualResult, check_visual, perceptual_hash
+
+__all__ = [
+    'Diagram',
+    'IMAGES_DIR',
+    'discover',
+    'ANIMATION_VARIANTS',
+    'DARK_VARIANTS',
+    'SAVE_KWARGS',
+    'VARIANTS',
+    'Artifact',
+    'Variant',
+    'export_figure',
+    'measure_tight_bbox',
+    'variant_path',
+    'Animation',
+    'export_animation',
+    'FONT_FAMILY',
+    'register_fonts',
+    'GraphLayout',
+    'GraphNode',
+    'layout_graph',
+    'ImageManifest',
+    'hashed_name',
+    'OptimizedPNG',
+    'OptimizedSVG',
+    'optimize_png',
+    'optimize_svg',
+    'blurhash',
+    'placeholder',
+    'ImageRef',
+    'PostGraph',
+    'build_graph',
+    'ShapeStyle',
+    'LinkStyle',
+    'PointerCollection',
+    'Sketch',
+    'DiagramSpec',
+    'FigurePool',
+    'SpecError',
+    'SpecRenderer',
+    'load_spec',
+    'render_spec',
+    'VisualResult',
+    'check_visual',
+    'perceptual_hash',
+    'THEMES',
+    'dark_color',
+    'themed',
+    'TextCache',
+    'text_cache',
+    'STAGES',
+    'Timings',
+    'BuildResult',
+    'build_all',
+    'build_incremental',
+    'BuildManifest',
+    'render_diagram',
+]
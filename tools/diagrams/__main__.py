@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""配图构建命令行入口：python -m tools.diagrams <命令> [参数]"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from .bench import RESULTS_PATH
+from .build import build_all, build_incremental
+from .discover import REPO_ROOT, Diagram, discover, sources
+from .posts import build_graph
+from .reproducible import check_reproducible
+from .spec import SpecError
+from .timing import STAGES
+from .visual import GOLDEN_DIR
+from .watch import Watcher
+
+
+def _relative(path):
+    """尽量显示相对于仓库根目录的路径"""
+    try:
+        return path.relative_to(REPO_ROOT)
+    except ValueError:
+        return path
+
+
+def _stages(timings) -> str:
+    """按 timing.STAGES 的顺序格式化各阶段耗时"""
+    return '  '.join(f'{stage} {timings[stage]:.2f}s' for stage in STAGES if stage in timings)
+
+
+def _select_diagrams(graph, args, posts):
+    """
+    按命令行参数选出要构建的配图，返回 (配图列表, 被跳过的未引用配图列表)
+
+    默认只构建被文章引用的配图；--post 只构建指定文章的配图，
+    指定配图名时总是构建它们（不论是否被引用），--all 构建全部。
+    """
+    if args.all:
+        return graph.diagrams, []
+    if not posts and not args.names:
+        return graph.diagrams_for(), graph.orphan_diagrams()
+
+    selected = set(discover(names=args.names)) if args.names else set()
+    selected.update(graph.diagrams_for(posts))
+    return [d for d in graph.diagrams if d in selected], []
+
+
+def cmd_build(args) -> int:
+    """增量构建配图，逐张报告耗时"""
+    try:
+        graph = build_graph()
+    except SpecError as e:
+        print(e, file=sys.stderr)
+        return 1
+    posts = [graph.find_post(name) for name in args.post]
+    missing = [name for name, post in zip(args.post, posts) if post is None]
+    if missing:
+        print(f'找不到文章: {"，".join(missing)}', file=sys.stderr)
+        return 1
+
+    diagrams, orphans = _select_diagrams(graph, args, posts)
+    if orphans:
+        print(f'跳过 {len(orphans)} 张没有被文章引用的配图（指定配图名或 --all 可强制构建）: '
+              + '，'.join(d.name for d in orphans))
+    if not diagrams:
+        print('没有找到需要构建的配图')
+        return 1
+
+    def report(result):
+        status = 'ok' if result.ok else '失败'
+        print(f'  {result.seconds:6.2f}s  {status:4}  {_relative(result.output)}')
+        if result.timings:
+            print(f'{"":16}{_stages(result.timings)}')
+        for artifact in result.artifacts or ():
+            line = f'{"":16}{artifact.size / 1024:9.1f} KiB  {artifact.path.name}'
+            if artifact.original_size:
+                saved = 1 - artifact.size / artifact.original_size
+                line += (f'  (优化前 {artifact.original_size / 1024:.1f} KiB，'
+                         f'减少 {saved:.0%}，{artifact.note})')
+            print(line)
+
+    start = time.perf_counter()
+    results, skipped = build_incremental(diagrams, jobs=args.jobs, force=args.force,
+                                         on_result=report)
+    elapsed = time.perf_counter() - start
+
+    if not results:
+        print(f'全部 {len(skipped)} 张配图均为最新，无需重新渲染（{elapsed:.2f}s）')
+        return 0
+
+    failed = [r for r in results if not r.ok]
+    for result in failed:
+        print(f'\n[{result.name}] 构建失败:\n{result.error}', file=sys.stderr)
+
+    slowest = max(r.seconds for r in results)
+    print(f'渲染 {len(results)} 张配图，跳过 {len(skipped)} 张未变化的配图，总耗时 {elapsed:.2f}s'
+          f'（最慢单图 {slowest:.2f}s，串行合计 {sum(r.seconds for r in results):.2f}s）')
+    totals = {}
+    for result in results:
+        for stage, seconds in (result.timings or {}).items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    if totals:
+        print(f'各阶段合计: {_stages(totals)}')
+    text = [r.text for r in results if r.text]
+    if text:
+        hits = sum(sum(t['hits'].values()) for t in text)
+        lookups = hits + sum(sum(t['misses'].values()) for t in text)
+        print(f'文字缓存: 命中 {hits / lookups if lookups else 0:.0%}，'
+              f'文字测量与绘制 {sum(t["seconds"] for t in text):.2f}s')
+    sizes = _vector_sizes(results)
+    if sizes:
+        print('体积合计: ' + '  '.join(
+            f'{key} {size / 1024:.1f} KiB' + (f'（{size / sizes[".png"]:.0%}）' if key != '.png' else '')
+            for key, size in sizes.items()))
+    return 1 if failed else 0
+
+
+def cmd_posts(args) -> int:
+    """显示文章 → 图片 → 脚本的依赖关系，以及未被引用的配图和断开的引用"""
+    from .build import build_settings, output_paths
+    from .cache import BuildManifest, input_key
+
+    try:
+        graph = build_graph()
+    except SpecError as e:
+        print(e, file=sys.stderr)
+        return 1
+    posts = [graph.find_post(name) for name in args.posts] if args.posts else graph.posts
+    missing = [name for name, post in zip(args.posts, posts) if post is None]
+    if missing:
+        print(f'找不到文章: {"，".join(missing)}', file=sys.stderr)
+        return 1
+
+    manifest, settings = BuildManifest(), build_settings()
+
+    def status(diagram):
+        if not diagram.output.is_file():
+            return '尚未生成'
+        key = input_key(diagram.script, settings)
+        return '最新' if manifest.is_fresh(diagram.output, output_paths(diagram), key) else '需要重新渲染'
+
+    for post in posts:
+        print(_relative(post))
+        for ref in graph.refs_of(post):
+            line = f'  {ref.line:5}  {ref.text}'
+            diagram = graph.producer(ref.path)
+            if diagram:
+                line += f'  ← {_relative(diagram.script)}（{status(diagram)}）'
+            elif not ref.path.is_file():
+                line += '  （文件不存在）'
+            print(line)
+
+    orphan_diagrams, orphan_images = graph.orphan_diagrams(), graph.orphan_images()
+    broken = graph.broken_refs()
+    if orphan_diagrams:
+        print(f'\n没有被任何文章引用的配图脚本（{len(orphan_diagrams)}）:')
+        for diagram in orphan_diagrams:
+            print(f'  {_relative(diagram.script)} → {diagram.output.name}')
+    if orphan_images:
+        print(f'\n没有被引用、也不由脚本生成的图片（{len(orphan_images)}）:')
+        for path in orphan_images:
+            print(f'  {_relative(path)}')
+    if broken:
+        print(f'\n断开的引用（{len(broken)}）:', file=sys.stderr)
+        for ref in broken:
+            print(f'  {ref}', file=sys.stderr)
+    if not (orphan_diagrams or orphan_images or broken):
+        print(f'\n{len(graph.posts)} 篇文章引用的图片均存在，没有未被引用的配图或图片')
+
+    if broken or (args.check and (orphan_diagrams or orphan_images)):
+        return 1
+    return 0
+
+
+def _vector_sizes(results):
+    """有 SVG 输出的配图中，1x PNG 与各 SVG 输出的总字节数：{'.png': ..., '.svg': ..., '.svg.gz': ...}"""
+    sizes = {}
+    for result in results:
+        artifacts = {a.path.name[len(result.output.stem):]: a for a in result.artifacts or ()}
+        if '.svg' not in artifacts or '.png' not in artifacts:
+            continue
+        for key in ('.png', '.svg', '.svg.gz', '.svg.br'):
+            if key in artifacts:
+                sizes[key] = sizes.get(key, 0) + artifacts[key].size
+    return sizes
+
+
+def _variants(text):
+    """解析 --formats，如 png,png@2x,svg,svg.gz,webp.dark@2x"""
+    from .export import VARIANTS, Variant
+    from .theme import THEMES
+
+    variants = []
+    for item in text.split(','):
+        name, _, scale = item.strip().partition('@')
+        fmt, _, theme = name.partition('.')
+        if theme not in THEMES:
+            fmt, theme = name, 'light'
+        variant = Variant(fmt, int(scale.rstrip('x') or 1), theme)
+        if variant not in VARIANTS:
+            raise argparse.ArgumentTypeError(f'不支持的输出格式: {item}')
+        variants.append(variant)
+    return tuple(variants)
+
+
+def cmd_render(args) -> int:
+    """批量渲染描述文件到指定目录，不读写构建缓存和 images.json"""
+    from .spec import is_spec, load_spec
+
+    specs = []
+    for path in args.paths:
+        if path.is_dir():
+            specs.extend(p for p in sources(path) if is_spec(p))
+        elif is_spec(path):
+            specs.append(path)
+        else:
+            print(f'不是配图描述文件: {path}', file=sys.stderr)
+            return 1
+    if not specs:
+        print('没有找到配图描述文件')
+        return 1
+
+    diagrams = []
+    try:
+        for path in specs:
+            out_dir = args.output_dir or path.parent
+            diagrams.append(Diagram(path, out_dir / load_spec(path).output))
+    except SpecError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    failed = []
+
+    def report(result):
+        if not result.ok:
+            failed.append(result)
+        elif args.verbose:
+            print(f'  {result.seconds:6.2f}s  {_relative(result.output)}')
+
+    start = time.perf_counter()
+    build_all(diagrams, jobs=args.jobs, on_result=report, variants=args.formats,
+              draft=not args.optimize)
+    elapsed = time.perf_counter() - start
+
+    for result in failed:
+        print(f'\n[{result.name}] 渲染失败:\n{result.error}', file=sys.stderr)
+    formats = ', '.join(f'{v.format}{v.suffix}' for v in args.formats)
+    print(f'渲染 {len(diagrams) - len(failed)}/{len(diagrams)} 张配图（{formats}），'
+          f'耗时 {elapsed:.2f}s')
+    return 1 if failed else 0
+
+
+def cmd_watch(args) -> int:
+    """常驻监听，脚本保存后立即重新渲染对应配图"""
+    def report(result):
+        status = 'ok' if result.ok else '失败'
+        print(f'  {time.strftime("%H:%M:%S")}  {result.seconds:5.2f}s  {status:4}  '
+              f'{_relative(result.output)}', flush=True)
+        if not result.ok:
+            print(result.error, file=sys.stderr, flush=True)
+
+    def report_error(message):
+        print(f'  {time.strftime("%H:%M:%S")}  脚本解析失败: {message}', file=sys.stderr, flush=True)
+
+    watcher = Watcher(interval=args.interval, on_result=report, on_error=report_error)
+    watcher.start()
+    print(f'正在监听 {len(watcher.diagrams)} 张配图的脚本，按 Ctrl+C 退出', flush=True)
+    watcher.run()
+    return 0
+
+
+def cmd_verify(args) -> int:
+    """渲染两次并比较哈希，确认输出逐字节可复现，并检查 images.json 与仓库中的图片一致"""
+    from .assets import ImageManifest
+
+    diagrams = discover(names=args.names)
+    problems = check_reproducible(diagrams)
+    stale = ImageManifest().mismatches()
+    for problem in problems + stale:
+        print(problem, file=sys.stderr)
+    if stale:
+        print('images.json 已过期，请运行 python -m tools.diagrams build 并提交结果', file=sys.stderr)
+    if problems or stale:
+        return 1
+    print(f'{len(diagrams)} 张配图两次渲染的全部输出逐字节一致，images.json 与图片一致')
+    return 0
+
+
+def cmd_visual(args) -> int:
+    """在内存中渲染配图并与基准图比较，发现样式或依赖升级引起的意外变化"""
+    from .visual import STATUS_LABELS, check_visual
+
+    def report(result):
+        line = f'  {result.seconds:6.2f}s  {STATUS_LABELS[result.status]:<6}{result.name}'
+        if result.status in ('changed', 'modified'):
+            line += (f'  变化像素 {result.changed:.3%}，最大差值 {result.max_error}，'
+                     f'感知哈希距离 {result.distance}')
+            if result.detail:
+                line += f'（{result.detail}）'
+            line += f'\n{"":10}差异图 {_relative(result.heatmap)}'
+        if result.entry:
+            line += '  → 已写入基准'
+        print(line, file=sys.stderr if not result.ok else sys.stdout, flush=True)
+        if result.error:
+            print(result.error, file=sys.stderr, flush=True)
+
+    try:
+        diagrams = discover(names=args.names)
+    except SpecError as e:
+        print(e, file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    results = check_visual(diagrams, golden_dir=args.golden, jobs=args.jobs, update=args.update,
+                           accept=args.accept, tolerance=args.tolerance, on_result=report)
+    failed = [r for r in results if not r.ok]
+    missing = [r for r in results if r.status == 'new' and not r.entry]
+    stale = [r for r in results if r.status == 'modified' and not r.entry]
+    elapsed = time.perf_counter() - start
+    if failed:
+        print(f'{len(failed)} 张配图与基准不一致、没有基准或渲染失败（{elapsed:.2f}s）',
+              file=sys.stderr)
+        if missing:
+            print(f'其中 {len(missing)} 张没有基准，用 --update 生成并提交 {_relative(args.golden)}',
+                  file=sys.stderr)
+        if len(failed) > len(missing):
+            print('确认改动符合预期后用 --accept 更新基准', file=sys.stderr)
+        return 1
+    print(f'{len(results)} 张配图检查完毕，没有意外的视觉变化（{elapsed:.2f}s）')
+    if stale:
+        print(f'其中 {len(stale)} 张的脚本已修改，用 --update 更新基准并提交')
+    return 0
+
+
+def cmd_fonts(args) -> int:
+    """从完整字体重新生成仓库内置的字体子集"""
+    from .fonts import bundled_charset, subset_bundled
+
+    chars = bundled_charset()
+    for source in args.sources:
+        start = time.perf_counter()
+        output = subset_bundled(source, chars=chars)
+        print(f'  {time.perf_counter() - start:6.2f}s  {source.stat().st_size / 1024:9.1f} KiB'
+              f' → {output.stat().st_size / 1024:.1f} KiB  {_relative(output)}')
+    print(f'子集覆盖 {len(chars)} 个字符')
+    return 0
+
+
+def _sizes(text):
+    """解析 --synthetic，如 10,100,1000"""
+    return tuple(int(n) for n in text.split(',') if n.strip())
+
+
+def _bench_text_cache(bench, cases, variants, args) -> int:
+    """bench --text-cache：文字耗时随配图库增长的变化"""
+    from .textcache import hit_rate
+
+    output = bench.TEXT_RESULTS_PATH if args.output == RESULTS_PATH else args.output
+    print(f'{len(cases)} 个用例依次加入文字缓存，输出 '
+          f'{", ".join(bench.variant_name(v) for v in variants)}', flush=True)
+    # 文字测量与绘制的耗时（毫秒）及命中率
+    print(f'  {"":<24}{"cold":>9}{"library":>10}{"hit":>6}{"rerun":>9}{"hit":>6}', flush=True)
+
+    def report(name, result):
+        cold, library, rerun = result['cold'], result['library'], result['rerun']
+        print(f'  {name:<24}{cold["seconds"] * 1000:9.1f}{library["seconds"] * 1000:10.1f}'
+              f'{hit_rate(library):6.0%}{rerun["seconds"] * 1000:9.1f}{hit_rate(rerun):6.0%}',
+              flush=True)
+
+    results = bench.bench_text_cache(cases, variants, on_case=report)
+    totals = {mode: sum(r[mode]['seconds'] for r in results.values())
+              for mode in ('cold', 'library', 'rerun')}
+    print(f'文字耗时合计: 无缓存 {totals["cold"]:.3f}s，配图库内共享 {totals["library"]:.3f}s，'
+          f'下次构建 {totals["rerun"]:.3f}s')
+    bench.save_results({'version': bench.RESULTS_VERSION, 'environment': bench.environment(),
+                        'text_cache': results}, output)
+    print(f'结果已写入 {_relative(output.resolve())}')
+    return 0
+
+
+def cmd_bench(args) -> int:
+    """分阶段测量配图渲染耗时、峰值内存与输出大小，并可与基线比较"""
+    from . import bench
+    from .export import available_variants
+
+    try:
+        cases = [bench.diagram_case(d) for d in discover(names=args.names)]
+    except SpecError as e:
+        print(e, file=sys.stderr)
+        return 1
+    sizes = args.synthetic
+    if sizes is None:
+        sizes = () if args.names else bench.SYNTHETIC_SIZES
+    cases += [bench.synthetic_case(n) for n in sizes]
+    if not cases:
+        print('没有找到需要测量的配图')
+        return 1
+
+    variants = available_variants(args.formats) if args.formats else available_variants()
+    if args.text_cache:
+        return _bench_text_cache(bench, cases, variants, args)
+    print(f'{len(cases)} 个用例，预热 {args.warmup} 次、计时 {args.repeat} 次，'
+          f'输出 {", ".join(bench.variant_name(v) for v in variants)}', flush=True)
+    # 耗时为中位数（毫秒）
+    print(f'  {"":<24}{"import":>9}{"construct":>11}{"tight_layout":>14}{"savefig":>10}'
+          f'{"total":>10}{"peak_rss":>11}{"bytes":>11}', flush=True)
+
+    def report(name, result):
+        ms = {stage: t['median'] * 1000 for stage, t in result['times'].items()}
+        savefig = sum(t for stage, t in ms.items() if stage.startswith('savefig.'))
+        print(f'  {name:<24}{ms["import"]:9.1f}{ms["construct"]:11.1f}'
+              f'{ms["tight_layout"]:14.1f}{savefig:10.1f}{ms["total"]:10.1f}'
+              f'{result["peak_rss"] / 1024 / 1024:10.1f}M'
+              f'{sum(result["bytes"].values()) / 1024:10.1f}K', flush=True)
+        if args.verbose:
+            if 'frames' in result['times']:
+                t = result['times']['frames']
+                print(f'{"":6}{"frames":<12}{t["median"] * 1000:9.1f} ms  '
+                      f'(min {t["min"] * 1000:.1f}, max {t["max"] * 1000:.1f})', flush=True)
+            for stage, t in result['times'].items():
+                if stage.startswith('savefig.'):
+                    variant = stage.split('.', 1)[1]
+                    print(f'{"":6}{variant:<12}{t["median"] * 1000:9.1f} ms  '
+                          f'(min {t["min"] * 1000:.1f}, max {t["max"] * 1000:.1f})  '
+                          f'{result["bytes"][variant] / 1024:.1f} KiB', flush=True)
+
+    results = bench.run_benchmarks(cases, variants, repeat=args.repeat, warmup=args.warmup,
+                                   on_case=report)
+    bench.save_results(results, args.output)
+    print(f'结果已写入 {_relative(args.output.resolve())}')
+
+    if not args.baseline:
+        return 0
+    if not args.baseline.is_file():
+        if args.update_baseline:
+            bench.save_results(results, args.baseline)
+            print(f'基线不存在，已用本次结果创建 {_relative(args.baseline.resolve())}')
+            return 0
+        print(f'基线文件不存在: {args.baseline}', file=sys.stderr)
+        return 1
+
+    try:
+        baseline = bench.load_results(args.baseline)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    problems = bench.compare(results, baseline, threshold=args.threshold)
+    for problem in problems:
+        print(f'  回归  {problem}', file=sys.stderr)
+    if problems:
+        print(f'{len(problems)} 项指标超出基线 {args.threshold:.0%} 以上', file=sys.stderr)
+        return 1
+    print(f'与基线相比没有超过 {args.threshold:.0%} 的回归')
+    if args.update_baseline:
+        bench.save_results(results, args.baseline)
+        print(f'已更新基线 {_relative(args.baseline.resolve())}')
+    return 0
+
+
+def cmd_upload(args) -> int:
+    """把 source/_posts/images 增量同步到 R2"""
+    from . import upload
+
+    if not args.bucket:
+        print('未指定存储桶：请设置 R2_BUCKET_NAME 或使用 --bucket', file=sys.stderr)
+        return 1
+
+    def progress(action, name):
+        print(f'  {"上传" if action == "upload" else "删除"}  {name}', flush=True)
+
+    start = time.perf_counter()
+    client = upload.make_client(args.endpoint_url, workers=args.jobs)
+    report = upload.sync(client, args.bucket, workers=args.jobs,
+                         dry_run=args.dry_run, on_progress=progress)
+    elapsed = time.perf_counter() - start
+
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    prefix = '[dry run] 将' if args.dry_run else ''
+    print(f'{prefix}上传 {report.uploaded} 个文件（{report.uploaded_bytes / 1024:.1f} KiB），'
+          f'删除 {report.deleted} 个，{report.unchanged} 个未变化，耗时 {elapsed:.2f}s')
+    return 1 if report.errors else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m tools.diagrams',
+                                     description='文章配图构建工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='构建配图')
+    build.add_argument('names', nargs='*',
+                       help='只构建指定配图（逻辑名或脚本名）；默认构建全部被文章引用的配图')
+    build.add_argument('-p', '--post', action='append', default=[],
+                       help='只构建这篇文章引用的配图（文章路径、文件名或不带 .md 的文件名），可重复')
+    build.add_argument('--all', action='store_true', help='构建全部配图，包括没有被文章引用的')
+    build.add_argument('-j', '--jobs', type=int, help='并行进程数，默认为 CPU 核数')
+    build.add_argument('-f', '--force', action='store_true', help='忽略缓存，全部重新渲染')
+    build.set_defaults(func=cmd_build)
+
+    render = subparsers.add_parser('render', help='批量渲染配图描述文件（不更新缓存）')
+    render.add_argument('paths', nargs='+', type=Path, help='描述文件或包含描述文件的目录')
+    render.add_argument('-o', '--output-dir', type=Path,
+                        help='输出目录，默认写在各描述文件旁边')
+    render.add_argument('--formats', type=_variants, default=_variants('png'),
+                        help='输出格式，逗号分隔，如 png,png@2x,webp,svg,webp.dark；默认 png')
+    render.add_argument('--optimize', action='store_true',
+                        help='像 build 一样优化 PNG（默认不优化，以便快速预览）')
+    render.add_argument('-j', '--jobs', type=int, help='并行进程数，默认为 CPU 核数')
+    render.add_argument('-v', '--verbose', action='store_true', help='逐张显示耗时')
+    render.set_defaults(func=cmd_render)
+
+    watch = subparsers.add_parser('watch', help='监听脚本变化并即时重新渲染')
+    watch.add_argument('--interval', type=float, default=0.2, help='轮询间隔（秒），默认 0.2')
+    watch.set_defaults(func=cmd_watch)
+
+    posts = subparsers.add_parser('posts', help='显示文章引用的图片及其生成脚本，检查孤立文件和断开的引用')
+    posts.add_argument('posts', nargs='*', help='只显示这些文章（文章路径、文件名或不带 .md 的文件名）')
+    posts.add_argument('--check', action='store_true',
+                       help='存在未被引用的配图脚本或图片时也以非零状态退出（断开的引用总是如此）')
+    posts.set_defaults(func=cmd_posts)
+
+    verify = subparsers.add_parser('verify', help='检查配图输出是否逐字节可复现')
+    verify.add_argument('names', nargs='*', help='只检查指定配图（逻辑名或脚本名）')
+    verify.set_defaults(func=cmd_verify)
+
+    visual = subparsers.add_parser('visual', help='在内存中渲染配图并与基准图逐像素比较')
+    visual.add_argument('names', nargs='*', help='只检查指定配图（逻辑名或脚本名）')
+    visual.add_argument('-j', '--jobs', type=int, help='并行进程数，默认为 CPU 核数')
+    visual.add_argument('--golden', type=Path, default=GOLDEN_DIR,
+                        help='基准目录，默认 tools/diagrams/golden')
+    visual.add_argument('--update', action='store_true',
+                        help='为没有基准或脚本已修改的配图写入新基准')
+    visual.add_argument('--accept', action='store_true',
+                        help='把本次渲染结果全部写为基准（确认改动符合预期后使用）')
+    visual.add_argument('--tolerance', type=float, default=0.0,
+                        help='允许变化的像素比例，默认 0（任何超出抗锯齿容差的像素都算变化）')
+    visual.set_defaults(func=cmd_visual)
+
+    fonts = subparsers.add_parser('fonts', help='从完整字体重新生成内置字体子集')
+    fonts.add_argument('sources', nargs='+', type=Path,
+                       help='完整字体文件，如 NotoSansCJKsc-Regular.otf、NotoSansCJKsc-Bold.otf')
+    fonts.set_defaults(func=cmd_fonts)
+
+    bench = subparsers.add_parser('bench', help='测量配图渲染性能并与基线比较')
+    bench.add_argument('names', nargs='*', help='只测量指定配图（逻辑名或脚本名）')
+    bench.add_argument('-r', '--repeat', type=int, default=5, help='计时次数，默认 5')
+    bench.add_argument('-w', '--warmup', type=int, default=1, help='预热次数，默认 1')
+    bench.add_argument('--synthetic', type=_sizes,
+                       help='合成图的节点数，逗号分隔；未指定配图时默认为 10,100,1000，'
+                            '传空字符串则不测合成图')
+    bench.add_argument('--formats', type=_variants,
+                       help='要计时的输出格式，同 render --formats；默认为全部变体')
+    bench.add_argument('-o', '--output', type=Path, default=RESULTS_PATH,
+                       help='结果 JSON 路径，默认 .cache/diagrams/bench.json')
+    bench.add_argument('--baseline', type=Path, help='与该基线 JSON 比较，出现回归时以非零状态退出')
+    bench.add_argument('--threshold', type=float, default=0.2,
+                       help='允许超出基线的比例，默认 0.2（20%%）')
+    bench.add_argument('--update-baseline', action='store_true',
+                       help='没有回归（或基线不存在）时把本次结果写为新基线')
+    bench.add_argument('-v', '--verbose', action='store_true', help='显示每种输出格式的耗时')
+    bench.add_argument('--text-cache', action='store_true',
+                       help='改为测量文字缓存的效果：用例依次加入缓存，记录文字耗时的变化')
+    bench.set_defaults(func=cmd_bench)
+
+    upload = subparsers.add_parser('upload', help='把文章图片增量同步到 R2')
+    upload.add_argument('--bucket', default=os.environ.get('R2_BUCKET_NAME'),
+                        help='存储桶名，默认读取 R2_BUCKET_NAME')
+    upload.add_argument('--endpoint-url',
+                        help='S3 兼容服务地址，默认根据 R2_ACCOUNT_ID 拼出 R2 地址')
+    upload.add_argument('-j', '--jobs', type=int, default=16, help='并发上传数，默认 16')
+    upload.add_argument('--dry-run', action='store_true', help='只显示差异，不实际上传和删除')
+    upload.set_defaults(func=cmd_upload)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
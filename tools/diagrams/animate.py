@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分步动画配图
+
+脚本定义 build_animation()（代替 build_figure()），返回 Animation：
+    - fig 上先画好不变的背景（内存区域、标签等），并调用过 tight_layout
+    - artists 是会逐帧变化的 artist，update(帧号) 修改它们的位置、文字、颜色或可见性
+渲染时背景只完整绘制一次并缓存为像素（Agg 的 copy_from_bbox），每帧先还原背景，
+再只绘制 artists（即 matplotlib 的 blitting），因此每帧的开销与变化的 artist 数量成正比，
+而不是整张图重画一次。
+帧序列写出为动画 PNG（APNG，主输出）、动画 WebP 和 GIF（兜底），不需要 ffmpeg。
+边界按第 0 帧测量，变化的 artist 不要移出背景的范围。
+"""
+
+import io
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .export import (ANIMATION_VARIANTS, PIL_OPTIONS, SAVE_KWARGS, _frozen_layout, _write,
+                     available_variants, measure_tight_bbox, stage_executor, variant_path)
+
+
+@dataclass
+class Animation:
+    """
+    一段分步动画
+
+    Args:
+        fig: 画好背景的 Figure
+        artists: 逐帧变化的 artist，每帧按此顺序绘制在背景之上
+        update: update(帧号)，把 artists 更新为该帧的状态
+        frames: 帧数
+        interval: 每帧显示的毫秒数
+        pauses: {帧号: 毫秒}，需要停留更久的关键帧
+        loop: 循环次数，0 为无限循环
+    """
+    fig: object
+    artists: list
+    update: object
+    frames: int
+    interval: int = 100
+    pauses: dict = field(default_factory=dict)
+    loop: int = 0
+
+    @property
+    def durations(self):
+        """每帧的显示时长（毫秒）"""
+        return [self.pauses.get(i, self.interval) for i in range(self.frames)]
+
+
+def _crop(rgba, bbox, dpi: float, height: float, facecolor):
+    """按英寸边界从整张画布中裁出一帧，超出画布的内边距用背景色填充"""
+    x0, x1 = round(bbox.x0 * dpi), round(bbox.x1 * dpi)
+    top, bottom = round((height - bbox.y1) * dpi), round((height - bbox.y0) * dpi)
+    rows, cols = rgba.shape[:2]
+    if x0 >= 0 and top >= 0 and x1 <= cols and bottom <= rows:
+        return rgba[top:bottom, x0:x1].copy()
+
+    frame = np.broadcast_to(facecolor, (bottom - top, x1 - x0, 4)).copy()
+    src_y, src_x = slice(max(top, 0), min(bottom, rows)), slice(max(x0, 0), min(x1, cols))
+    frame[src_y.start - top:src_y.stop - top, src_x.start - x0:src_x.stop - x0] = rgba[src_y, src_x]
+    return frame
+
+
+def render_frames(animation: Animation, dpi: float = None, facecolor=None, timings=None):
+    """
+    逐帧渲染动画
+
+    Args:
+        animation: 要渲染的动画
+        dpi: 分辨率，默认为 SAVE_KWARGS 的 dpi
+        facecolor: 背景色，默认为 SAVE_KWARGS 的 facecolor
+        timings: 可选的 timing.Timings，记录 layout 与 rasterize 耗时
+
+    Returns:
+        RGBA 数组列表，每帧一个，已按紧凑边界裁剪
+    """
+    from matplotlib.colors import to_rgba_array
+
+    from .timing import Timings
+
+    fig = animation.fig
+    dpi = SAVE_KWARGS['dpi'] if dpi is None else dpi
+    facecolor = SAVE_KWARGS['facecolor'] if facecolor is None else facecolor
+    timings = Timings() if timings is None else timings
+    fill = np.round(to_rgba_array(facecolor)[0] * 255).astype(np.uint8)
+
+    fig.set_facecolor(facecolor)
+    animation.update(0)
+    with timings.measure('layout'):
+        bbox = measure_tight_bbox(fig, dpi)
+
+    frames = []
+    original_dpi = fig.dpi
+    fig.dpi = dpi
+    try:
+        with _frozen_layout(fig), timings.measure('rasterize'):
+            for artist in animation.artists:
+                artist.set_animated(True)
+            # 背景只绘制一次：animated 的 artist 不参与 canvas.draw()
+            fig.canvas.draw()
+            background = fig.canvas.copy_from_bbox(fig.bbox)
+            height = fig.get_figheight()
+            for i in range(animation.frames):
+                fig.canvas.restore_region(background)
+                animation.update(i)
+                for artist in animation.artists:
+                    fig.draw_artist(artist)
+                frames.append(_crop(np.asarray(fig.canvas.buffer_rgba()), bbox, dpi, height, fill))
+    finally:
+        fig.dpi = original_dpi
+    return frames
+
+
+def encode_animation(frames, format: str, durations, loop: int = 0) -> bytes:
+    """
+    把帧序列编码为动画
+
+    Args:
+        frames: RGBA 数组列表
+        format: 'png'（APNG）、'webp' 或 'gif'
+        durations: 每帧的毫秒数
+        loop: 循环次数，0 为无限循环
+    """
+    from PIL import Image
+
+    # 配图背景不透明，去掉 alpha；GIF 由 Pillow 为每帧生成自适应调色板
+    images = [Image.fromarray(np.ascontiguousarray(frame[..., :3])) for frame in frames]
+    options = {'png': dict(compress_level=9),
+               'webp': PIL_OPTIONS['webp'],
+               'gif': {}}[format]
+    buf = io.BytesIO()
+    images[0].save(buf, format=format.upper(), save_all=True, append_images=images[1:],
+                   duration=list(durations), loop=loop, **options)
+    return buf.getvalue()
+
+
+def _encode_and_write(frames, variant, path, durations, loop, timings):
+    with timings.measure('encode'):
+        data = encode_animation(frames, variant.format, durations, loop)
+        return _write(path, data, frames[0].shape)
+
+
+def export_animation(animation: Animation, output, variants=None, save_kwargs=None,
+                     on_raster=None, timings=None, threads: int = None):
+    """
+    渲染动画并写出多种格式
+
+    Args:
+        animation: 要渲染的动画
+        output: 主输出路径（APNG，扩展名为 .png），其余格式写在同目录下
+        variants: 要输出的变体，默认为当前环境支持的全部 ANIMATION_VARIANTS
+        save_kwargs: 取其中的 dpi 与 facecolor，默认为 SAVE_KWARGS
+        on_raster: 可选回调 on_raster(1, RGBA 数组)，第 0 帧渲染后调用一次（用于占位图）
+        timings: 可选的 timing.Timings
+        threads: 编码线程数，同 export.stage_executor；各格式并行编码同一份帧序列
+
+    Returns:
+        Artifact 列表，按 variants 顺序排列
+    """
+    from .timing import Timings
+
+    variants = available_variants(ANIMATION_VARIANTS) if variants is None else variants
+    save_kwargs = SAVE_KWARGS if save_kwargs is None else save_kwargs
+    timings = Timings() if timings is None else timings
+
+    frames = render_frames(animation, save_kwargs['dpi'], save_kwargs.get('facecolor', 'white'),
+                           timings)
+    if on_raster:
+        on_raster(1, frames[0])
+
+    with stage_executor(threads) as executor:
+        futures = [executor.submit(_encode_and_write, frames, variant, variant_path(output, variant),
+                                   animation.durations, animation.loop, timings)
+                   for variant in variants]
+        return [future.result() for future in futures]
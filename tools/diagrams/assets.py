@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址文件名与图片清单
+
+配图的文件名（stack_frame.png 等）是固定的，CDN 无法给它们设置长期 immutable 缓存。
+构建后为每个输出计算内容哈希，得到 stack_frame.3fa9c1d2e4.png 这样的文件名，
+写入 source/_data/images.json：
+
+    {
+      "cpp/stack_frame.png": {
+        "file": "cpp/stack_frame.3fa9c1d2e4.png",
+        "width": 1046, "height": 1100,
+        "variants": {
+          ".png":    {"file": "...", "bytes": 19456, "width": 1046, "height": 1100},
+          "@2x.png": {...}, ".webp": {...}, ".svg": {"file": "...", "bytes": 45210},
+          ".svg.gz": {...}, ".svg.br": {...}, ".dark.webp": {...}, ".dark@2x.webp": {...}
+        },
+        "dark": {
+          "media": "(prefers-color-scheme: dark)", "type": "image/webp",
+          "srcset": {"1x": ".dark.webp", "2x": ".dark@2x.webp"}
+        },
+        "placeholder": {"blurhash": "...", "lqip": "data:image/webp;base64,...", "color": "#ffffff"}
+      }
+    }
+
+SVG 比 1x PNG 还大时（如以大面积半透明色块为主的图），清单中不列出 .svg 及其预压缩文件，
+页面与 CDN 别名都只用光栅格式；文件本身照常写出，构建缓存不受影响。
+
+哈希文件名只存在于 CDN：上传时把原文件以哈希名再上传一份（见 upload.py），
+scripts/cdn_images.js 据此把文章中的 images/cpp/stack_frame.png 改写为哈希地址，
+并补上 width/height 避免布局抖动；有深色变体（见 theme.py）的配图包上
+<picture><source media="(prefers-color-scheme: dark)" ...>，srcset 的取值是 variants 中的键。
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from .discover import IMAGES_DIR, REPO_ROOT
+from .export import ANIMATION_VARIANTS, DARK_VARIANTS, VARIANTS, available_variants, variant_path
+from .theme import DARK_MEDIA
+
+IMAGE_MANIFEST_PATH = REPO_ROOT / 'source' / '_data' / 'images.json'
+
+HASH_LENGTH = 10
+
+# 哈希文件名内容不会变化，可以长期缓存
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# SVG 及其预压缩文件在清单中的键；SVG 比 1x PNG 大时一并不列出
+SVG_KEYS = ('.svg', '.svg.gz', '.svg.br')
+
+
+def hashed_name(name: str, data: bytes = None, digest: str = None) -> str:
+    """
+    stack_frame@2x.png → stack_frame@2x.<内容哈希>.png；已知 SHA-256 时传 digest 代替 data
+
+    预压缩文件的哈希放在 .svg 之前（stack_frame.<内容哈希>.svg.gz），
+    按扩展名推断类型与编码时仍是 image/svg+xml + gzip。
+    """
+    path = Path(name)
+    digest = (digest or hashlib.sha256(data).hexdigest())[:HASH_LENGTH]
+    stem, suffix = path.stem, path.suffix
+    if suffix in ('.gz', '.br'):
+        stem, suffix = Path(stem).stem, Path(stem).suffix + suffix
+    return path.with_name(f'{stem}.{digest}{suffix}').as_posix()
+
+
+def _image_size(path: Path):
+    """读取光栅图片的像素尺寸（只解析文件头），矢量图返回 None"""
+    if path.suffix in ('.svg', '.gz', '.br'):
+        return None
+    from PIL import Image
+    with Image.open(path) as image:
+        return image.size
+
+
+class ImageManifest:
+    """
+    source/_data/images.json 的读写
+
+    Args:
+        path: 清单路径，默认为 source/_data/images.json
+        root: 图片根目录，清单中的路径都相对于它
+    """
+
+    def __init__(self, path: Path = IMAGE_MANIFEST_PATH, root: Path = IMAGES_DIR):
+        self.path = Path(path)
+        self.root = Path(root)
+        self.entries = {}
+        if self.path.is_file():
+            self.entries = json.loads(self.path.read_text(encoding='utf-8'))
+
+    def _relative(self, path: Path) -> str:
+        return Path(path).resolve().relative_to(self.root).as_posix()
+
+    def refresh(self, outputs, placeholders=None, artifacts=()):
+        """
+        根据磁盘上的文件重新计算这些配图的条目
+
+        Args:
+            outputs: 配图的主输出路径（1x PNG）列表；文件不存在的条目会被移除
+            placeholders: 可选，{主输出路径: 占位信息}，来自本次渲染；
+                未提供的配图沿用清单中已有的占位信息
+            artifacts: 可选，本次渲染写出的 export.Artifact；其哈希与尺寸在写出时
+                已经算好，这些文件不再读回
+        """
+        placeholders = {Path(p).resolve(): v for p, v in (placeholders or {}).items()}
+        written = {Path(a.path).resolve(): a for a in artifacts if a.digest}
+        for output in outputs:
+            output = Path(output)
+            name = self._relative(output)
+            if not output.is_file():
+                self.entries.pop(name, None)
+                continue
+
+            variants = {}
+            for variant in available_variants(dict.fromkeys(VARIANTS + ANIMATION_VARIANTS)):
+                path = variant_path(output, variant)
+                artifact = written.get(path.resolve())
+                if artifact:
+                    info = {'file': hashed_name(self._relative(path), digest=artifact.digest),
+                            'bytes': artifact.size}
+                    if artifact.width:
+                        info['width'], info['height'] = artifact.width, artifact.height
+                    variants[f'{variant.suffix}.{variant.format}'] = info
+                    continue
+                if not path.is_file():
+                    continue
+                data = path.read_bytes()
+                info = {'file': hashed_name(self._relative(path), data), 'bytes': len(data)}
+                size = _image_size(path)
+                if size:
+                    info['width'], info['height'] = size
+                variants[f'{variant.suffix}.{variant.format}'] = info
+
+            main = variants['.png']
+            if '.svg' in variants and variants['.svg']['bytes'] > main['bytes']:
+                for key in SVG_KEYS:
+                    variants.pop(key, None)
+            entry = {
+                'file': main['file'],
+                'width': main['width'],
+                'height': main['height'],
+                'variants': variants,
+            }
+            dark = {f'{v.scale}x': f'{v.suffix}.{v.format}' for v in DARK_VARIANTS
+                    if f'{v.suffix}.{v.format}' in variants}
+            if dark:
+                entry['dark'] = {'media': DARK_MEDIA, 'type': 'image/webp', 'srcset': dark}
+            previous = self.entries.get(name, {}).get('placeholder')
+            if placeholders.get(output.resolve()) or previous:
+                entry['placeholder'] = placeholders.get(output.resolve()) or previous
+            self.entries[name] = entry
+
+        # 清理源文件已不存在的条目
+        for name in [n for n in self.entries if not (self.root / n).is_file()]:
+            del self.entries[name]
+
+    def aliases(self):
+        """返回 {哈希文件名: 原文件名}，均相对于图片根目录"""
+        result = {}
+        for name, entry in self.entries.items():
+            for key, info in entry['variants'].items():
+                source = Path(name)
+                result[info['file']] = source.with_name(f'{source.stem}{key}').as_posix()
+        return result
+
+    def mismatches(self, digests=None):
+        """
+        找出哈希文件名与磁盘上的文件内容不一致的条目
+
+        哈希文件名在 CDN 上按 immutable 长期缓存，文件改了而清单没有重新生成时，
+        新内容会以旧哈希名上传，CDN 会一直返回旧内容，因此上传与 verify 前都要检查。
+
+        Args:
+            digests: 可选，{相对路径: SHA-256}，已经算好的文件哈希；未提供的文件读取后计算
+
+        Returns:
+            问题描述列表，为空表示清单与文件一致
+        """
+        digests = digests or {}
+        problems = []
+        for alias, source in sorted(self.aliases().items(), key=lambda item: item[1]):
+            digest = digests.get(source)
+            if digest is None:
+                path = self.root / source
+                if not path.is_file():
+                    problems.append(f'{source}: images.json 中记录为 {alias}，但文件不存在')
+                    continue
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            if hashed_name(source, digest=digest) != alias:
+                problems.append(f'{source}: 内容与 images.json 记录的 {alias} 不一致')
+        return problems
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(self.entries, indent=2, sort_keys=True, ensure_ascii=False) + '\n'
+        if not self.path.is_file() or self.path.read_text(encoding='utf-8') != text:
+            self.path.write_text(text, encoding='utf-8')
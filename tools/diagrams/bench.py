@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配图渲染基准测试与性能回归检查
+
+对每张配图（以及按规模生成的合成图）重复渲染，分阶段计时：
+    - import：执行绘图脚本 / 解析描述文件（不使用解析缓存）
+    - construct：build_figure() 中除 tight_layout 之外的部分
+    - tight_layout：Figure.tight_layout()，包括脚本内部的调用
+    - savefig.<变体>：按 export.py 写出每种输出变体，各自包含一次光栅化
+    - frames：分步动画（见 animate.py）的背景绘制与逐帧重绘；动画的 savefig.<格式> 只含编码
+另外记录每种变体的输出字节数和单次渲染的峰值常驻内存（Linux 上每次渲染前
+通过 /proc/self/clear_refs 重置峰值，其他平台为进程生命周期内的峰值）。
+
+先预热 warmup 次再计时 repeat 次，取中位数写入 JSON。与基线比较时，中位数
+超出基线 threshold 比例（且超过绝对噪声下限）即视为回归，命令以非零状态退出。
+
+合成图模仿 circular_reference 的结构（栈上指针、堆上节点、节点之间的强/弱引用），
+节点数可设为 10/100/1000，用于观察耗时随图元数量的增长，而不只是现有的几张图。
+
+以上计时都不使用文字缓存（见 textcache.py）。bench_text_cache() 另外从空缓存开始
+依次渲染各用例，记录文字测量与绘制的耗时如何随缓存中已有的配图增多而下降。
+"""
+
+import json
+import math
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from importlib import metadata
+from pathlib import Path
+
+from .cache import CACHE_DIR
+from .textcache import TextCache, stats_delta, text_cache
+from .timing import Timings, timed_tight_layout
+
+RESULTS_PATH = CACHE_DIR / 'bench.json'
+TEXT_RESULTS_PATH = CACHE_DIR / 'bench_text.json'
+RESULTS_VERSION = 1
+
+SYNTHETIC_SIZES = (10, 100, 1000)
+
+# 低于这些绝对差值的变化视为噪声，不算回归
+MIN_TIME_DELTA = 0.01              # 秒
+MIN_RSS_DELTA = 4 * 1024 * 1024    # 字节
+
+
+@dataclass
+class Case:
+    """
+    一个基准用例
+
+    Args:
+        name: 用例名（配图逻辑名或 synthetic/graph_<节点数>）
+        kind: 'script'、'spec'、'animation' 或 'synthetic'
+        load: 导入阶段，返回 build 所需的对象
+        build: 由 load 的结果构建 Figure（含 tight_layout；动画用例为 Animation）
+        release: 用完 Figure 后释放它
+    """
+    name: str
+    kind: str
+    load: object
+    build: object
+    release: object
+
+
+def diagram_case(diagram) -> Case:
+    """由 Diagram 生成用例"""
+    from .discover import load_module
+    from .spec import SpecRenderer, parse_spec, read_spec
+
+    if diagram.is_spec:
+        renderer = SpecRenderer()
+        return Case(diagram.name, 'spec',
+                    load=lambda: parse_spec(read_spec(diagram.script), diagram.script),
+                    build=renderer.render, release=renderer.release)
+
+    import matplotlib.pyplot as plt
+    if diagram.animated:
+        return Case(diagram.name, 'animation', load=lambda: load_module(diagram.script),
+                    build=lambda module: module.build_animation(),
+                    release=lambda animation: plt.close(animation.fig))
+    return Case(diagram.name, 'script', load=lambda: load_module(diagram.script),
+                build=lambda module: module.build_figure(), release=plt.close)
+
+
+def graph_spec(nodes: int) -> dict:
+    """
+    circular_reference 风格的合成图描述：nodes 个堆节点首尾相连成环，
+    每个节点以 shared_ptr 指向下一个、以 weak_ptr 指回上一个，栈上一个指针指向首节点；
+    节点位置由 graph 图元自动布局（见 layout.py）
+    """
+    cols = max(4, math.ceil(math.sqrt(nodes)))
+    # 画布大小固定，节点越多字号越小
+    fontsize = round(min(11.0, 44.0 / cols), 1)
+
+    graph_nodes = [{'name': 'head', 'kind': 'stack', 'detail': '(shared_ptr)',
+                    'style': 'stack_ptr', 'size': [1.6, 0.8]}]
+    graph_nodes += [{'name': f'n{i}', 'title': f'Node{i}',
+                     'fields': [f'引用计数={1 if i else 2}']} for i in range(nodes)]
+    edges = [{'from': 'head', 'to': 'n0', 'style': 'stack'}]
+    for i in range(nodes):
+        a, b = f'n{i}', f'n{(i + 1) % nodes}'
+        edges.append({'from': a, 'to': b, 'style': 'owning'})
+        edges.append({'from': b, 'to': a, 'style': 'weak'})
+    items = [{'graph': {'nodes': graph_nodes, 'edges': edges, 'style': 'node',
+                        'max_columns': cols, 'gap': [0.8, 0.8],
+                        'stack_region': {'label': '栈 (Stack)', 'style': 'stack_region'},
+                        'heap_region': {'label': '堆 (Heap)', 'style': 'heap_region'},
+                        'fontsize': fontsize, 'field_fontsize': round(fontsize * 0.8, 1)}}]
+
+    return {
+        'figsize': [12, 9],
+        'shapes': {
+            'stack_region': {'facecolor': '#E3F2FD', 'edgecolor': '#1976D2', 'linewidth': 2,
+                             'alpha': 0.5, 'boxstyle': 'square,pad=0', 'zorder': 0.5},
+            'heap_region': {'facecolor': '#FFF3E0', 'edgecolor': '#E65100', 'linewidth': 2,
+                            'alpha': 0.5, 'boxstyle': 'square,pad=0', 'zorder': 0.5},
+            'stack_ptr': {'edgecolor': '#1976D2', 'linewidth': 2, 'boxstyle': 'round,pad=0.03'},
+            'node': {'facecolor': '#FFCDD2', 'edgecolor': '#C62828', 'linewidth': 2,
+                     'boxstyle': 'round,pad=0.05'},
+        },
+        'links': {
+            'stack': {'color': '#1976D2'},
+            'owning': {'color': '#2E7D32'},
+            'weak': {'color': '#888888', 'linestyle': '--'},
+        },
+        'aspect': 'equal',
+        'title': f'合成循环引用图（{nodes} 个节点）',
+        'items': items,
+    }
+
+
+def synthetic_case(nodes: int) -> Case:
+    """合成图用例：import 阶段为生成并解析描述数据"""
+    from .spec import SpecRenderer, parse_spec
+
+    renderer = SpecRenderer()
+    source = Path(f'synthetic/graph_{nodes}.diagram.json')
+    return Case(f'synthetic/graph_{nodes}', 'synthetic',
+                load=lambda: parse_spec(graph_spec(nodes), source),
+                build=renderer.render, release=renderer.release)
+
+
+def _reset_peak_rss() -> bool:
+    """重置本进程的峰值常驻内存计数（仅 Linux），返回是否成功"""
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss() -> int:
+    """本进程的峰值常驻内存（字节）"""
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KiB 为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def variant_name(variant) -> str:
+    """变体在结果中的名称，如 png@2x"""
+    return f'{variant.format}{variant.suffix}'
+
+
+def _run_animation(animation, times, sizes):
+    """
+    动画用例：frames 为背景绘制一次加逐帧重绘的耗时，savefig.<格式> 为各格式的编码耗时
+
+    不论 --formats 如何，总是输出全部动画格式（APNG、WebP、GIF）。
+    """
+    from .animate import encode_animation, render_frames
+    from .export import ANIMATION_VARIANTS, available_variants
+
+    timings = Timings()
+    frames = render_frames(animation, timings=timings)
+    times['tight_layout'] += timings.get('layout', 0.0)
+    times['frames'] = timings['rasterize']
+    for variant in available_variants(ANIMATION_VARIANTS):
+        start = time.perf_counter()
+        data = encode_animation(frames, variant.format, animation.durations, animation.loop)
+        times[f'savefig.{variant_name(variant)}'] = time.perf_counter() - start
+        sizes[variant_name(variant)] = len(data)
+
+
+def run_once(case: Case, variants, out_dir: Path, cache: TextCache = None) -> dict:
+    """
+    渲染一次，返回 {'times': {阶段: 秒}, 'bytes': {变体: 字节}, 'peak_rss': 字节}
+
+    给出 cache 时文字经过该缓存，结果另有 'text'（本次的 TextCache.stats()）。
+    """
+    from contextlib import nullcontext
+
+    from .export import export_figure
+    from .reproducible import deterministic_rc
+
+    times, sizes, layout = {}, {}, Timings()
+    before = cache.stats() if cache else None
+    _reset_peak_rss()
+    with deterministic_rc(), text_cache(cache) if cache else nullcontext():
+        start = time.perf_counter()
+        loaded = case.load()
+        times['import'] = time.perf_counter() - start
+
+        with timed_tight_layout(layout):
+            start = time.perf_counter()
+            fig = case.build(loaded)
+            elapsed = time.perf_counter() - start
+        times['tight_layout'] = layout.get('layout', 0.0)
+        times['construct'] = elapsed - times['tight_layout']
+
+        try:
+            output = out_dir / f'{case.name.replace("/", "_")}.png'
+            if case.kind == 'animation':
+                _run_animation(fig, times, sizes)
+            else:
+                for variant in variants:
+                    start = time.perf_counter()
+                    # 逐格式单独计时，不开编码线程
+                    artifact, = export_figure(fig, output, variants=(variant,), threads=1)
+                    times[f'savefig.{variant_name(variant)}'] = time.perf_counter() - start
+                    sizes[variant_name(variant)] = artifact.size
+        finally:
+            case.release(fig)
+    times['total'] = sum(times.values())
+    result = {'times': times, 'bytes': sizes, 'peak_rss': peak_rss()}
+    if cache:
+        cache.flush()
+        result['text'] = stats_delta(cache.stats(), before)
+    return result
+
+
+def _summary(values):
+    return {
+        'median': statistics.median(values),
+        'min': min(values),
+        'max': max(values),
+    }
+
+
+def bench_case(case: Case, variants, repeat: int = 5, warmup: int = 1, on_run=None) -> dict:
+    """
+    预热 warmup 次后重复渲染 repeat 次，汇总各阶段耗时
+
+    Returns:
+        {'kind', 'runs', 'times': {阶段: {median, min, max}}, 'bytes', 'peak_rss'}
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(warmup + repeat):
+            run = run_once(case, variants, Path(tmp))
+            if i >= warmup:
+                runs.append(run)
+            if on_run:
+                on_run(case, i < warmup, run)
+    return {
+        'kind': case.kind,
+        'runs': len(runs),
+        'times': {stage: _summary([r['times'][stage] for r in runs]) for stage in runs[0]['times']},
+        'bytes': runs[-1]['bytes'],
+        'peak_rss': max(r['peak_rss'] for r in runs),
+    }
+
+
+def bench_text_cache(cases, variants, on_case=None) -> dict:
+    """
+    文字缓存随配图库增长的效果
+
+    从空缓存开始按顺序渲染各用例，每个用例记录三种情况下的文字耗时与命中情况：
+        - cold：单独使用一个空缓存，即没有任何可复用的文字
+        - library：共用一个缓存，其中已有前面各用例的文字
+        - rerun：全部渲染完后换一个新的 TextCache 对象打开同一个缓存文件再渲染一次，
+          相当于下一次构建（内存中没有条目，全部从磁盘读取）
+
+    Args:
+        cases: Case 列表，按此顺序加入配图库
+        variants: 输出变体
+        on_case: 每完成一个用例调用 on_case(名称, 结果)
+
+    Returns:
+        {用例名: {'cold', 'library', 'rerun'}}，各项为 TextCache.stats() 的差值
+    """
+    from .build import warm_up
+
+    warm_up()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        library = TextCache(tmp / 'library.sqlite')
+        for i, case in enumerate(cases):
+            results[case.name] = {
+                'cold': run_once(case, variants, tmp, TextCache(tmp / f'cold_{i}.sqlite'))['text'],
+                'library': run_once(case, variants, tmp, library)['text'],
+            }
+        rerun = TextCache(library.path)
+        for case in cases:
+            results[case.name]['rerun'] = run_once(case, variants, tmp, rerun)['text']
+            if on_case:
+                on_case(case.name, results[case.name])
+    return results
+
+
+def environment() -> dict:
+    """记录结果时的运行环境，比较不同机器的结果时作参考"""
+    import os
+
+    return {
+        'python': platform.python_version(),
+        'matplotlib': metadata.version('matplotlib'),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'peak_rss_per_run': Path('/proc/self/clear_refs').exists(),
+    }
+
+
+def run_benchmarks(cases, variants, repeat: int = 5, warmup: int = 1, on_case=None,
+                   on_run=None) -> dict:
+    """
+    对全部用例运行基准测试
+
+    Args:
+        cases: Case 列表
+        variants: 要计时的输出变体
+        repeat: 计时次数
+        warmup: 预热次数（不计入结果）
+        on_case: 每完成一个用例调用 on_case(名称, 结果)
+        on_run: 每渲染一次调用 on_run(Case, 是否预热, 单次结果)
+
+    Returns:
+        可直接写入 JSON 的结果
+    """
+    from .build import warm_up
+
+    warm_up()
+    results = {}
+    for case in cases:
+        results[case.name] = bench_case(case, variants, repeat, warmup, on_run)
+        if on_case:
+            on_case(case.name, results[case.name])
+    return {
+        'version': RESULTS_VERSION,
+        'environment': environment(),
+        'settings': {'repeat': repeat, 'warmup': warmup,
+                     'variants': [variant_name(v) for v in variants]},
+        'cases': results,
+    }
+
+
+def save_results(results: dict, path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False) + '\n',
+                    encoding='utf-8')
+
+
+def load_results(path: Path) -> dict:
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(f'{path}: 基准结果版本 {data.get("version")} 与当前版本 '
+                         f'{RESULTS_VERSION} 不一致，请重新生成基线')
+    return data
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.2):
+    """
+    与基线比较各用例的耗时中位数、峰值内存和输出字节数
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        threshold: 允许的增长比例，如 0.2 表示超过基线 20% 即为回归
+
+    Returns:
+        回归描述列表，为空表示没有回归
+    """
+    problems = []
+
+    def check(case, metric, new, old, floor, fmt):
+        if old and new > old * (1 + threshold) and new - old > floor:
+            problems.append(f'{case}: {metric} {fmt(old)} → {fmt(new)} '
+                            f'(+{new / old - 1:.0%}，阈值 {threshold:.0%})')
+
+    def seconds(value):
+        return f'{value:.3f}s'
+
+    def mib(value):
+        return f'{value / 1024 / 1024:.1f} MiB'
+
+    def kib(value):
+        return f'{value / 1024:.1f} KiB'
+
+    for name, case in results['cases'].items():
+        old = baseline['cases'].get(name)
+        if old is None:
+            continue
+        for stage, summary in case['times'].items():
+            if stage in old['times']:
+                check(name, stage, summary['median'], old['times'][stage]['median'],
+                      MIN_TIME_DELTA, seconds)
+        check(name, 'peak_rss', case['peak_rss'], old['peak_rss'], MIN_RSS_DELTA, mib)
+        for variant, size in case['bytes'].items():
+            if variant in old['bytes']:
+                check(name, f'bytes.{variant}', size, old['bytes'][variant], 0, kib)
+    return problems
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行构建配图
+
+主进程先导入 matplotlib（Agg 后端）并预热字体缓存，再按 CPU 核数 fork 出
+进程池，每个子进程直接继承已预热的解释器，只需执行各自的 build_figure()。
+整体耗时约等于最慢的那一张图，而不是每个脚本冷启动耗时之和。
+描述文件（见 spec.py）由同一个进程池渲染，每个子进程复用自己的 Figure 池。
+文字的测量、排版与字形光栅化经过持久文字缓存（见 textcache.py），各子进程共用同一个缓存文件。
+"""
+
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from .animate import export_animation
+from .assets import ImageManifest
+from .cache import BuildManifest, file_digest, input_key
+from .discover import Diagram, load_module
+from .export import ANIMATION_VARIANTS, SAVE_KWARGS, VARIANTS, available_variants, export_figure, variant_path
+from .fonts import check_glyphs, register_fonts
+from .placeholder import placeholder
+from .reproducible import deterministic_rc
+from .spec import release_figure, render_spec
+from .textcache import shared_cache, stats_delta, text_cache
+from .timing import Timings, timed_tight_layout
+
+
+@dataclass
+class BuildResult:
+    """单张配图的构建结果"""
+    name: str
+    output: Path
+    seconds: float
+    error: str = None
+    fonts: tuple = ()
+    artifacts: list = None
+    placeholder: dict = None
+    timings: dict = None   # 各阶段耗时，见 timing.STAGES
+    text: dict = None      # 文字缓存的命中情况，见 TextCache.stats()
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# 输出管线的源码，改动后全部配图都需要重新输出
+PIPELINE_MODULES = ('export.py', 'animate.py', 'optimize.py', 'reproducible.py', 'placeholder.py',
+                    'fonts.py', 'theme.py', 'textcache.py')
+
+
+def build_settings() -> dict:
+    """参与缓存键计算的输出设置"""
+    here = Path(__file__).parent
+    return {
+        **SAVE_KWARGS,
+        'variants': [f'{v.suffix}.{v.format}' for v in available_variants()],
+        'pipeline': {name: file_digest(here / name) for name in PIPELINE_MODULES},
+    }
+
+
+def warm_up():
+    """导入 matplotlib、加载字体缓存并注册内置字体，子进程 fork 后即可直接复用"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    from matplotlib import font_manager
+    font_manager.fontManager.get_default_size()
+    register_fonts()
+
+
+def used_fonts(fig):
+    """返回渲染 fig 中文字时实际会用到的字体文件路径（含回退字体）"""
+    from matplotlib import font_manager
+    from matplotlib.text import Text
+
+    paths = set()
+    for text in fig.findobj(Text):
+        if text.get_text():
+            paths.update(font_manager.fontManager._find_fonts_by_props(text.get_fontproperties()))
+    return tuple(sorted(str(p) for p in paths))
+
+
+def output_paths(diagram: Diagram):
+    """配图的全部输出文件（主 PNG 及各变体）"""
+    variants = ANIMATION_VARIANTS if diagram.animated else VARIANTS
+    return [variant_path(diagram.output, v) for v in available_variants(variants)]
+
+
+def _build_figure(diagram: Diagram):
+    """执行脚本或绘制描述文件，返回 (Figure 或 Animation, 用完后释放 Figure 的函数)"""
+    if diagram.is_spec:
+        return render_spec(diagram.script), release_figure
+
+    import matplotlib.pyplot as plt
+    module = load_module(diagram.script)
+    if diagram.animated:
+        return module.build_animation(), plt.close
+    return module.build_figure(), plt.close
+
+
+def render_diagram(diagram: Diagram, variants=None, draft: bool = False,
+                   threads: int = None) -> BuildResult:
+    """
+    在当前进程中渲染单张配图，写出 PNG 及其余格式变体
+
+    Args:
+        diagram: 要渲染的配图
+        variants: 要输出的变体，默认为当前环境支持的全部变体
+        draft: 草稿模式，不优化 PNG、不计算占位图（用于批量预览）
+        threads: 编码线程数，默认为 CPU 核数（见 export.stage_executor）
+    """
+    placeholders = {}
+    timings = Timings()
+    cache = shared_cache()
+    before = cache.stats()
+
+    def on_raster(scale, rgba):
+        if scale == 1 and not draft:
+            with timings.measure('placeholder'):
+                placeholders[scale] = placeholder(rgba)
+
+    start = time.perf_counter()
+    try:
+        # 脚本导入时对 rcParams 的修改只在本张图内生效
+        with deterministic_rc(), text_cache(cache):
+            with timed_tight_layout(timings), timings.measure('construct'):
+                built, release = _build_figure(diagram)
+            # 脚本内部调用的 tight_layout 记入 layout 而不是 construct
+            timings['construct'] -= timings.get('layout', 0.0)
+            fig = built.fig if diagram.animated else built
+            try:
+                # 动画每一帧的文字都可能不同，逐帧检查
+                for frame in range(built.frames if diagram.animated else 1):
+                    if diagram.animated:
+                        built.update(frame)
+                    check_glyphs(fig)
+                if diagram.animated:
+                    artifacts = export_animation(built, diagram.output, variants=variants,
+                                                 on_raster=on_raster, timings=timings,
+                                                 threads=threads)
+                else:
+                    artifacts = export_figure(fig, diagram.output, variants=variants,
+                                              optimize=not draft, on_raster=on_raster,
+                                              timings=timings, threads=threads)
+                fonts = used_fonts(fig)
+            finally:
+                release(fig)
+        cache.flush()
+    except Exception:
+        return BuildResult(diagram.name, diagram.output,
+                           time.perf_counter() - start, traceback.format_exc())
+    return BuildResult(diagram.name, diagram.output, time.perf_counter() - start,
+                       fonts=fonts, artifacts=artifacts, placeholder=placeholders.get(1),
+                       timings=dict(timings), text=stats_delta(cache.stats(), before))
+
+
+def _pool_context():
+    """优先使用 fork，让子进程继承主进程已预热的 matplotlib"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def build_all(diagrams, jobs: int = None, on_result=None, variants=None, draft: bool = False):
+    """
+    并行渲染多张配图
+
+    Args:
+        diagrams: Diagram 列表
+        jobs: 进程数，默认为 CPU 核数；为 1 时在当前进程中串行渲染
+        on_result: 可选回调，每完成一张图调用一次 on_result(BuildResult)
+        variants: 要输出的变体，默认为当前环境支持的全部变体
+        draft: 草稿模式，同 render_diagram
+
+    Returns:
+        与 diagrams 顺序一致的 BuildResult 列表
+    """
+    diagrams = list(diagrams)
+    jobs = min(jobs or os.cpu_count() or 1, max(len(diagrams), 1))
+    # 进程与编码线程合起来不超过 CPU 核数
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    warm_up()
+
+    results = {}
+    if jobs == 1:
+        for diagram in diagrams:
+            results[diagram] = render_diagram(diagram, variants, draft, threads)
+            if on_result:
+                on_result(results[diagram])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=_pool_context(),
+                                 initializer=warm_up) as pool:
+            futures = {pool.submit(render_diagram, d, variants, draft, threads): d
+                       for d in diagrams}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if on_result:
+                    on_result(results[futures[future]])
+
+    return [results[d] for d in diagrams]
+
+
+def build_incremental(diagrams, jobs: int = None, force: bool = False,
+                      on_result=None, manifest: BuildManifest = None):
+    """
+    增量构建：只渲染缓存键变化、输出缺失或输出被改动过的配图，
+    并更新 source/_data/images.json 中这些配图的哈希文件名、尺寸与占位图
+
+    Args:
+        diagrams: Diagram 列表
+        jobs: 进程数，同 build_all
+        force: 为 True 时忽略缓存，全部重新渲染
+        on_result: 同 build_all
+        manifest: 构建清单，默认读取 .cache/diagrams/manifest.json
+
+    Returns:
+        (results, skipped)：本次渲染的 BuildResult 列表，以及因未变化而跳过的 Diagram 列表
+    """
+    manifest = manifest or BuildManifest()
+    keys = {d: input_key(d.script, build_settings()) for d in diagrams}
+    stale = [d for d in diagrams
+             if force or not manifest.is_fresh(d.output, output_paths(d), keys[d])]
+    skipped = [d for d in diagrams if d not in stale]
+
+    results = build_all(stale, jobs=jobs, on_result=on_result) if stale else []
+    artifacts = [a for r in results if r.ok for a in r.artifacts]
+    for result, diagram in zip(results, stale):
+        if result.ok:
+            manifest.record(diagram.output, result.artifacts, keys[diagram], result.fonts)
+    manifest.save()
+
+    # 本次渲染的输出已带有内容哈希与尺寸，清单不必再读回这些文件
+    images = ImageManifest()
+    images.refresh([d.output for d in diagrams],
+                   {r.output: r.placeholder for r in results if r.ok and r.placeholder},
+                   artifacts)
+    images.save()
+    return results, skipped
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于内容哈希的增量构建缓存
+
+每张配图的缓存键由以下输入的哈希组成：
+    - 绘图脚本本身
+    - 脚本导入的仓库内共享模块（递归解析 import）
+    - matplotlib 版本
+    - 输出设置（dpi、facecolor、bbox_inches、输出变体等）
+渲染时实际用到的字体文件另行记录哈希，每个输出文件也记录哈希，
+因此字体变化、输出被删除或被手动修改时都会触发重新渲染。
+"""
+
+import ast
+import hashlib
+import json
+from importlib import metadata
+from pathlib import Path
+
+from .discover import IMAGES_DIR, REPO_ROOT
+from .spec import is_spec
+
+CACHE_DIR = REPO_ROOT / '.cache' / 'diagrams'
+MANIFEST_PATH = CACHE_DIR / 'manifest.json'
+MANIFEST_VERSION = 2
+
+# 脚本导入 tools.diagrams.primitives 时会执行本包的 __init__.py，但它只是汇总导出，
+# 不应把整个构建工具都算作脚本的依赖（输出管线已通过 build_settings() 计入缓存键）
+_PACKAGE_INIT = (Path(__file__).parent / '__init__.py').resolve()
+
+# 描述文件由 spec.py 渲染，它（及其导入的图元库）就是描述文件的“脚本”
+_SPEC_ENGINE = (Path(__file__).parent / 'spec.py').resolve()
+
+
+def file_digest(path: Path) -> str:
+    """计算文件内容的 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _resolve_module(name: str, bases):
+    """在 bases 目录中查找模块 name 对应的源文件，找不到返回 None"""
+    parts = name.split('.')
+    for base in bases:
+        candidate = base.joinpath(*parts)
+        for path in (candidate.with_suffix('.py'), candidate / '__init__.py'):
+            if path.is_file():
+                return path
+    return None
+
+
+def _is_main_guard(node) -> bool:
+    """是否为 if __name__ == '__main__': 块"""
+    test = getattr(node, 'test', None)
+    return (isinstance(node, ast.If) and isinstance(test, ast.Compare)
+            and isinstance(test.left, ast.Name) and test.left.id == '__name__'
+            and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == '__main__')
+
+
+def _walk(tree):
+    """同 ast.walk，但跳过 __main__ 块：构建时不会执行其中的导入"""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if _is_main_guard(node):
+            continue
+        yield node
+        stack.extend(ast.iter_child_nodes(node))
+
+
+def _imported_files(path: Path):
+    """返回 path 直接导入的、位于仓库内的源文件"""
+    tree = ast.parse(path.read_bytes(), filename=str(path))
+    found = set()
+    for node in _walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+            bases = (path.parent, REPO_ROOT)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = path.parent
+                for _ in range(node.level - 1):
+                    base = base.parent
+                bases = (base,)
+            else:
+                bases = (path.parent, REPO_ROOT)
+            prefix = node.module or ''
+            # from pkg import name 中的 name 也可能是子模块
+            names = [prefix] + [f'{prefix}.{a.name}'.lstrip('.') for a in node.names]
+        else:
+            continue
+
+        for name in names:
+            if not name:
+                continue
+            # 导入 a.b.c 时 a/__init__.py 和 a/b/__init__.py 也会执行
+            parts = name.split('.')
+            for i in range(1, len(parts) + 1):
+                resolved = _resolve_module('.'.join(parts[:i]), bases)
+                if resolved is not None and resolved.resolve() != _PACKAGE_INIT:
+                    found.add(resolved.resolve())
+    return found
+
+
+def helper_files(script: Path):
+    """递归解析脚本依赖的仓库内共享模块，返回排序后的路径列表（不含脚本本身）"""
+    script = script.resolve()
+    seen = set()
+    pending = [script]
+    if is_spec(script):
+        seen.add(_SPEC_ENGINE)
+        pending = [_SPEC_ENGINE]
+    while pending:
+        for dep in _imported_files(pending.pop()):
+            if dep not in seen and dep != script:
+                seen.add(dep)
+                pending.append(dep)
+    return sorted(seen)
+
+
+def input_key(script: Path, settings: dict) -> str:
+    """计算配图输入（脚本、共享模块、matplotlib 版本、输出设置）的哈希"""
+    h = hashlib.sha256()
+    h.update(f'matplotlib={metadata.version("matplotlib")}\n'.encode())
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    for path in [script.resolve()] + helper_files(script):
+        try:
+            name = path.relative_to(REPO_ROOT).as_posix()
+        except ValueError:
+            name = path.as_posix()
+        h.update(f'\n{name}:{file_digest(path)}'.encode())
+    return h.hexdigest()
+
+
+class BuildManifest:
+    """
+    持久化的构建清单，记录每张配图的缓存键、所用字体和输出哈希
+
+    Args:
+        path: 清单文件路径，默认为 .cache/diagrams/manifest.json
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.diagrams = {}
+        self.fonts = {}
+        if self.path.is_file():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+            except ValueError:
+                data = {}
+            if data.get('version') == MANIFEST_VERSION:
+                self.diagrams = data.get('diagrams', {})
+                self.fonts = data.get('fonts', {})
+
+    @staticmethod
+    def _entry_name(output: Path) -> str:
+        return Path(output).resolve().relative_to(IMAGES_DIR).as_posix()
+
+    def font_digest(self, path: str):
+        """字体文件哈希，按 (大小, 修改时间) 缓存以免每次重新读取大字体文件"""
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        cached = self.fonts.get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        digest = file_digest(path)
+        self.fonts[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def is_fresh(self, output: Path, outputs, key: str) -> bool:
+        """
+        判断配图是否仍与输入一致，可以跳过渲染
+
+        Args:
+            output: 主输出路径，作为清单中的条目名
+            outputs: 本次应当存在的全部输出文件
+            key: 本次计算出的缓存键
+        """
+        entry = self.diagrams.get(self._entry_name(output))
+        if not entry or entry['key'] != key:
+            return False
+        if any(self.font_digest(p) != d for p, d in entry['fonts'].items()):
+            return False
+        recorded = entry['outputs']
+        for path in outputs:
+            name = self._entry_name(path)
+            if name not in recorded or not Path(path).is_file():
+                return False
+            if file_digest(path) != recorded[name]:
+                return False
+        return True
+
+    def record(self, output: Path, outputs, key: str, fonts):
+        """
+        渲染成功后记录本次的缓存键、所用字体和各输出文件的哈希
+
+        Args:
+            outputs: 输出文件路径，或带有 digest 的 export.Artifact（直接使用其哈希，不读文件）
+        """
+        digests = {}
+        for item in outputs:
+            path = getattr(item, 'path', item)
+            digests[self._entry_name(path)] = getattr(item, 'digest', None) or file_digest(path)
+        self.diagrams[self._entry_name(output)] = {
+            'key': key,
+            'fonts': {p: self.font_digest(p) for p in sorted(fonts)},
+            'outputs': digests,
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': MANIFEST_VERSION, 'diagrams': self.diagrams, 'fonts': self.fonts}
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False), encoding='utf-8')
+        tmp.replace(self.path)
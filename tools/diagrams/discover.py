@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配图脚本发现与加载
+
+通过 ast 静态解析脚本，无需导入 matplotlib 即可列出全部配图及其输出路径；
+真正渲染时再按路径导入模块，取出 build_figure()（分步动画为 build_animation()，见 animate.py）。
+声明式配图（<名称>.diagram.yaml 等，见 spec.py）同样在这里发现，Diagram.script 即描述文件。
+"""
+
+import ast
+import importlib.util
+from dataclasses import dataclass
+from pathlib import Path
+
+from .spec import SPEC_SUFFIXES, is_spec, load_spec
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+IMAGES_DIR = REPO_ROOT / 'source' / '_posts' / 'images'
+
+# 绘图脚本必须定义的函数名（二选一）
+ENTRY_POINT = 'build_figure'
+ANIMATION_ENTRY_POINT = 'build_animation'
+
+
+@dataclass(frozen=True)
+class Diagram:
+    """一张配图：生成它的脚本（或描述文件）和它的输出文件"""
+    script: Path
+    output: Path
+    animated: bool = False   # 脚本定义的是 build_animation()
+
+    @property
+    def name(self) -> str:
+        """配图的逻辑名，即输出文件名去掉扩展名（如 stack_frame）"""
+        return self.output.stem
+
+    @property
+    def is_spec(self) -> bool:
+        """是否由描述文件而不是脚本生成"""
+        return is_spec(self.script)
+
+
+def _parse_diagram(script: Path):
+    """静态解析脚本，是绘图脚本则返回 Diagram，否则返回 None"""
+    tree = ast.parse(script.read_bytes(), filename=str(script))
+
+    entries = set()
+    output = f'{script.stem}.png'
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in (ENTRY_POINT, ANIMATION_ENTRY_POINT):
+            entries.add(node.name)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if (isinstance(target, ast.Name) and target.id == 'OUTPUT'
+                        and isinstance(node.value, ast.Constant)):
+                    output = node.value.value
+
+    if not entries:
+        return None
+    return Diagram(script=script, output=script.parent / output,
+                   animated=ANIMATION_ENTRY_POINT in entries)
+
+
+def _parse_spec(path: Path) -> Diagram:
+    return Diagram(script=path, output=path.parent / load_spec(path).output)
+
+
+def sources(root: Path):
+    """root 下的全部绘图脚本与描述文件"""
+    paths = set(root.rglob('*.py'))
+    for suffix in SPEC_SUFFIXES:
+        paths.update(root.rglob(f'*{suffix}'))
+    return sorted(paths)
+
+
+def discover(root: Path = IMAGES_DIR, names=None):
+    """
+    查找 root 下的全部绘图脚本和配图描述文件
+
+    Args:
+        root: 搜索根目录，默认为 source/_posts/images
+        names: 可选，只保留逻辑名或脚本名在其中的配图
+
+    Returns:
+        按脚本路径排序的 Diagram 列表
+
+    Raises:
+        SyntaxError: 脚本无法解析
+        SpecError: 描述文件格式错误
+    """
+    diagrams = []
+    for script in sources(Path(root)):
+        diagram = _parse_spec(script) if is_spec(script) else _parse_diagram(script)
+        if diagram is None:
+            continue
+        if names and diagram.name not in names and script.name.split('.')[0] not in names:
+            continue
+        diagrams.append(diagram)
+    return diagrams
+
+
+def load_module(script: Path):
+    """按路径导入绘图脚本，返回模块对象（每次调用都重新执行脚本）"""
+    module_name = f'_diagram_{script.parent.name}_{script.stem}'
+    spec = importlib.util.spec_from_file_location(module_name, script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
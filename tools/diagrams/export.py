@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一次绘制、多种输出
+
+每张图的 Figure 只构建一次，然后：
+    - 每个倍率（1x/2x）只光栅化一次：savefig 写出 PNG 后，Agg 渲染器中
+      仍保留着同一份 RGBA 像素，WebP/AVIF 直接从这份像素编码，无需再次渲染；
+      PNG 也从这份像素重新编码并做体积优化（见 optimize.py）
+    - 矢量格式（SVG）单独 savefig 一次；svg.fonttype 为 'none' 时
+      把本图用到的字形子集内嵌进去（见 fonts.py），再去掉冗余、合并重复的图形与样式
+      （见 optimize.py），并写出预压缩的 .svg.gz/.svg.br，CDN 可直接返回
+    - bbox_inches='tight' 时只测量一次边界：savefig 的 tight 模式每次都要先完整
+      走一遍绘制来测量范围、再绘制一遍写出，每种输出各来一次。这里在 1x 分辨率下
+      只遍历 artist 测量一次（不实际绘制），之后各输出都以固定的边界写出，
+      每次只绘制一遍；2x 的画布也因此恰好是 1x 的两倍
+    - 光栅化后的像素以 NumPy 数组（直接引用 Agg 缓冲区，不拷贝）交给各编码阶段，
+      编码在线程池中并行执行（Pillow 与 zlib 编码时释放 GIL）；每个倍率的渲染器
+      是独立的对象，1x 的编码可以与 2x 的光栅化、SVG 的绘制同时进行
+    - 每个输出只写一次磁盘：写出时顺带在内存中计算内容哈希与像素尺寸，
+      记在 Artifact 上，构建缓存与图片清单直接使用，不再读回文件
+    - 深色变体（见 theme.py）复用同一个 Figure 与同一次测量的边界，只把颜色换成
+      深色后再光栅化一遍；深色只输出 WebP，额外耗时约为全部浅色输出的一成多
+当前 Pillow 不支持的编码（如较旧版本没有 AVIF）会被自动跳过。
+"""
+
+import gzip
+import hashlib
+import importlib.util
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+# 所有配图统一的保存参数（1x 基准）
+SAVE_KWARGS = dict(dpi=150, bbox_inches='tight', facecolor='white')
+
+# Pillow 编码参数：流程图配色平坦，WebP 无损通常已经比 PNG 小得多
+PIL_OPTIONS = {
+    'webp': dict(lossless=True, method=6),
+    'avif': dict(quality=85, speed=8),
+}
+
+RASTER_FORMATS = ('png', 'webp', 'avif', 'gif')
+
+# 预压缩的 SVG 旁路文件及其 Content-Encoding；.svg.br 需要可选依赖 brotli
+COMPRESSED_FORMATS = {'svg.gz': 'gzip', 'svg.br': 'br'}
+
+
+@dataclass
+class Artifact:
+    """一个写出的输出文件"""
+    path: Path
+    size: int
+    original_size: int = None   # 优化前的字节数，PNG 为无损编码的字节数（未做优化时为 None）
+    note: str = ''
+    digest: str = None          # 内容的 SHA-256，写出时在内存中计算
+    width: int = None           # 光栅输出的像素尺寸，矢量输出为 None
+    height: int = None
+
+
+@dataclass(frozen=True)
+class Variant:
+    """一种输出变体，如 2x 的 WebP"""
+    format: str
+    scale: int = 1
+    theme: str = 'light'
+
+    @property
+    def suffix(self) -> str:
+        theme = '' if self.theme == 'light' else f'.{self.theme}'
+        return theme + ('' if self.scale == 1 else f'@{self.scale}x')
+
+    @property
+    def is_raster(self) -> bool:
+        return self.format in RASTER_FORMATS
+
+
+# 深色主题的变体：支持 prefers-color-scheme 的浏览器都支持 WebP，不再输出 PNG/AVIF
+DARK_VARIANTS = (
+    Variant('webp', 1, 'dark'),
+    Variant('webp', 2, 'dark'),
+)
+
+VARIANTS = (
+    Variant('png', 1),
+    Variant('png', 2),
+    Variant('webp', 1),
+    Variant('webp', 2),
+    Variant('avif', 1),
+    Variant('avif', 2),
+    Variant('svg'),
+    Variant('svg.gz'),
+    Variant('svg.br'),
+    *DARK_VARIANTS,
+)
+
+# 分步动画（见 animate.py）的输出：APNG、动画 WebP 与 GIF，只输出 1x
+ANIMATION_VARIANTS = (
+    Variant('png'),
+    Variant('webp'),
+    Variant('gif'),
+)
+
+
+def supported(variant: Variant) -> bool:
+    """当前环境能否输出该变体"""
+    if variant.format in ('png', 'svg', 'gif', 'svg.gz'):
+        return True
+    if variant.format == 'svg.br':
+        return importlib.util.find_spec('brotli') is not None
+    from PIL import features
+    return bool(features.check(variant.format))
+
+
+def available_variants(variants=VARIANTS):
+    """过滤掉当前环境不支持的变体"""
+    return tuple(v for v in variants if supported(v))
+
+
+def variant_path(output: Path, variant: Variant) -> Path:
+    """变体的输出路径，如 stack_frame.png → stack_frame@2x.webp、stack_frame.dark@2x.webp"""
+    output = Path(output)
+    return output.with_name(f'{output.stem}{variant.suffix}.{variant.format}')
+
+
+def measure_tight_bbox(fig, dpi: float, pad_inches: float = None):
+    """
+    测量 fig 在 dpi 下的紧凑边界（英寸，已加内边距），与 savefig(bbox_inches='tight') 的测量相同
+
+    测量时关闭实际绘制，只遍历 artist 计算文字与图形的范围。
+    """
+    import matplotlib
+
+    original = fig.dpi
+    fig.dpi = dpi
+    try:
+        renderer = fig.canvas.get_renderer()
+        with getattr(renderer, '_draw_disabled', nullcontext)():
+            fig.draw(renderer)
+        bbox = fig.get_tightbbox(renderer)
+    finally:
+        fig.dpi = original
+    if pad_inches is None:
+        pad_inches = matplotlib.rcParams['savefig.pad_inches']
+    return bbox.padded(pad_inches)
+
+
+def _measures_once(fig) -> bool:
+    """能否只测量一次边界：Agg 画布，且版面已经固定（没有布局引擎或 tight_layout 留下的占位引擎）"""
+    from matplotlib.layout_engine import PlaceHolderLayoutEngine
+
+    engine = fig.get_layout_engine()
+    return (hasattr(fig.canvas, 'get_renderer')
+            and (engine is None or isinstance(engine, PlaceHolderLayoutEngine)))
+
+
+@contextmanager
+def _frozen_layout(fig):
+    """
+    暂时去掉 tight_layout 留下的占位布局引擎
+
+    只要 Figure 上有布局引擎，savefig 就会在写出前再做一次测量绘制，即使边界已经给定。
+    """
+    engine = fig.get_layout_engine()
+    if engine is None:
+        yield
+        return
+    fig.set_layout_engine(None)
+    try:
+        yield
+    finally:
+        fig.set_layout_engine(engine)
+
+
+def _write(path: Path, data: bytes, shape=None) -> Artifact:
+    """写出一个输出文件；shape 为光栅像素数组的形状 (高, 宽, ...)"""
+    path.write_bytes(data)
+    artifact = Artifact(path, len(data), digest=hashlib.sha256(data).hexdigest())
+    if shape is not None:
+        artifact.height, artifact.width = shape[:2]
+    return artifact
+
+
+class _InlineExecutor:
+    """与 ThreadPoolExecutor 接口相同，但在当前线程中立即执行（单线程时使用）"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def stage_executor(threads: int = None):
+    """
+    后处理阶段的执行器
+
+    Args:
+        threads: 线程数，默认为 CPU 核数；为 1 时在当前线程中依次执行
+    """
+    threads = (os.cpu_count() or 1) if threads is None else threads
+    if threads <= 1:
+        return _InlineExecutor()
+    return ThreadPoolExecutor(max_workers=threads, thread_name_prefix='diagram-stage')
+
+
+def _encode_raster(variant: Variant, rgba, dpi: float, path: Path, optimize: bool):
+    """把一个倍率的像素编码为一种光栅格式并写出（在线程池中执行）"""
+    from PIL import Image
+
+    import matplotlib.image
+
+    from .optimize import optimize_png
+    from .reproducible import SAVE_METADATA
+
+    if variant.format == 'png':
+        if not optimize:
+            # 与 savefig(format='png') 写出的字节相同
+            buf = io.BytesIO()
+            matplotlib.image.imsave(buf, rgba, format='png', dpi=dpi,
+                                    metadata=SAVE_METADATA['png'])
+            return _write(path, buf.getvalue(), rgba.shape)
+        # 报告中的“优化前”取 optimize_png 已经编码过的无损候选，不再单独编码一次
+        result = optimize_png(rgba)
+        artifact = _write(path, result.data, rgba.shape)
+        artifact.original_size = result.original_size
+        artifact.note = result.mode if result.lossless else \
+            f'{result.mode} 最大误差 {result.max_error}，平均 {result.mean_error:.2f}'
+        return artifact
+
+    # 每个任务各自包装一个零拷贝的 Image，Pillow 对象不在线程间共享
+    height, width = rgba.shape[:2]
+    image = Image.frombuffer('RGBA', (width, height), rgba, 'raw', 'RGBA', 0, 1)
+    encoded = io.BytesIO()
+    image.save(encoded, format=variant.format.upper(), **PIL_OPTIONS.get(variant.format, {}))
+    return _write(path, encoded.getvalue(), rgba.shape)
+
+
+def _compress(data: bytes, fmt: str) -> bytes:
+    """按旁路文件的格式预压缩（结果逐字节稳定）"""
+    if fmt == 'svg.gz':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    import brotli
+    return brotli.compress(data, quality=11)
+
+
+def _encode_vector(variants, data: bytes, output: Path, optimize: bool) -> dict:
+    """优化 SVG 并写出它和各预压缩旁路文件（在线程池中执行），返回 {路径: Artifact}"""
+    from .optimize import optimize_svg
+
+    original = len(data)
+    if optimize:
+        data = optimize_svg(data).data
+    artifacts = {}
+    for variant in variants:
+        path = variant_path(output, variant)
+        if variant.format in COMPRESSED_FORMATS:
+            artifact = _write(path, _compress(data, variant.format))
+            artifact.original_size = len(data)
+        else:
+            artifact = _write(path, data)
+            artifact.original_size = original if optimize else None
+        artifacts[path] = artifact
+    return artifacts
+
+
+def export_figure(fig, output: Path, variants=None, save_kwargs=None, optimize: bool = True,
+                  on_raster=None, measure_once: bool = True, timings=None, threads: int = None):
+    """
+    把同一个 Figure 写出为多种格式
+
+    Args:
+        fig: 已绘制完成的 Figure
+        output: 主输出路径（1x PNG），其余变体写在同目录下
+        variants: 要输出的变体，默认为当前环境支持的全部 VARIANTS
+        save_kwargs: savefig 参数，默认为 SAVE_KWARGS
+        optimize: 是否对 PNG 做调色板量化、去 alpha 和最高级别压缩，并精简 SVG
+        on_raster: 可选回调 on_raster(倍率, RGBA 数组)，浅色主题的每个倍率光栅化后调用一次，
+            数组直接引用渲染器缓冲区，只在回调期间有效
+        measure_once: bbox_inches='tight' 时是否只测量一次边界（见模块说明）；
+            为 False 时每种输出都由 savefig 各自测量
+        timings: 可选的 timing.Timings，累计 layout、rasterize、vector、encode 各阶段耗时；
+            encode 为各编码任务耗时之和
+        threads: 编码线程数，同 stage_executor
+
+    Returns:
+        Artifact 列表，按 variants 顺序排列
+    """
+    import matplotlib
+
+    from .fonts import embed_svg_fonts
+    from .reproducible import SAVE_METADATA
+    from .theme import FACECOLORS, THEMES, themed
+    from .timing import Timings
+
+    variants = available_variants(VARIANTS) if variants is None else variants
+    save_kwargs = dict(SAVE_KWARGS if save_kwargs is None else save_kwargs)
+    base_dpi = save_kwargs.pop('dpi')
+    timings = Timings() if timings is None else timings
+
+    def timed(fn, *args):
+        with timings.measure('encode'):
+            return fn(*args)
+
+    frozen = nullcontext()
+    if measure_once and save_kwargs.get('bbox_inches') == 'tight' and _measures_once(fig):
+        with timings.measure('layout'):
+            save_kwargs['bbox_inches'] = measure_tight_bbox(fig, base_dpi,
+                                                            save_kwargs.pop('pad_inches', None))
+        frozen = _frozen_layout(fig)
+
+    futures = {}
+    passes = sorted({(THEMES.index(v.theme), v.scale) for v in variants if v.is_raster})
+    previous = (None, [])
+    with frozen, stage_executor(threads) as executor:
+        for theme, scale in ((THEMES[t], s) for t, s in passes):
+            dpi = base_dpi * scale
+            # 只光栅化不编码：raw 格式直接拷出 Agg 缓冲区，渲染器里保留同一份像素。
+            # 不同倍率的 dpi 不同，Agg 画布会新建渲染器，上一倍率的缓冲区仍由编码任务持有；
+            # 与上一遍 dpi 相同时画布会复用渲染器、覆盖缓冲区，须先等上一遍的编码完成
+            if previous[0] == dpi:
+                for future in previous[1]:
+                    future.exception()
+            kwargs = dict(save_kwargs)
+            if theme != 'light':
+                kwargs['facecolor'] = FACECOLORS[theme]
+            with timings.measure('rasterize'), themed(fig, theme):
+                fig.savefig(io.BytesIO(), format='raw', dpi=dpi, **kwargs)
+            rgba = np.asarray(fig.canvas.renderer.buffer_rgba())
+            if on_raster and theme == 'light':
+                on_raster(scale, rgba)
+            submitted = []
+            for variant in variants:
+                if (variant.theme, variant.scale) == (theme, scale) and variant.is_raster:
+                    path = variant_path(output, variant)
+                    futures[path] = executor.submit(timed, _encode_raster, variant, rgba, dpi,
+                                                    path, optimize)
+                    submitted.append(futures[path])
+            previous = (dpi, submitted)
+
+        # SVG 需要 matplotlib 绘制，留在当前线程，与上面的编码任务同时进行；
+        # .svg 与预压缩的旁路文件共用同一次绘制和优化
+        vectors = [v for v in variants if not v.is_raster]
+        if vectors:
+            buf = io.BytesIO()
+            with timings.measure('vector'):
+                fig.savefig(buf, format='svg', dpi=base_dpi, metadata=SAVE_METADATA['svg'],
+                            **save_kwargs)
+            with timings.measure('encode'):
+                data = buf.getvalue()
+                if matplotlib.rcParams['svg.fonttype'] == 'none':
+                    data = embed_svg_fonts(data, fig)
+            future = executor.submit(timed, _encode_vector, vectors, data, output, optimize)
+            for variant in vectors:
+                futures[variant_path(output, variant)] = future
+
+        artifacts = {}
+        for path, future in futures.items():
+            result = future.result()
+            artifacts[path] = result[path] if isinstance(result, dict) else result
+
+    # 矢量输出与 1x PNG 的体积对比，显示在构建报告中
+    # SVG 比 1x PNG 大时不列入 images.json（见 assets.ImageManifest.refresh）
+    png = artifacts.get(variant_path(output, Variant('png')))
+    if png is not None:
+        svg = artifacts.get(variant_path(output, Variant('svg')))
+        larger = svg is not None and svg.size > png.size
+        for variant in vectors:
+            artifact = artifacts[variant_path(output, variant)]
+            artifact.note = f'为 1x PNG 的 {artifact.size / png.size:.0%}'
+            if larger:
+                artifact.note += '，SVG 大于 PNG，不列入 images.json'
+
+    return [artifacts[variant_path(output, v)] for v in variants]
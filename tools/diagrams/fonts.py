@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仓库内置的中文字体
+
+过去每个脚本按操作系统猜字体（PingFang SC、SimHei、Microsoft YaHei……），
+CI 和其他机器上往往一个都没有，渲染出来全是方块，不同机器的输出也不一致。
+现在仓库自带 Noto Sans CJK SC（SIL OFL 1.1）Regular 与 Bold 两个字重的子集，
+放在 tools/diagrams/fonts：
+    - 渲染前直接用 fontManager.addfont() 注册这两个文件，不扫描、也不依赖系统字体；
+      fontweight='bold' 的文字使用 Bold，缺少某个字重时 matplotlib 会照常告警
+    - 子集覆盖 GB2312 全部汉字、常用符号以及所有配图脚本中出现的字符，
+      每个字重约 3 MB（完整字体 16 MB）；由 python -m tools.diagrams fonts 从完整字体生成
+    - SVG 中文字保留为 <text>，按每张图实际用到的字符再做一次子集，
+      以 WOFF 内嵌到 @font-face 中，通常只有几 KB；PDF 使用 Type 42，
+      matplotlib 写出时会自行子集化
+脚本中出现子集里没有的字符时构建直接失败，而不是悄悄画出方块。
+"""
+
+import base64
+import io
+import re
+from functools import lru_cache
+from pathlib import Path
+
+FONTS_DIR = Path(__file__).parent / 'fonts'
+FONT_SUFFIXES = ('.otf', '.ttf')
+
+FONT_FAMILY = 'Noto Sans CJK SC'
+
+# 与 reproducible.PINNED_RCPARAMS 一起在每张图渲染前生效
+FONT_RCPARAMS = {
+    'font.family': ['sans-serif'],
+    'font.sans-serif': [FONT_FAMILY, 'DejaVu Sans'],
+    # 等宽字体（代码片段）中的中文回退到内置字体
+    'font.monospace': ['DejaVu Sans Mono', FONT_FAMILY],
+    'axes.unicode_minus': False,
+    'pdf.fonttype': 42,
+    'ps.fonttype': 42,
+}
+
+# 内置子集覆盖的字符：GB2312 之外的 Unicode 区段
+CHARSET_RANGES = (
+    (0x0020, 0x007E),   # ASCII
+    (0x00A0, 0x00FF),   # Latin-1
+    (0x2000, 0x206F),   # 通用标点
+    (0x2190, 0x21FF),   # 箭头
+    (0x2200, 0x22FF),   # 数学运算符
+    (0x2500, 0x25FF),   # 制表符、几何图形
+    (0x3000, 0x303F),   # CJK 标点
+    (0xFF00, 0xFFEF),   # 全角字符
+)
+
+
+def bundled_fonts():
+    """仓库内置的字体文件"""
+    if not FONTS_DIR.is_dir():
+        return []
+    return sorted(p for p in FONTS_DIR.iterdir() if p.suffix.lower() in FONT_SUFFIXES)
+
+
+_registered = set()
+
+
+def register_fonts():
+    """把内置字体注册到 matplotlib（每个进程只注册一次，fork 出的子进程直接继承）"""
+    from matplotlib import font_manager
+
+    for path in bundled_fonts():
+        if path not in _registered:
+            font_manager.fontManager.addfont(path)
+            _registered.add(path)
+
+
+def gb2312_chars():
+    """GB2312 字符集中的全部字符"""
+    chars = set()
+    for high in range(0xA1, 0xF8):
+        for low in range(0xA1, 0xFF):
+            try:
+                chars.add(bytes((high, low)).decode('gb2312'))
+            except UnicodeDecodeError:
+                pass
+    return chars
+
+
+def script_chars(root: Path = None):
+    """所有配图脚本和描述文件中出现的非 ASCII 字符"""
+    from .discover import IMAGES_DIR, sources
+
+    chars = set()
+    for script in sources(Path(root or IMAGES_DIR)):
+        chars.update(c for c in script.read_text(encoding='utf-8') if ord(c) > 0x7F)
+    return chars
+
+
+def bundled_charset():
+    """内置字体子集应覆盖的字符"""
+    chars = gb2312_chars() | script_chars()
+    for first, last in CHARSET_RANGES:
+        chars.update(chr(c) for c in range(first, last + 1))
+    return chars
+
+
+def _normalize_names(font):
+    """
+    把 nameID 1/2 改为排版族名/子族名（Noto Sans CJK SC / Bold），
+    这样各字重同属一个字体族，matplotlib 才能按 fontweight 选中粗体文件
+    """
+    name = font['name']
+    family = name.getDebugName(16) or name.getDebugName(1)
+    subfamily = name.getDebugName(17) or name.getDebugName(2)
+    for record in list(name.names):
+        if record.nameID in (16, 17):
+            name.removeNames(nameID=record.nameID)
+    name.setName(family, 1, 3, 1, 0x409)
+    name.setName(family, 1, 1, 0, 0)
+    name.setName(subfamily, 2, 3, 1, 0x409)
+    name.setName(subfamily, 2, 1, 0, 0)
+
+
+def subset_bundled(source: Path, output_dir: Path = FONTS_DIR, chars=None) -> Path:
+    """
+    从完整字体生成内置子集
+
+    Args:
+        source: 完整字体文件，如 NotoSansCJKsc-Bold.otf
+        output_dir: 输出目录，默认为 tools/diagrams/fonts
+        chars: 要保留的字符，默认为 bundled_charset()
+
+    Returns:
+        写出的子集路径（与源文件同名）
+    """
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.name_IDs = ['*']
+    options.name_languages = ['*']
+    options.notdef_outline = True
+    options.hinting = False   # 渲染时统一使用 FreeType 自动微调
+
+    font = TTFont(source, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=''.join(sorted(chars or bundled_charset())))
+    subsetter.subset(font)
+    _normalize_names(font)
+
+    output = Path(output_dir) / Path(source).name
+    output.parent.mkdir(parents=True, exist_ok=True)
+    font.save(output)
+    return output
+
+
+def _font_entries():
+    """{字体文件路径: FontEntry}"""
+    from matplotlib import font_manager
+
+    entries = {}
+    for entry in font_manager.fontManager.ttflist:
+        # addfont() 还会追加别名条目，以第一个（主名称）为准
+        entries.setdefault(Path(entry.fname).resolve(), entry)
+    return entries
+
+
+@lru_cache(maxsize=None)
+def _cmap(path: Path):
+    from matplotlib import ft2font
+    return frozenset(ft2font.FT2Font(str(path)).get_charmap())
+
+
+def font_usage(fig):
+    """
+    统计 fig 中每个字体文件实际负责绘制的字符
+
+    matplotlib 对每个字符按字体回退列表依次查找，这里用同样的顺序分配。
+
+    Returns:
+        ({字体文件路径: 字符集合}, 所有字体都没有的字符集合)
+    """
+    from matplotlib import font_manager
+    from matplotlib.text import Text
+
+    usage, missing = {}, set()
+    for text in fig.findobj(Text):
+        content = text.get_text()
+        if not content or not text.get_visible():
+            continue
+        paths = [Path(p).resolve() for p in
+                 font_manager.fontManager._find_fonts_by_props(text.get_fontproperties())]
+        for char in set(content) - {'\n', '\r', '\t'}:
+            for path in paths:
+                if ord(char) in _cmap(path):
+                    usage.setdefault(path, set()).add(char)
+                    break
+            else:
+                missing.add(char)
+    return usage, missing
+
+
+def check_glyphs(fig):
+    """图中有字体无法显示的字符时抛出 ValueError"""
+    _, missing = font_usage(fig)
+    if missing:
+        raise ValueError(
+            f'内置字体中缺少这些字符: {"".join(sorted(missing))}\n'
+            f'请用 python -m tools.diagrams fonts <完整字体文件> 重新生成字体子集')
+
+
+@lru_cache(maxsize=256)
+def subset_woff(path: Path, chars: str) -> bytes:
+    """
+    把字体子集化为只含 chars 的 WOFF（结果逐字节稳定）
+
+    在 textcache.text_cache() 上下文中时，结果按字体内容与字符集存入持久文字缓存。
+    """
+    from fontTools import version as fonttools_version
+
+    from .textcache import active_cache, font_digest
+
+    cache = active_cache()
+    if cache is None:
+        return _subset_woff(path, chars)
+    key = (font_digest(path), chars, fonttools_version, _source_digest())
+    data = cache.lookup('woff', key, bytes)
+    if data is None:
+        data = _subset_woff(path, chars)
+        cache.store('woff', key, data, data)
+    return data
+
+
+@lru_cache(maxsize=None)
+def _source_digest() -> str:
+    """本文件的哈希：子集化选项变化后旧的缓存条目不再命中"""
+    from .cache import file_digest
+    return file_digest(Path(__file__))
+
+
+def _subset_woff(path: Path, chars: str) -> bytes:
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.flavor = 'woff'
+    options.hinting = False
+    options.layout_features = []
+    options.name_IDs = [0, 1, 2, 13, 14]   # 保留版权与许可证信息
+    # SVG 的 <text> 只做横排、不做字形替换，这些表都用不到
+    options.drop_tables += ['GSUB', 'GPOS', 'GDEF', 'BASE', 'VORG', 'vhea', 'vmtx', 'FFTM']
+
+    font = TTFont(path, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=chars)
+    subsetter.subset(font)
+    # options.flavor 只对 subset.save_font() 生效，直接 save 时要设在字体对象上
+    font.flavor = options.flavor
+    buf = io.BytesIO()
+    font.save(buf)
+    return buf.getvalue()
+
+
+def font_face_css(fig) -> str:
+    """为 fig 生成 @font-face 规则，每个字体只内嵌本图用到的字形"""
+    entries = _font_entries()
+    usage, _ = font_usage(fig)
+    rules = []
+    for path in sorted(usage):
+        entry = entries.get(path)
+        if entry is None:
+            continue
+        data = base64.b64encode(subset_woff(path, ''.join(sorted(usage[path])))).decode('ascii')
+        rules.append(f"@font-face{{font-family:'{entry.name}';font-style:{entry.style};"
+                     f"font-weight:{entry.weight};"
+                     f"src:url(data:font/woff;base64,{data}) format('woff')}}")
+    return ''.join(rules)
+
+
+_STYLE_TAG = re.compile(rb'<style type="text/css">')
+
+
+def embed_svg_fonts(svg: bytes, fig) -> bytes:
+    """把 font_face_css() 插入 matplotlib 写出的 SVG（svg.fonttype='none'）的样式表"""
+    css = font_face_css(fig)
+    if not css:
+        return svg
+    return _STYLE_TAG.sub(lambda m: m.group(0) + css.encode('ascii'), svg, count=1)
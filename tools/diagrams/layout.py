@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+栈/堆对象图的自动布局
+
+circular_reference.py 等脚本中每个节点的坐标都是手工摆放的，节点一多就难以维护。
+这里输入一张由栈变量、堆对象和指针边组成的图，自动计算节点位置与箭头走向：
+栈变量在上方一行（栈色带），堆对象在下方按层排列（堆色带），与 draw_memory_regions
+的上下分区一致。全部计算基于 NumPy 数组，几百个节点也只需几毫秒：
+    - 分层：从栈变量出发沿指针做广度优先搜索，堆对象按距离分层；栈变量够不到的对象
+      （如泄漏的环）从编号最小者起另开一组，继续向下排列
+    - 换行：各层普遍很窄时（链表、环）把相邻的几层并入同一行，不会排成一整列；
+      超过 max_columns 个节点的行折成多行
+    - 排序：按相邻行中邻居的平均横坐标（重心法）来回扫描几遍，减少交叉
+    - 去重叠：每行按重心给出期望位置，再用累积最大值一次性推开相互重叠的节点
+    - 走线：向下的边从节点底部连到目标顶部，向上的边反之，同一行的边走左右两侧；
+      互相指向的一对边（如 shared_ptr 与 weak_ptr）错开，跨过中间节点的边加弧度绕开
+本模块只做几何计算，不依赖 matplotlib；绘制见 spec.py 的 graph 图元。
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class GraphNode:
+    """图中的一个节点"""
+    name: str
+    kind: str = 'heap'    # 'stack' 或 'heap'
+    size: tuple = None    # (宽, 高)，默认为 layout_graph 的 node_size
+
+
+@dataclass(frozen=True)
+class GraphLayout:
+    """
+    布局结果，坐标均为数据坐标
+
+    Attributes:
+        names: 节点名，顺序与输入一致
+        xy: (n, 2) 各节点左下角
+        size: (n, 2) 各节点宽高
+        row: (n,) 各节点所在行，0 为栈变量所在行
+        starts, ends: (e, 2) 各条边的起点与终点（已落在节点边框上）
+        rads: (e,) 各条边的弧度（同 connectionstyle='arc3,rad=...'）
+        stack_band, heap_band: 栈、堆色带的 (左下角, (宽, 高))
+    """
+    names: tuple
+    xy: np.ndarray
+    size: np.ndarray
+    row: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+    rads: np.ndarray
+    stack_band: tuple
+    heap_band: tuple
+
+    def box(self, name: str):
+        """节点的 (左下角, (宽, 高))"""
+        i = self.names.index(name)
+        return tuple(self.xy[i]), tuple(self.size[i])
+
+    @property
+    def bounds(self):
+        """两条色带合起来的 (x0, y0, x1, y1)"""
+        (sx, sy), (sw, sh) = self.stack_band
+        (hx, hy), (hw, hh) = self.heap_band
+        return min(sx, hx), min(sy, hy), max(sx + sw, hx + hw), max(sy + sh, hy + hh)
+
+
+def _layers(src, dst, is_stack):
+    """
+    按到栈变量的距离分层：栈变量为第 0 层，其余节点为广度优先搜索的层数；
+    够不到的节点从编号最小者起另开一组，层数接在已有层之后
+    """
+    n = len(is_stack)
+    layer = np.full(n, -1)
+    layer[is_stack] = 0
+    frontier = is_stack.copy()
+    depth = 0
+    while (layer < 0).any():
+        if not frontier.any():
+            # 剩下的节点都够不到：取编号最小者作为新的起点
+            seed = np.flatnonzero(layer < 0)[0]
+            depth += 1
+            layer[seed] = depth
+            frontier = np.zeros(n, dtype=bool)
+            frontier[seed] = True
+        step = np.zeros(n, dtype=bool)
+        step[dst[frontier[src]]] = True
+        step &= layer < 0
+        if step.any():
+            depth += 1
+            layer[step] = depth
+        frontier = step
+    return layer
+
+
+def _preorder(n, src, dst, is_stack):
+    """深度优先的先序编号：从栈变量出发（其次按编号），沿边的声明顺序前进，链上的节点编号连续"""
+    successors = [[] for _ in range(n)]
+    for a, b in zip(src.tolist(), dst.tolist()):
+        successors[a].append(b)
+    number = np.full(n, -1)
+    count = 0
+    for root in np.r_[np.flatnonzero(is_stack), np.flatnonzero(~is_stack)].tolist():
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if number[node] >= 0:
+                continue
+            number[node] = count
+            count += 1
+            stack.extend(reversed(successors[node]))
+    return number
+
+
+def _rows(layer, is_stack, max_columns, preorder):
+    """
+    把层折成行：层普遍很窄时（链表、环）把相邻的几层并入同一行，使图接近方形；
+    并行后仍超过 max_columns 个节点的行再拆成多行
+
+    并入同一行的各层按深度优先的先序排列，使链上相邻的节点在行内也相邻。
+
+    Returns:
+        (行号, 初始顺序, 是否位于合并行)：初始顺序为按行排列的节点下标
+    """
+    n = len(layer)
+    index = np.arange(n)
+    sizes = np.bincount(layer[~is_stack])[1:]
+    width = np.median(sizes[sizes > 0]) if (sizes > 0).any() else 1
+    per_row = max(1, int(max_columns // max(width, 1)))
+    group = np.where(is_stack, 0, (layer - 1) // per_row + 1)
+
+    # 不合并时按 (层, 编号) 排列，合并时按先序排列
+    order = np.lexsort((index, layer if per_row == 1 else preorder, group))
+    g = group[order]
+    first = np.r_[True, g[1:] != g[:-1]]
+    rank = index - np.maximum.accumulate(np.where(first, index, 0))
+    # 每组占 ceil(组内节点数 / max_columns) 行，依次向下排
+    count = np.bincount(g)
+    span = -(-count // max_columns)
+    offset = np.r_[0, np.cumsum(span)[:-1]]
+    rows = np.empty(n, dtype=int)
+    rows[order] = offset[g] + rank // max_columns
+    return rows, order, np.full(n, per_row > 1) & ~is_stack
+
+
+def _pack(order, rows, width, gap):
+    """按顺序在每行内紧密排列，返回各节点中心的横坐标（每行居中于 0）"""
+    x = np.empty(len(order))
+    w = width[order]
+    r = rows[order]
+    ends = np.cumsum(w + gap)
+    # 每行的累积宽度从 0 开始：减去该行第一个节点之前的累积量
+    first = np.r_[True, r[1:] != r[:-1]]
+    offset = np.maximum.accumulate(np.where(first, ends - w - gap, 0))
+    right = ends - offset - gap
+    total = np.zeros(rows.max() + 1)
+    np.maximum.at(total, r, right)
+    x[order] = right - w / 2 - total[r] / 2
+    return x
+
+
+def _barycenter(x, rows, src, dst, fallback):
+    """各节点在其他行中的邻居的平均横坐标；没有这样的邻居时取 fallback"""
+    other = rows[src] != rows[dst]
+    a, b = src[other], dst[other]
+    n = len(x)
+    total = np.bincount(a, weights=x[b], minlength=n) + np.bincount(b, weights=x[a], minlength=n)
+    count = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+    return np.where(count > 0, total / np.maximum(count, 1), fallback)
+
+
+def _spread(x, order, rows, width, gap):
+    """
+    保持每行内的顺序，把各节点从期望位置 x 推开到互不重叠（离期望位置尽量近）
+
+    对排好序的一行，节点 i 至少要在 i-1 右侧 (w[i-1] + w[i]) / 2 + gap 处；
+    记 c 为这一间距的累积和，则 x[i] = c[i] + max(x[j] - c[j], j <= i)，
+    各行首尾相接后用一次 maximum.accumulate 完成，行与行之间用足够大的偏移隔开。
+    """
+    xs, w, r = x[order], width[order], rows[order]
+    step = np.r_[0, (w[1:] + w[:-1]) / 2 + gap]
+    first = np.r_[True, r[1:] != r[:-1]]
+    step[first] = 0
+    c = np.cumsum(step)
+    c -= np.maximum.accumulate(np.where(first, c, -np.inf))
+    span = (np.abs(xs).max() + c.max() + 1) * 4
+    pushed = np.maximum.accumulate(xs - c + r * span) - r * span + c
+    # 整行平移，使推开后的平均位置与期望位置一致，避免整体向右漂移
+    shift = np.bincount(r, weights=pushed - xs) / np.bincount(r)
+    out = np.empty_like(x)
+    out[order] = pushed - shift[r]
+    return out
+
+
+def _route(xy, size, rows, slot, src, dst):
+    """计算各条边在节点边框上的起止点与弧度"""
+    center = xy + size / 2
+    n_edges = len(src)
+    starts, ends = center[src].copy(), center[dst].copy()
+    if n_edges == 0:
+        return starts, ends, np.zeros(0)
+    down = rows[dst] > rows[src]
+    up = rows[dst] < rows[src]
+    side = ~(down | up)
+    right = center[dst, 0] >= center[src, 0]
+
+    half_w, half_h = size[:, 0] / 2, size[:, 1] / 2
+    starts[:, 1] += np.where(down, -half_h[src], np.where(up, half_h[src], 0))
+    ends[:, 1] += np.where(down, half_h[dst], np.where(up, -half_h[dst], 0))
+    starts[:, 0] += np.where(side, np.where(right, half_w[src], -half_w[src]), 0)
+    ends[:, 0] += np.where(side, np.where(right, -half_w[dst], half_w[dst]), 0)
+
+    # 互相指向的一对边错开：竖直方向的边左右错开，同一行的边上下错开
+    key = src.astype(np.int64) * (len(xy) + 1) + dst
+    reverse = dst.astype(np.int64) * (len(xy) + 1) + src
+    paired = np.isin(reverse, key) & (src != dst)
+    sign = np.where(src < dst, 1.0, -1.0)
+    shift_x = np.where(paired & ~side, sign * size[src, 0] / 5, 0)
+    shift_y = np.where(paired & side, sign * size[src, 1] / 5, 0)
+    starts += np.column_stack([shift_x, shift_y])
+    ends += np.column_stack([np.where(paired & ~side, sign * size[dst, 0] / 5, 0),
+                             np.where(paired & side, sign * size[dst, 1] / 5, 0)])
+
+    # 同一行中跨过其他节点的边向上拱起，绕开中间的节点
+    skip = side & (np.abs(slot[dst] - slot[src]) > 1)
+    rads = np.where(skip, np.where(right, 0.3, -0.3), 0.0)
+    return starts, ends, rads
+
+
+def layout_graph(nodes, edges=(), *, node_size=(1.8, 1.2), gap=(0.8, 1.0), max_columns=None,
+                 origin=(0.0, 0.0), padding=0.4, label_space=0.6, sweeps=4) -> GraphLayout:
+    """
+    计算栈/堆对象图的布局
+
+    Args:
+        nodes: GraphNode 列表（或 (名称, 种类) 元组）
+        edges: [(起点名, 终点名), ...]
+        node_size: 默认的节点宽高
+        gap: (同一行节点的水平间距, 行距)
+        max_columns: 每行最多的节点数，默认约为堆节点数的平方根（至少 4）
+        origin: 堆色带的左下角
+        padding: 色带与节点之间的留白
+        label_space: 色带顶部给区域标签留出的高度
+        sweeps: 重心法排序的扫描次数
+
+    Returns:
+        GraphLayout
+
+    Raises:
+        ValueError: 节点名重复、种类未知或边引用了不存在的节点
+    """
+    nodes = [node if isinstance(node, GraphNode) else GraphNode(*node) for node in nodes]
+    names = tuple(node.name for node in nodes)
+    index = {name: i for i, name in enumerate(names)}
+    if len(index) != len(names):
+        raise ValueError('节点名重复')
+    unknown = {node.kind for node in nodes} - {'stack', 'heap'}
+    if unknown:
+        raise ValueError(f'未知的节点种类: {", ".join(sorted(unknown))}')
+    missing = {name for edge in edges for name in edge[:2] if name not in index}
+    if missing:
+        raise ValueError(f'边引用了不存在的节点: {", ".join(sorted(missing))}')
+
+    n = len(nodes)
+    size = np.array([node.size or node_size for node in nodes], dtype=float).reshape(n, 2)
+    is_stack = np.array([node.kind == 'stack' for node in nodes], dtype=bool)
+    src = np.array([index[a] for a, b, *_ in edges], dtype=int)
+    dst = np.array([index[b] for a, b, *_ in edges], dtype=int)
+    gap_x, gap_y = gap
+    if max_columns is None:
+        max_columns = max(4, math.ceil(math.sqrt(max(n - is_stack.sum(), 1))))
+
+    if n == 0:
+        empty = np.zeros((0, 2))
+        band = ((origin[0], origin[1]), (0.0, 0.0))
+        return GraphLayout((), empty, empty, np.zeros(0, dtype=int), empty, empty,
+                           np.zeros(0), band, band)
+
+    rows, order, merged = _rows(_layers(src, dst, is_stack), is_stack, max_columns,
+                                _preorder(n, src, dst, is_stack))
+    width = size[:, 0]
+    # 栈变量保持声明顺序，合并行保持先序，其余各行参与重心法排序
+    fixed = is_stack | merged
+
+    x = _pack(order, rows, width, gap_x)
+    for _ in range(sweeps):
+        key = np.where(fixed, x, _barycenter(x, rows, src, dst, x))
+        order = np.lexsort((x, key, rows))
+        x = _pack(order, rows, width, gap_x)
+    # 向邻居靠拢再推开重叠，保持行内顺序
+    for _ in range(2):
+        x = _spread(np.where(fixed, x, _barycenter(x, rows, src, dst, x)),
+                    order, rows, width, gap_x)
+    slot = np.empty(n, dtype=int)
+    first = np.r_[True, rows[order][1:] != rows[order][:-1]]
+    starts_at = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+    slot[order] = np.arange(n) - starts_at
+
+    # 纵坐标：自上而下逐行排列，栈与堆之间多留出两条色带的留白
+    n_rows = rows.max() + 1
+    height = np.zeros(n_rows)
+    np.maximum.at(height, rows, size[:, 1])
+    stack_rows = rows[is_stack].max() + 1 if is_stack.any() else 0
+    row_gap = np.full(n_rows, gap_y)
+    if 0 < stack_rows < n_rows:
+        row_gap[stack_rows] = 2 * padding + label_space
+    top = -np.cumsum(np.r_[0, height[:-1]] + np.r_[0, row_gap[1:]])
+    y = top[rows] - height[rows] / 2 - size[:, 1] / 2
+
+    xy = np.column_stack([x - width / 2, y])
+    left, right = xy[:, 0].min() - padding, (xy[:, 0] + width).max() + padding
+    heap = ~is_stack
+
+    def band(mask):
+        if not mask.any():
+            return (left, 0.0), (right - left, 0.0)
+        y0 = xy[mask, 1].min() - padding
+        y1 = (xy[mask, 1] + size[mask, 1]).max() + padding + label_space
+        return (left, y0), (right - left, y1 - y0)
+
+    heap_band, stack_band = band(heap), band(is_stack)
+    shift = np.array(origin, dtype=float) - np.array([left, heap_band[0][1]])
+    xy = xy + shift
+
+    def moved(b):
+        (bx, by), extent = b
+        return (float(bx + shift[0]), float(by + shift[1])), tuple(float(v) for v in extent)
+
+    starts, ends, rads = _route(xy, size, rows, slot, src, dst)
+    return GraphLayout(names, xy, size, rows, starts, ends, rads, moved(stack_band),
+                       moved(heap_band))
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PNG 与 SVG 体积优化
+
+配图都是少量平坦色块加抗锯齿文字，matplotlib 默认写出 32 位 RGBA、默认压缩级别的 PNG。
+这里直接从内存中的 RGBA 像素出发：
+    1. alpha 通道全不透明（facecolor='white'）时去掉 alpha
+    2. 颜色数不超过 256 时无损转为调色板；否则依次尝试各量化算法，
+       与原始像素逐像素比对，第一个误差在容差内的即被采用，其余算法不再尝试
+    3. 以最高压缩级别重新编码，取最小的结果
+
+matplotlib 写出的 SVG 每个 artist 都包一层带 id 的 <g>，坐标保留六位小数，每个元素都重复
+同样的 clip-path 与 style。optimize_svg() 在不改变绘制结果的前提下：
+    1. 去掉 <metadata>、没有被引用的 id、由此变成空壳的 <g>，以及 rotate(-0 ...) 这样的空变换
+    2. 坐标按 SVG_PRECISION 位小数取整，路径数据去掉多余的空格
+    3. 平移后形状相同的路径（同尺寸的方框、箭头）只在 <defs> 中保留一份，各处改为 <use>
+    4. 相邻元素相同的 clip-path 提到一个公共的 <g> 上，重复的 style 合并为 CSS 类
+文字在 svg.fonttype='none' 下本来就是 <text>，字形以子集字体内嵌一次（见 fonts.py），
+不需要再去重。
+"""
+
+import io
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+# 量化的像素级容差（0-255 的单通道绝对误差）
+MAX_CHANNEL_ERROR = 16     # 任一像素任一通道的最大误差
+MEAN_CHANNEL_ERROR = 1.0   # 全图平均误差
+
+# 依次尝试的量化算法：MAXCOVERAGE 对平坦色块的最大误差最小
+_QUANTIZERS = (Image.Quantize.MAXCOVERAGE, Image.Quantize.MEDIANCUT, Image.Quantize.FASTOCTREE)
+
+
+@dataclass
+class OptimizedPNG:
+    """优化结果"""
+    data: bytes
+    mode: str              # 最终的 PNG 颜色模式：P / RGB / RGBA
+    lossless: bool         # 是否与原图逐像素一致
+    max_error: int = 0
+    mean_error: float = 0.0
+    original_size: int = 0   # 无损候选（最高压缩级别）的字节数，供构建报告比较
+
+
+def _encode(image: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format='PNG', optimize=True, compress_level=9)
+    return buf.getvalue()
+
+
+def pixel_error(reference: np.ndarray, candidate: np.ndarray):
+    """返回 (最大单通道误差, 平均单通道误差)"""
+    diff = np.abs(reference.astype(np.int16) - candidate.astype(np.int16))
+    return int(diff.max(initial=0)), float(diff.mean()) if diff.size else 0.0
+
+
+def _quantize(image: Image.Image, pixels: np.ndarray):
+    """
+    尝试把 image 量化到 256 色，返回第一个满足容差的 (调色板图, 最大误差, 平均误差)，
+    都不满足时返回 None；只有被采用的结果才会编码
+    """
+    methods = _QUANTIZERS if image.mode == 'RGB' else (Image.Quantize.FASTOCTREE,)
+    for method in methods:
+        quantized = image.quantize(256, method=method, dither=Image.Dither.NONE)
+        max_error, mean_error = pixel_error(pixels, np.asarray(quantized.convert(image.mode)))
+        if max_error <= MAX_CHANNEL_ERROR and mean_error <= MEAN_CHANNEL_ERROR:
+            return quantized, max_error, mean_error
+    return None
+
+
+def optimize_png(rgba: np.ndarray, lossy: bool = True) -> OptimizedPNG:
+    """
+    把内存中的 RGBA 像素编码为尽量小的 PNG
+
+    Args:
+        rgba: 形状为 (高, 宽, 4) 的 uint8 数组，如 Agg 渲染器的 buffer_rgba()
+        lossy: 是否允许在容差内的有损调色板量化
+
+    Returns:
+        OptimizedPNG
+    """
+    rgba = np.asarray(rgba)
+    opaque = bool((rgba[..., 3] == 255).all())
+    pixels = np.ascontiguousarray(rgba[..., :3]) if opaque else rgba
+    image = Image.fromarray(pixels, 'RGB' if opaque else 'RGBA')
+
+    candidates = [OptimizedPNG(_encode(image), image.mode, lossless=True)]
+
+    # 统计颜色数：把每个像素打包成一个整数后去重
+    channels = pixels.shape[-1]
+    packed = pixels.reshape(-1, channels).astype(np.uint32) @ (256 ** np.arange(channels, dtype=np.uint32))
+    if len(np.unique(packed)) <= 256:
+        palette = image.quantize(256, method=Image.Quantize.FASTOCTREE if not opaque
+                                 else Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        if pixel_error(pixels, np.asarray(palette.convert(image.mode)))[0] == 0:
+            candidates.append(OptimizedPNG(_encode(palette), 'P', lossless=True))
+    elif lossy:
+        quantized = _quantize(image, pixels)
+        if quantized is not None:
+            palette, max_error, mean_error = quantized
+            candidates.append(OptimizedPNG(_encode(palette), 'P', lossless=False,
+                                           max_error=max_error, mean_error=mean_error))
+
+    best = min(candidates, key=lambda c: len(c.data))
+    best.original_size = len(candidates[0].data)
+    return best
+
+
+# SVG 坐标保留的小数位数：1x 下 1 个单位约 2 个像素，两位小数远小于一个像素
+SVG_PRECISION = 2
+
+_SVG_NS = 'http://www.w3.org/2000/svg'
+_XLINK_NS = 'http://www.w3.org/1999/xlink'
+_HREF = f'{{{_XLINK_NS}}}href'
+_NUMBER = re.compile(r'-?(?:\d+\.?\d*|\.\d+)')
+_PATH_TOKEN = re.compile(r'[MLQCZmlqcz]|-?(?:\d+\.?\d*|\.\d+)')
+_REFERENCE = re.compile(r'url\(#([^)]+)\)')
+_NOOP_ROTATE = re.compile(r'^rotate\(-?0(?: [^)]*)?\)$')
+
+# 复用一个形状时 <use> 自身的大致开销（字节）
+_USE_OVERHEAD = 40
+
+
+@dataclass
+class OptimizedSVG:
+    """优化结果"""
+    data: bytes
+    shapes: int = 0    # 改为 <use> 引用的路径数
+    classes: int = 0   # 合并出的 CSS 类数
+
+
+def _tag(name: str) -> str:
+    return f'{{{_SVG_NS}}}{name}'
+
+
+def _number(value: float, precision: int) -> str:
+    """按精度格式化数字，去掉多余的零：0.50 → .5，-0.00 → 0"""
+    text = f'{value:.{precision}f}'.rstrip('0').rstrip('.') if precision else f'{value:.0f}'
+    if text in ('-0', '', '-'):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def _round_numbers(text: str, precision: int) -> str:
+    return _NUMBER.sub(lambda m: _number(float(m.group(0)), precision), text)
+
+
+def _path_data(tokens) -> str:
+    """把命令与数字拼成最短的路径数据：命令字母两侧和负号前都不需要空格"""
+    parts = []
+    previous = None
+    for token in tokens:
+        if previous is not None and not token.isalpha() and not previous.isalpha() \
+                and not token.startswith('-'):
+            parts.append(' ')
+        parts.append(token)
+        previous = token
+    return ''.join(parts)
+
+
+def _parse_path(d: str, precision: int):
+    """
+    解析 matplotlib 写出的路径数据（只有绝对坐标的 M/L/Q/C/Z）
+
+    Returns:
+        (命令与数值列表, 数值按精度取整后的坐标列表)，有相对命令时返回 None
+    """
+    tokens = _PATH_TOKEN.findall(d)
+    if any(t.islower() and t != 'z' for t in tokens if t.isalpha()):
+        return None
+    values = [round(float(t), precision) for t in tokens if not t.isalpha()]
+    return tokens, values
+
+
+def _format_path(tokens, values, precision: int, origin=(0.0, 0.0)) -> str:
+    """按 tokens 的命令结构、用平移 origin 后的 values 重新生成路径数据"""
+    numbers = iter(values)
+    out = []
+    index = 0
+    for token in tokens:
+        if token.isalpha():
+            out.append(token.upper() if token == 'z' else token)
+            continue
+        value = next(numbers) - origin[index % 2]
+        out.append(_number(round(value, precision), precision))
+        index += 1
+    return _path_data(out)
+
+
+def _referenced_ids(root) -> set:
+    ids = set()
+    for element in root.iter():
+        for name, value in element.attrib.items():
+            if name == _HREF and value.startswith('#'):
+                ids.add(value[1:])
+            ids.update(_REFERENCE.findall(value))
+    return ids
+
+
+def _unwrap_groups(parent):
+    """把没有任何属性的 <g> 换成它的子元素"""
+    for child in list(parent):
+        _unwrap_groups(child)
+    index = 0
+    while index < len(parent):
+        child = parent[index]
+        if child.tag == _tag('g') and not child.attrib:
+            parent.remove(child)
+            for offset, grandchild in enumerate(list(child)):
+                parent.insert(index + offset, grandchild)
+            index += len(child)
+            continue
+        index += 1
+
+
+def _in_defs(element, parents) -> bool:
+    while element is not None:
+        if element.tag in (_tag('defs'), _tag('clipPath'), _tag('marker'), _tag('pattern')):
+            return True
+        element = parents.get(element)
+    return False
+
+
+def _share_shapes(root, defs, parents, precision: int) -> int:
+    """平移后形状相同的路径改为引用 <defs> 中的同一份，返回改写的路径数"""
+    shapes = {}
+    for element in root.iter(_tag('path')):
+        if 'id' in element.attrib or 'transform' in element.attrib or _in_defs(element, parents):
+            continue
+        parsed = _parse_path(element.get('d', ''), precision)
+        if parsed is None or len(parsed[1]) < 2:
+            continue
+        tokens, values = parsed
+        origin = (values[0], values[1])
+        shape = _format_path(tokens, values, precision, origin)
+        shapes.setdefault(shape, []).append((element, origin))
+
+    reused = 0
+    for shape, instances in shapes.items():
+        count = len(instances)
+        # 多出的 <defs> 条目与各处 <use> 的开销超过省下的路径数据时不改写
+        if count < 2 or (count - 1) * len(shape) <= count * _USE_OVERHEAD:
+            continue
+        shape_id = f's{len(defs)}'
+        ET.SubElement(defs, _tag('path'), {'id': shape_id, 'd': shape})
+        for element, (x, y) in instances:
+            attrib = {k: v for k, v in element.attrib.items() if k != 'd'}
+            element.attrib.clear()
+            element.tag = _tag('use')
+            element.set(_HREF, f'#{shape_id}')
+            if x:
+                element.set('x', _number(x, precision))
+            if y:
+                element.set('y', _number(y, precision))
+            element.attrib.update(attrib)
+        reused += count
+    return reused
+
+
+def _hoist_clip_paths(parent):
+    """
+    相邻兄弟元素相同的 clip-path 提到一个公共的 <g> 上
+
+    带 x/y 的 <use> 即使只有一个也单独包一层：SVG 1.1 把 x/y 当作 <use> 自身的平移，
+    写在 <use> 上的 clip-path 会随之偏移。
+    """
+    for child in list(parent):
+        _hoist_clip_paths(child)
+    children = list(parent)
+    runs, start = [], 0
+    for index in range(1, len(children) + 1):
+        if index == len(children) or \
+                children[index].get('clip-path') != children[start].get('clip-path'):
+            if children[start].get('clip-path') and \
+                    (index - start >= 2 or children[start].tag == _tag('use')):
+                runs.append((start, index))
+            start = index
+    for start, end in reversed(runs):
+        group = ET.Element(_tag('g'), {'clip-path': children[start].get('clip-path')})
+        for child in children[start:end]:
+            parent.remove(child)
+            del child.attrib['clip-path']
+            group.append(child)
+        parent.insert(start, group)
+
+
+def _share_styles(root, style, parents) -> int:
+    """重复出现的 style 属性合并为 CSS 类，返回类的个数"""
+    counts = {}
+    for element in root.iter():
+        value = element.get('style')
+        if value and not _in_defs(element, parents):
+            counts[value] = counts.get(value, 0) + 1
+    names = {}
+    for value, count in counts.items():
+        if count >= 2:
+            names[value] = f'c{len(names)}'
+    if not names:
+        return 0
+    for element in root.iter():
+        value = element.get('style')
+        if value in names and not _in_defs(element, parents):
+            del element.attrib['style']
+            element.set('class', names[value])
+    style.text = (style.text or '') + ''.join(
+        f'.{name}{{{value.replace(": ", ":").replace("; ", ";")}}}' for value, name in names.items())
+    return len(names)
+
+
+def optimize_svg(data: bytes, precision: int = SVG_PRECISION) -> OptimizedSVG:
+    """
+    在不改变绘制结果的前提下缩小 matplotlib 写出的 SVG（见模块说明）
+
+    Args:
+        data: savefig(format='svg') 写出的字节
+        precision: 坐标保留的小数位数
+
+    Returns:
+        OptimizedSVG
+    """
+    ET.register_namespace('', _SVG_NS)
+    ET.register_namespace('xlink', _XLINK_NS)
+    root = ET.fromstring(data)
+
+    for metadata in root.findall(_tag('metadata')):
+        root.remove(metadata)
+    referenced = _referenced_ids(root)
+    for element in root.iter():
+        if element.get('id') is not None and element.get('id') not in referenced:
+            del element.attrib['id']
+        transform = element.get('transform')
+        if transform is not None and _NOOP_ROTATE.match(transform):
+            del element.attrib['transform']
+        for name in ('x', 'y', 'transform'):
+            if name in element.attrib:
+                element.set(name, _round_numbers(element.get(name), precision))
+        if 'd' in element.attrib:
+            parsed = _parse_path(element.get('d'), precision)
+            if parsed is not None:
+                element.set('d', _format_path(*parsed, precision))
+        # 元素之间的缩进与换行；<text> 的内容不动
+        if element.text is not None and not element.text.strip():
+            element.text = None
+        if element.tail is not None and not element.tail.strip():
+            element.tail = None
+    _unwrap_groups(root)
+
+    defs = root.find(_tag('defs'))
+    if defs is None:
+        defs = ET.Element(_tag('defs'))
+        root.insert(0, defs)
+    style = defs.find(_tag('style'))
+    if style is None:
+        style = ET.SubElement(defs, _tag('style'), {'type': 'text/css'})
+
+    parents = {child: parent for parent in root.iter() for child in parent}
+    shapes = _share_shapes(root, defs, parents, precision)
+    _hoist_clip_paths(root)
+    parents = {child: parent for parent in root.iter() for child in parent}
+    classes = _share_styles(root, style, parents)
+
+    return OptimizedSVG(ET.tostring(root, encoding='utf-8', xml_declaration=False),
+                        shapes=shapes, classes=classes)
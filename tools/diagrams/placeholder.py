@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+低质量占位图（LQIP）
+
+直接用渲染得到的 RGBA 像素（不从磁盘重新读取 PNG）计算：
+    - BlurHash 字符串（NumPy 向量化实现，算法见 https://blurha.sh）；
+      decode_blurhash() 把它还原成像素，用于检查编码结果
+    - 约 20px 宽的 WebP 缩略图，base64 data URI，可直接内联到页面
+    - 主色（通常就是背景色），图片加载前作为底色
+结果写入 source/_data/images.json，由 scripts/cdn_images.js 内联到 <img> 上。
+"""
+
+import base64
+import io
+
+import numpy as np
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+# BlurHash 分量数（横向 x 纵向），配图多为横向构图
+BLURHASH_COMPONENTS = (4, 3)
+
+# 计算 BlurHash 前先平均池化到不超过这个边长，结果几乎不变但快得多
+BLURHASH_SAMPLE_SIZE = 64
+
+LQIP_WIDTH = 20
+
+
+def _base83(value: int, length: int) -> str:
+    return ''.join(_BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _from_base83(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * 83 + _BASE83.index(char)
+    return value
+
+
+def _srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _downsample(rgb: np.ndarray, limit: int) -> np.ndarray:
+    """按整数倍平均池化，使长边不超过 limit"""
+    height, width = rgb.shape[:2]
+    factor = max(1, -(-max(height, width) // limit))
+    h, w = height // factor, width // factor
+    if factor == 1 or h == 0 or w == 0:
+        return rgb.astype(np.float64)
+    cropped = rgb[:h * factor, :w * factor].astype(np.float64)
+    return cropped.reshape(h, factor, w, factor, -1).mean(axis=(1, 3))
+
+
+def _flatten(rgba: np.ndarray, background=(255, 255, 255)) -> np.ndarray:
+    """把 RGBA 按 alpha 合成到背景色上，返回 RGB（float）"""
+    rgba = np.asarray(rgba)
+    rgb = rgba[..., :3].astype(np.float64)
+    if rgba.shape[-1] == 4:
+        alpha = rgba[..., 3:4] / 255.0
+        rgb = rgb * alpha + np.asarray(background, dtype=np.float64) * (1 - alpha)
+    return rgb
+
+
+def blurhash(rgba: np.ndarray, components=BLURHASH_COMPONENTS) -> str:
+    """
+    计算 BlurHash
+
+    Args:
+        rgba: (高, 宽, 3 或 4) 的 uint8 像素
+        components: (横向分量数, 纵向分量数)，各 1-9
+    """
+    nx, ny = components
+    linear = _srgb_to_linear(_downsample(_flatten(rgba), BLURHASH_SAMPLE_SIZE))
+    height, width = linear.shape[:2]
+
+    # 余弦基：basis_x[i, x] = cos(pi * i * x / width)
+    basis_x = np.cos(np.pi * np.arange(nx)[:, None] * np.arange(width)[None, :] / width)
+    basis_y = np.cos(np.pi * np.arange(ny)[:, None] * np.arange(height)[None, :] / height)
+    factors = np.einsum('jy,yxc,ix->jic', basis_y, linear, basis_x) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+
+    dc = factors[0, 0]
+    ac = factors.reshape(-1, 3)[1:]
+
+    result = _base83((nx - 1) + (ny - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1.0
+    result += _base83(quantised_max, 1)
+
+    r, g, b = (_linear_to_srgb(v) for v in dc)
+    result += _base83((r << 16) + (g << 8) + b, 4)
+
+    scaled = ac / maximum
+    quant = np.clip(np.floor(np.sign(scaled) * np.abs(scaled) ** 0.5 * 9 + 9.5), 0, 18).astype(int)
+    for qr, qg, qb in quant:
+        result += _base83(qr * 19 * 19 + qg * 19 + qb, 2)
+    return result
+
+
+def decode_blurhash(value: str, width: int, height: int) -> np.ndarray:
+    """
+    把 BlurHash 还原为 (高, 宽, 3) 的 uint8 像素
+
+    Raises:
+        ValueError: 字符串长度与分量数不符或含有非法字符
+    """
+    if len(value) < 6 or any(char not in _BASE83 for char in value):
+        raise ValueError(f'无效的 BlurHash: {value!r}')
+    size_flag = _from_base83(value[0])
+    nx, ny = size_flag % 9 + 1, size_flag // 9 + 1
+    if len(value) != 4 + 2 * nx * ny:
+        raise ValueError(f'BlurHash 长度应为 {4 + 2 * nx * ny}，实际为 {len(value)}')
+    maximum = (_from_base83(value[1]) + 1) / 166
+
+    dc = _from_base83(value[2:6])
+    colors = [_srgb_to_linear(np.array([dc >> 16, (dc >> 8) & 255, dc & 255], dtype=np.float64))]
+    for i in range(1, nx * ny):
+        ac = _from_base83(value[4 + 2 * i:6 + 2 * i])
+        quant = (np.array([ac // (19 * 19), ac // 19 % 19, ac % 19]) - 9) / 9
+        colors.append(np.sign(quant) * quant ** 2 * maximum)
+    factors = np.array(colors).reshape(ny, nx, 3)
+
+    basis_x = np.cos(np.pi * np.arange(nx)[:, None] * np.arange(width)[None, :] / width)
+    basis_y = np.cos(np.pi * np.arange(ny)[:, None] * np.arange(height)[None, :] / height)
+    linear = np.clip(np.einsum('jy,jic,ix->yxc', basis_y, factors, basis_x), 0.0, 1.0)
+    srgb = np.where(linear <= 0.0031308, linear * 12.92,
+                    1.055 * linear ** (1 / 2.4) - 0.055)
+    return (srgb * 255 + 0.5).astype(np.uint8)
+
+
+def dominant_color(rgba: np.ndarray) -> str:
+    """出现最多的颜色（每通道量化到 5 位后统计，取该区间内像素的均值），返回 #rrggbb"""
+    rgb = np.clip(_flatten(rgba), 0, 255)
+    bins = rgb.astype(np.uint32) >> 3
+    packed = ((bins[..., 0] << 10) | (bins[..., 1] << 5) | bins[..., 2]).ravel()
+    top = np.bincount(packed, minlength=1 << 15).argmax()
+    r, g, b = (int(v + 0.5) for v in rgb.reshape(-1, 3)[packed == top].mean(axis=0))
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def lqip_data_uri(rgba: np.ndarray, width: int = LQIP_WIDTH) -> str:
+    """缩小到 width 像素宽的 WebP，返回 data URI"""
+    from PIL import Image
+
+    rgb = _downsample(_flatten(rgba), max(width * 4, 1))
+    image = Image.fromarray(np.clip(rgb + 0.5, 0, 255).astype(np.uint8), 'RGB')
+    height = max(1, round(image.height * width / image.width))
+    buf = io.BytesIO()
+    image.resize((width, height), Image.Resampling.BOX).save(buf, format='WEBP', quality=50)
+    return 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def placeholder(rgba: np.ndarray) -> dict:
+    """计算一张图的全部占位信息"""
+    return {
+        'blurhash': blurhash(rgba),
+        'lqip': lqip_data_uri(rgba),
+        'color': dominant_color(rgba),
+    }
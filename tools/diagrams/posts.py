@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章 → 图片 → 脚本的依赖图
+
+扫描 source/_posts 下的文章（以及站点配置 _config*.yml）中的图片引用，把每个引用
+解析到 source/_posts/images 下的文件，再对应到生成它的绘图脚本或描述文件，用于：
+    - 只构建被文章引用的配图，或只构建某一篇文章的配图（写作时快速预览）
+    - 找出没有被任何文章引用的配图脚本和图片文件
+    - 找出指向不存在的文件、也没有脚本生成它的引用
+引用的写法与 scripts/cdn_images.js 的处理一致：images/…、./images/…、/images/…
+都指向 source/_posts/images/ 下的同一个文件，正文、front matter 中的 cover 等字段都算引用。
+"""
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import unquote
+
+from .discover import IMAGES_DIR, REPO_ROOT, discover
+from .export import ANIMATION_VARIANTS, VARIANTS, variant_path
+
+POSTS_DIR = REPO_ROOT / 'source' / '_posts'
+
+# 站点配置中的 default_top_img、avatar 等也会引用文章图片目录下的文件
+SITE_CONFIGS = '_config*.yml'
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg'}
+
+# images/ 前面不能紧跟路径或 URL 的一部分，避免把外链中的 …/images/… 当成本地引用
+IMAGE_REF = re.compile(r'''(?<![\w.%/-])(?:\.?/)?images/([^\s"'()<>\[\]{}?#]+)''')
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    """文章或配置文件中的一处图片引用"""
+    source: Path   # 引用所在的文件
+    line: int      # 行号（从 1 开始）
+    text: str      # 原始写法，如 ./images/cpp/stack_frame.png
+    path: Path     # 解析出的本地文件
+
+    def __str__(self) -> str:
+        try:
+            source = self.source.relative_to(REPO_ROOT)
+        except ValueError:
+            source = self.source
+        return f'{source}:{self.line}  {self.text}'
+
+
+def find_refs(path: Path, images_dir: Path = IMAGES_DIR):
+    """列出文件中的全部本地图片引用"""
+    refs = []
+    text = Path(path).read_text(encoding='utf-8')
+    for number, line in enumerate(text.splitlines(), 1):
+        for match in IMAGE_REF.finditer(line):
+            relative = unquote(match.group(1))
+            if Path(relative).suffix.lower() in IMAGE_SUFFIXES:
+                refs.append(ImageRef(Path(path), number, match.group(0),
+                                     (Path(images_dir) / relative).resolve()))
+    return refs
+
+
+class PostGraph:
+    """
+    文章 → 图片 → 脚本的依赖图
+
+    Attributes:
+        refs: 全部 ImageRef，按文件和行号排列
+        diagrams: images_dir 下的全部 Diagram
+        images_dir: 文章图片目录
+        posts_dir: 文章目录
+    """
+
+    def __init__(self, refs, diagrams, images_dir: Path = IMAGES_DIR, posts_dir: Path = POSTS_DIR):
+        self.refs = list(refs)
+        self.diagrams = list(diagrams)
+        self.images_dir = Path(images_dir).resolve()
+        self.posts_dir = Path(posts_dir)
+        # 配图的每种输出变体都归属于生成它的脚本
+        self._producers = {variant_path(d.output, v).resolve(): d
+                           for d in self.diagrams for v in VARIANTS + ANIMATION_VARIANTS}
+        self._referenced = {ref.path for ref in self.refs}
+
+    @property
+    def posts(self):
+        """有图片引用的文章（不含站点配置）"""
+        return sorted({ref.source for ref in self.refs if ref.source.suffix == '.md'})
+
+    def find_post(self, name: str):
+        """按路径、文件名或去掉 .md 的文件名查找文章，找不到返回 None"""
+        path = Path(name)
+        if path.is_file():
+            return path.resolve()
+        for post in sorted(self.posts_dir.rglob('*.md')):
+            if name in (post.name, post.stem):
+                return post.resolve()
+        return None
+
+    def refs_of(self, post: Path):
+        """某篇文章中的图片引用"""
+        post = Path(post).resolve()
+        return [ref for ref in self.refs if ref.source.resolve() == post]
+
+    def producer(self, path: Path):
+        """生成该图片的 Diagram，静态图片返回 None"""
+        return self._producers.get(Path(path).resolve())
+
+    def diagrams_for(self, posts=None):
+        """
+        被引用的配图
+
+        Args:
+            posts: 只看这些文章；默认为全部文章和站点配置
+
+        Returns:
+            按脚本路径排序、去重后的 Diagram 列表
+        """
+        refs = self.refs if posts is None else [r for p in posts for r in self.refs_of(p)]
+        found = {self.producer(ref.path) for ref in refs}
+        return [d for d in self.diagrams if d in found]
+
+    def orphan_diagrams(self):
+        """任何一种输出都没有被引用的配图"""
+        referenced = set(self.diagrams_for())
+        return [d for d in self.diagrams if d not in referenced]
+
+    def orphan_images(self):
+        """既没有被引用、也不是某个脚本输出的图片文件"""
+        return [path for path in sorted(self.images_dir.rglob('*'))
+                if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file()
+                and path.resolve() not in self._referenced and self.producer(path) is None]
+
+    def broken_refs(self):
+        """指向的文件不存在、也没有脚本会生成它的引用"""
+        return [ref for ref in self.refs
+                if not ref.path.is_file() and self.producer(ref.path) is None]
+
+
+def build_graph(posts_dir: Path = POSTS_DIR, images_dir: Path = IMAGES_DIR, diagrams=None,
+                configs: Path = REPO_ROOT) -> PostGraph:
+    """
+    扫描文章与站点配置，建立依赖图
+
+    Args:
+        posts_dir: 文章目录，递归查找其中的 .md
+        images_dir: 文章图片目录
+        diagrams: 已发现的 Diagram 列表，默认调用 discover(images_dir)
+        configs: 站点配置所在目录，其中的 _config*.yml 也计入引用；为 None 时不扫描
+
+    Raises:
+        SyntaxError: 脚本无法解析
+        SpecError: 描述文件格式错误
+    """
+    sources = sorted(Path(posts_dir).rglob('*.md'))
+    if configs is not None:
+        sources += sorted(Path(configs).glob(SITE_CONFIGS))
+    refs = [ref for source in sources for ref in find_refs(source, images_dir)]
+    if diagrams is None:
+        diagrams = discover(images_dir)
+    return PostGraph(refs, diagrams, images_dir, posts_dir)
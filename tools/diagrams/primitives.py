@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存示意图的共享图元
+
+各脚本过去各自复制一份 draw_node / draw_object / draw_arrow，每个方框、箭头都是
+一个独立的 FancyBboxPatch / FancyArrowPatch。图元一多，绘制和 savefig 的耗时随
+artist 数量线性增长。这里把常用图元（栈槽、堆对象、指针箭头、区域色带、数组单元、
+图例）收集起来，flush 时按样式合并：
+    - 同一 ShapeStyle 的方框合并为一个 PatchCollection
+    - 同一 LinkStyle 的线段合并为一个 LineCollection
+    - 同一 LinkStyle 的箭头合并为一个 PointerCollection（整组箭头是一条复合路径，
+      绘制时在显示坐标中向量化计算，与 FancyArrowPatch 一样不受坐标轴纵横比影响）
+合并不改变绘制顺序：zorder 相同的图形按添加顺序绘制，与逐个添加 artist 时一致。
+只有中间没有插入同一 zorder 的其他图形时，新图形才并入前面同样式的集合，否则另起一个集合，
+因此相互重叠的不同样式方框的上下层次与添加顺序相同。
+绘制耗时取决于这样的分组数量（通常与样式数量相当），而不是图形数量。文字仍是独立的 Text。
+
+用法：
+    with Sketch(ax) as sketch:
+        sketch.region((-0.5, 3.2), (7, 1.8), '栈 (Stack)', STACK_REGION)
+        sketch.stack_slot((0.7, 3.6), (1.6, 0.8), 'parent', SLOT, detail='(shared_ptr)')
+        sketch.pointer((1.5, 3.6), (1.5, 2.1), POINTER)
+    # 退出 with 时调用 flush()，把收集到的图形一次性加入 Axes
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from matplotlib.collections import Collection, LineCollection, PatchCollection
+from matplotlib.lines import Line2D
+from matplotlib.patches import FancyBboxPatch, Patch
+from matplotlib.path import Path
+from matplotlib.transforms import Bbox, IdentityTransform
+
+
+@dataclass(frozen=True)
+class ShapeStyle:
+    """方框样式；相同样式的方框合并为一个集合"""
+    facecolor: str = 'white'
+    edgecolor: str = '#333333'
+    linewidth: float = 1.5
+    linestyle: str = '-'
+    alpha: float = None
+    boxstyle: str = 'round,pad=0.02'   # matplotlib BoxStyle，直角用 'square,pad=0'
+    zorder: float = 1
+
+    def collection_kwargs(self) -> dict:
+        return dict(facecolor=self.facecolor, edgecolor=self.edgecolor,
+                    linewidth=self.linewidth, linestyle=self.linestyle,
+                    alpha=self.alpha, zorder=self.zorder)
+
+
+@dataclass(frozen=True)
+class LinkStyle:
+    """线段与箭头样式；长度单位为点（pt），与 FancyArrowPatch 一致"""
+    color: str = '#333333'
+    linewidth: float = 2
+    linestyle: str = '-'
+    head: str = '->'             # '-'、'->'、'<-' 或 '<->'
+    mutation_scale: float = 15   # 箭头长 0.4 倍、半宽 0.2 倍，同 ArrowStyle('->')
+    shrink: float = 2            # 两端各缩进的距离
+    zorder: float = 2
+
+
+class PointerCollection(Collection):
+    """
+    一组样式相同的箭头（弧线 arc3 + 开放式箭头）
+
+    端点以数据坐标保存，每次绘制前在显示坐标中重新计算整组路径，
+    所以箭头大小以点为单位，不随 dpi 或坐标轴缩放变形。
+    """
+
+    def __init__(self, starts, ends, rads, style: LinkStyle):
+        super().__init__(edgecolors=style.color, facecolors='none',
+                         linewidths=style.linewidth, linestyles=style.linestyle,
+                         zorder=style.zorder, transform=IdentityTransform())
+        self._starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        self._ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        self._rads = np.asarray(rads, dtype=float).reshape(-1, 1)
+        self._style = style
+        self._paths = []
+
+    def set_positions(self, starts, ends):
+        """更新箭头端点（数据坐标），用于逐帧移动箭头"""
+        self._starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        self._ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        self.stale = True
+
+    def _pixels_per_point(self, renderer):
+        if renderer is not None:
+            return renderer.points_to_pixels(1.0)
+        return self.figure.dpi / 72
+
+    def _update_paths(self, renderer):
+        style = self._style
+        scale = self._pixels_per_point(renderer)
+        p0 = self.axes.transData.transform(self._starts)
+        p1 = self.axes.transData.transform(self._ends)
+
+        # arc3：二次贝塞尔曲线，控制点为中点沿法向偏移 rad 倍弦长
+        d = p1 - p0
+        control = (p0 + p1) / 2 + self._rads * np.column_stack([d[:, 1], -d[:, 0]])
+
+        def unit(v):
+            n = np.linalg.norm(v, axis=1, keepdims=True)
+            return np.divide(v, n, out=np.zeros_like(v), where=n > 0)
+
+        t0, t1 = unit(control - p0), unit(p1 - control)
+        shrink = style.shrink * scale
+        p0, p1 = p0 + t0 * shrink, p1 - t1 * shrink
+
+        # 整组箭头拼成一条复合路径：每支箭头是 MOVETO + 两段 CURVE3
+        parts = [np.stack([p0, control, p1], axis=1)]
+        codes = [Path.MOVETO, Path.CURVE3, Path.CURVE3]
+
+        length = 0.4 * style.mutation_scale * scale
+        width = 0.2 * style.mutation_scale * scale
+
+        def head(tip, direction):
+            normal = np.column_stack([-direction[:, 1], direction[:, 0]])
+            base = tip - direction * length
+            return np.stack([base + normal * width, tip, base - normal * width], axis=1)
+
+        if style.head in ('->', '<->'):
+            parts.append(head(p1, t1))
+            codes += [Path.MOVETO, Path.LINETO, Path.LINETO]
+        if style.head in ('<-', '<->'):
+            parts.append(head(p0, -t0))
+            codes += [Path.MOVETO, Path.LINETO, Path.LINETO]
+
+        vertices = np.concatenate(parts, axis=1).reshape(-1, 2)
+        self._paths = [Path(vertices, np.tile(codes, len(p0)))] if len(p0) else []
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        self._update_paths(renderer)
+        super().draw(renderer)
+
+    def get_window_extent(self, renderer=None):
+        self._update_paths(renderer)
+        if not self._paths:
+            return Bbox.null()
+        return Bbox.from_extents(*self._paths[0].vertices.min(axis=0),
+                                 *self._paths[0].vertices.max(axis=0))
+
+
+class Sketch:
+    """
+    在一个 Axes 上收集图元，flush() 时按样式合并为集合加入 Axes
+
+    Args:
+        ax: 目标 Axes
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        # 按绘制顺序排列的分组 [(类型, 样式, 图形列表)]：
+        # 'box' 为 FancyBboxPatch，'line' 为线段顶点，'pointer' 为 (起点, 终点, 弯曲程度)
+        self._runs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # ---------- 基础图形 ----------
+
+    def _add(self, kind: str, style, item):
+        """
+        把图形并入可以合并的分组，保持 zorder 相同的图形之间的添加顺序
+
+        从后往前找同类型、同样式的分组；遇到 zorder 相同的其他分组就停下，
+        并入更早的分组会让新图形画到这个分组下面。
+        """
+        for run_kind, run_style, items in reversed(self._runs):
+            if (run_kind, run_style) == (kind, style):
+                items.append(item)
+                return
+            if run_style.zorder == style.zorder:
+                break
+        self._runs.append((kind, style, [item]))
+
+    def box(self, xy, size, style: ShapeStyle):
+        """左下角为 xy、尺寸为 size=(宽, 高) 的方框"""
+        width, height = size
+        self._add('box', style, FancyBboxPatch(xy, width, height, boxstyle=style.boxstyle))
+
+    def line(self, points, style: LinkStyle):
+        """折线，points 为 [(x, y), ...]"""
+        self._add('line', style, np.asarray(points, dtype=float))
+
+    def pointer(self, start, end, style: LinkStyle, rad: float = 0.0):
+        """从 start 指向 end 的箭头；rad 为弯曲程度（同 connectionstyle='arc3,rad=...'）"""
+        self._add('pointer', style, (start, end, rad))
+
+    # ---------- 内存图元 ----------
+
+    def region(self, xy, size, label, style: ShapeStyle, *, color=None, fontsize=11,
+               label_pos='inside'):
+        """
+        内存区域色带（栈、堆、数据段等）
+
+        Args:
+            label_pos: 'inside' 标签在色带左上角；'right' 标签在色带右侧垂直居中
+        """
+        x, y = xy
+        width, height = size
+        self.box(xy, size, style)
+        color = color or style.edgecolor
+        if label_pos == 'right':
+            self.ax.text(x + width + 0.02, y + height / 2, label, ha='left', va='center',
+                         fontsize=fontsize, color=color, fontweight='bold')
+        else:
+            self.ax.text(x + 0.2, y + height - 0.3, label, ha='left', va='center',
+                         fontsize=fontsize, color=color, fontweight='bold')
+
+    def stack_slot(self, xy, size, name, style: ShapeStyle, *, detail=None, note=None,
+                   color='black', fontsize=11):
+        """
+        栈上的一个槽位（变量、返回地址、保存的寄存器……）
+
+        Args:
+            name: 槽位名，粗体居中
+            detail: 可选，名称下方的小字（如类型）
+            note: 可选，方框右侧的说明文字
+        """
+        x, y = xy
+        width, height = size
+        cx, cy = x + width / 2, y + height / 2
+        self.box(xy, size, style)
+        if detail is None:
+            self.ax.text(cx, cy, name, ha='center', va='center', fontsize=fontsize,
+                         fontweight='bold', color=color)
+        else:
+            self.ax.text(cx, cy + 0.125 * height, name, ha='center', va='center',
+                         fontsize=fontsize, fontweight='bold', color=color)
+            self.ax.text(cx, cy - 0.225 * height, detail, ha='center', va='center',
+                         fontsize=fontsize - 2, color='#666666')
+        if note is not None:
+            self.ax.text(x + width + 0.3, cy, note, ha='left', va='center',
+                         fontsize=9, color='#555555')
+
+    def heap_object(self, xy, size, title, style: ShapeStyle, *, fields=(), title_above=False,
+                    color='black', field_color='#555555', fontsize=11, field_fontsize=9,
+                    monospace=False, field_step=0.5):
+        """
+        堆上（或栈上）的一个对象
+
+        Args:
+            title: 对象名
+            fields: 成员或说明行
+            title_above: 为 True 时对象名在方框上方、成员左对齐逐行排列（结构体布局）；
+                否则对象名与成员都在框内居中
+            monospace: 成员是否使用等宽字体（代码）
+            field_step: title_above 时成员的行距
+        """
+        x, y = xy
+        width, height = size
+        cx, cy = x + width / 2, y + height / 2
+        self.box(xy, size, style)
+        family = 'monospace' if monospace else None
+        if title_above:
+            self.ax.text(cx, y + height + 0.2, title, ha='center', fontsize=fontsize,
+                         fontweight='bold', color=color)
+            for i, field in enumerate(fields):
+                self.ax.text(x + 0.15, y + height - 0.4 - i * field_step, field, ha='left',
+                             fontsize=field_fontsize, family=family, color=field_color)
+        else:
+            self.ax.text(cx, cy + height / 6, title, ha='center', va='center',
+                         fontsize=fontsize, fontweight='bold', color=color)
+            for i, field in enumerate(fields):
+                self.ax.text(cx, cy - 0.2 * height - i * field_step, field, ha='center',
+                             va='center', fontsize=field_fontsize, family=family,
+                             color=field_color)
+
+    def cells(self, xy, values, style: ShapeStyle, divider: LinkStyle, *, cell_width=0.6,
+              height=0.8, label=None, fontsize=10):
+        """
+        一段连续内存（数组），每个元素一格
+
+        Args:
+            values: 各单元显示的值
+            divider: 单元分隔线样式
+            label: 可选，下方的斜体说明
+        """
+        x, y = xy
+        width = len(values) * cell_width
+        self.box(xy, (width, height), style)
+        for i, value in enumerate(values):
+            if i > 0:
+                self.line([(x + i * cell_width, y), (x + i * cell_width, y + height)], divider)
+            self.ax.text(x + (i + 0.5) * cell_width, y + height / 2, str(value),
+                         fontsize=fontsize, ha='center', va='center')
+        if label is not None:
+            self.ax.text(x + width / 2, y - 0.3, label, fontsize=9, ha='center',
+                         style='italic', color='#666666')
+
+    def legend(self, entries, **kwargs):
+        """
+        图例
+
+        Args:
+            entries: [(说明, ShapeStyle 或 LinkStyle), ...]
+            **kwargs: 传给 Axes.legend，默认右上角、无边框、9 号字
+        """
+        handles = []
+        for label, style in entries:
+            if isinstance(style, ShapeStyle):
+                handles.append(Patch(label=label, **style.collection_kwargs()))
+            else:
+                handles.append(Line2D([], [], label=label, color=style.color,
+                                      linewidth=style.linewidth, linestyle=style.linestyle))
+        options = dict(loc='upper right', frameon=False, fontsize=9)
+        options.update(kwargs)
+        return self.ax.legend(handles=handles, **options)
+
+    # ---------- 输出 ----------
+
+    def flush(self):
+        """把已收集的图形按分组合并为集合、按添加顺序加入 Axes，返回新增的 artist 列表"""
+        artists = []
+        for kind, style, items in self._runs:
+            if kind == 'box':
+                artists.append(self.ax.add_collection(
+                    PatchCollection(items, match_original=False, **style.collection_kwargs())))
+            elif kind == 'line':
+                artists.append(self.ax.add_collection(
+                    LineCollection(items, colors=style.color, linewidths=style.linewidth,
+                                   linestyles=style.linestyle, zorder=style.zorder)))
+            else:
+                starts, ends, rads = zip(*items)
+                artists.append(self.ax.add_collection(
+                    PointerCollection(starts, ends, rads, style), autolim=False))
+        self._runs = []
+        return artists
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可复现渲染：相同输入始终得到逐字节相同的输出
+
+matplotlib 默认会在输出中写入易变信息（PNG 的 Software、SVG 的日期和随机 id），
+各脚本还会在导入时修改全局 rcParams，在同一进程内先后渲染时互相影响。这里：
+    - 每张图渲染前恢复 matplotlib 内置默认配置（忽略本机 matplotlibrc），
+      再叠加固定的渲染参数和仓库内置字体（见 fonts.py），渲染结束后还原
+    - 写出时去掉所有易变元数据
+这样未改动的配图重新构建后字节不变，git 与 R2 同步都不会把它当作改动。
+"""
+
+import tempfile
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+
+# 影响输出字节的渲染参数，显式固定下来
+PINNED_RCPARAMS = {
+    'svg.hashsalt': 'tools.diagrams',   # SVG 中 clipPath 等元素 id 的随机盐
+    'svg.fonttype': 'none',             # 文字保留为 <text>，字形子集内嵌为 @font-face
+    'text.hinting': 'force_autohint',
+    'text.hinting_factor': 8,
+    'path.simplify': True,
+    'path.simplify_threshold': 1 / 9,
+}
+
+# 各格式 savefig 的 metadata 参数：None 表示不写入该字段
+SAVE_METADATA = {
+    'png': {'Software': None},
+    'svg': {'Date': None, 'Creator': None},
+}
+
+
+@contextmanager
+def deterministic_rc():
+    """在此上下文中 rcParams 为内置默认值加 PINNED_RCPARAMS 与内置字体，退出后还原"""
+    import matplotlib
+
+    from .fonts import FONT_RCPARAMS, register_fonts
+
+    register_fonts()
+    with matplotlib.rc_context():
+        matplotlib.rcdefaults()
+        matplotlib.rcParams.update(PINNED_RCPARAMS)
+        matplotlib.rcParams.update(FONT_RCPARAMS)
+        yield
+
+
+def _digests(artifacts):
+    return {artifact.path.name: artifact.digest for artifact in artifacts}
+
+
+def check_reproducible(diagrams):
+    """
+    把每张配图渲染两次（第二次倒序，以暴露脚本之间的状态泄漏），比较所有输出的哈希
+
+    Args:
+        diagrams: Diagram 列表
+
+    Returns:
+        不一致的描述列表，为空表示全部可复现
+    """
+    from .build import render_diagram, warm_up
+    warm_up()
+    problems = []
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run, order in enumerate((diagrams, diagrams[::-1])):
+            digests = {}
+            for diagram in order:
+                out_dir = Path(tmp) / str(run) / diagram.script.parent.name
+                out_dir.mkdir(parents=True, exist_ok=True)
+                result = render_diagram(replace(diagram, output=out_dir / diagram.output.name))
+                if not result.ok:
+                    problems.append(f'{diagram.name}: 渲染失败\n{result.error}')
+                    continue
+                digests[diagram] = _digests(result.artifacts)
+            runs.append(digests)
+
+    first, second = runs
+    for diagram in diagrams:
+        if diagram not in first or diagram not in second:
+            continue
+        for name, digest in first[diagram].items():
+            if second[diagram].get(name) != digest:
+                problems.append(f'{diagram.name}: {name} 两次渲染结果不一致')
+    return problems
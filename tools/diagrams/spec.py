@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+声明式配图：用 YAML/JSON 数据文件描述内存示意图
+
+栈帧、内存布局、堆对象与指针这类图，本质上是一组坐标和文字，不必每张都写一个
+脚本。source/_posts/images 下的 <名称>.diagram.yaml（或 .yml、.json）与绘图脚本
+一样会被构建工具发现，由本模块统一渲染：
+    - 解析结果按 (路径, 修改时间, 大小) 缓存，批量构建或监听模式下不重复解析
+    - 同一尺寸的图复用同一个 Figure 与 Agg 画布（FigurePool），不经过 pyplot，
+      渲染完一张图后清空再画下一张；构建进程池中的每个子进程各有一个池，
+      连续渲染几十张同尺寸的图时只创建一次 Figure
+    - 图元全部交给 primitives.Sketch，同样式的方框、线段、箭头合并绘制
+
+格式示例：
+
+    output: stack_frame.png        # 可选，默认为 <名称>.png
+    figsize: [8, 8]
+    shapes:                        # 具名方框样式，字段同 primitives.ShapeStyle
+      slot: {edgecolor: black, linewidth: 1.5}
+    links:                         # 具名线段/箭头样式，字段同 primitives.LinkStyle
+      growth: {color: '#1976D2', mutation_scale: 10}
+    xlim: [0, 10]
+    ylim: [1.5, 9.5]
+    aspect: equal
+    title: 函数调用栈帧结构
+    items:
+      - stack:                     # 自上而下依次排列的栈槽，xy 为第一个槽的左下角
+          xy: [2, 8]
+          size: [4, 0.8]
+          style: slot
+          slots:
+            - {name: param1, note: 函数参数1, fill: '#FFCDD2'}
+            - {name: 返回地址, note: 调用方的下一条指令地址, fill: '#FFF9C4'}
+      - pointer: {from: [1.5, 8], to: [1.5, 2.4], style: growth}
+      - text: {xy: [0.8, 4.8], text: "栈增长\\n方向", fontsize: 9, color: '#1976D2'}
+
+对象图可以不写坐标，交给 graph 图元自动布局（见 layout.py）：栈变量排在上方的栈色带，
+堆对象按指针的可达层次排在下方的堆色带，箭头自动连到节点边框。
+节点与边按样式分组绘制，交叉的边中后出现的样式画在上面：
+
+      - graph:
+          style: node                  # 节点的默认样式，节点可用 style 覆盖
+          stack_region: {label: 栈 (Stack), style: stack_region}
+          heap_region: {label: 堆 (Heap), style: heap_region}
+          nodes:
+            - {name: p, kind: stack, detail: (shared_ptr), style: stack_ptr}
+            - {name: a, title: Parent, fields: [引用计数=1]}
+            - {name: b, title: Child, fields: [引用计数=1]}
+          edges:
+            - {from: p, to: a, style: owning}
+            - {from: a, to: b, style: owning}
+            - {from: b, to: a, style: weak}
+
+多个子图时把 xlim/ylim/aspect/title/items 写进 panels 列表，layout 为 [行数, 列数]
+（默认一行）。图元类型见 ITEM_FIELDS；方框类图元的 style 可以是具名样式或内联映射，
+fill 覆盖样式的填充色。
+"""
+
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+SPEC_SUFFIXES = ('.diagram.yaml', '.diagram.yml', '.diagram.json')
+
+# 图元类型 → (必填字段, 可选字段)；text 之外的图元不接受其他字段
+ITEM_FIELDS = {
+    'box': (('xy', 'size', 'style'), ('fill',)),
+    'region': (('xy', 'size', 'label', 'style'), ('fill', 'color', 'fontsize', 'label_pos')),
+    'slot': (('xy', 'size', 'name', 'style'), ('fill', 'detail', 'note', 'color', 'fontsize')),
+    'stack': (('xy', 'size', 'style', 'slots'), ('color', 'fontsize')),
+    'object': (('xy', 'size', 'title', 'style'),
+               ('fill', 'fields', 'title_above', 'color', 'field_color', 'fontsize',
+                'field_fontsize', 'monospace', 'field_step')),
+    'cells': (('xy', 'values', 'style', 'divider'),
+              ('fill', 'cell_width', 'height', 'label', 'fontsize')),
+    'pointer': (('from', 'to', 'style'), ('rad',)),
+    'line': (('points', 'style'), ()),
+    'text': (('xy', 'text'), None),   # 其余字段原样传给 Axes.text
+    'legend': (('entries',), None),   # 其余字段原样传给 Axes.legend
+    # 自动布局的栈/堆对象图，节点位置与箭头由 layout.py 计算
+    'graph': (('nodes', 'style'),
+              ('edges', 'origin', 'node_size', 'gap', 'max_columns', 'stack_region',
+               'heap_region', 'fontsize', 'field_fontsize')),
+}
+
+STACK_SLOT_FIELDS = ('name', 'detail', 'note', 'fill')
+GRAPH_NODE_FIELDS = ('name', 'kind', 'title', 'detail', 'fields', 'style', 'fill', 'size')
+GRAPH_EDGE_FIELDS = ('from', 'to', 'style', 'rad')
+GRAPH_REGION_FIELDS = ('label', 'style', 'fill', 'color', 'fontsize')
+PANEL_FIELDS = ('xlim', 'ylim', 'aspect', 'title', 'axis', 'items')
+SPEC_FIELDS = ('output', 'figsize', 'layout', 'shapes', 'links', 'panels') + PANEL_FIELDS
+
+# 样式引用字段及其种类
+_SHAPE_REFS = ('style',)
+_LINK_REFS = ('divider',)
+_LINK_ITEMS = ('pointer', 'line')
+
+
+class SpecError(ValueError):
+    """配图描述文件格式错误"""
+
+
+def is_spec(path: Path) -> bool:
+    """path 是否为配图描述文件"""
+    return Path(path).name.endswith(SPEC_SUFFIXES)
+
+
+def spec_name(path: Path) -> str:
+    """描述文件对应的配图名，如 stack_frame.diagram.yaml → stack_frame"""
+    name = Path(path).name
+    for suffix in SPEC_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(path).stem
+
+
+@dataclass(frozen=True)
+class Item:
+    """一个图元：类型与已解析样式的参数"""
+    kind: str
+    fields: dict
+
+
+@dataclass(frozen=True)
+class Panel:
+    """一个子图"""
+    xlim: tuple = None
+    ylim: tuple = None
+    aspect: str = None
+    title: dict = None
+    axis: bool = False
+    items: tuple = ()
+
+
+@dataclass(frozen=True)
+class DiagramSpec:
+    """解析后的配图描述"""
+    source: Path
+    output: str
+    figsize: tuple
+    layout: tuple
+    panels: tuple = field(default=())
+
+
+def read_spec(path: Path):
+    """读取描述文件中的原始数据（不校验、不缓存）"""
+    text = path.read_text(encoding='utf-8')
+    if path.suffix == '.json':
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            raise SpecError(f'{path}: {e}') from None
+    try:
+        import yaml
+    except ImportError:
+        raise SpecError(f'{path}: 读取 YAML 描述文件需要 PyYAML（pip install pyyaml）') from None
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise SpecError(f'{path}: {e}') from None
+
+
+def _check_fields(data, allowed, where):
+    if not isinstance(data, dict):
+        raise SpecError(f'{where}: 应为映射，实际为 {type(data).__name__}')
+    unknown = set(data) - set(allowed)
+    if unknown:
+        raise SpecError(f'{where}: 未知字段 {", ".join(sorted(unknown))}')
+
+
+def _resolve_style(ref, named, where):
+    """样式引用 → 样式字段映射（具名样式或内联映射）"""
+    if isinstance(ref, str):
+        if ref not in named:
+            raise SpecError(f'{where}: 未定义的样式 {ref!r}')
+        return dict(named[ref])
+    if isinstance(ref, dict):
+        return dict(ref)
+    raise SpecError(f'{where}: 样式应为名称或映射')
+
+
+def _parse_item(raw, shapes, links, where) -> Item:
+    if not isinstance(raw, dict) or len(raw) != 1:
+        raise SpecError(f'{where}: 图元应写成只有一个键的映射，如 {{box: {{...}}}}')
+    (kind, fields), = raw.items()
+    if kind not in ITEM_FIELDS:
+        raise SpecError(f'{where}: 未知图元类型 {kind!r}，可用类型: {", ".join(ITEM_FIELDS)}')
+    required, optional = ITEM_FIELDS[kind]
+    where = f'{where}.{kind}'
+    if optional is not None:
+        _check_fields(fields, required + optional, where)
+    elif not isinstance(fields, dict):
+        raise SpecError(f'{where}: 应为映射')
+    missing = [name for name in required if name not in fields]
+    if missing:
+        raise SpecError(f'{where}: 缺少字段 {", ".join(missing)}')
+
+    fields = dict(fields)
+    if kind in _LINK_ITEMS:
+        fields['style'] = _resolve_style(fields['style'], links, where)
+    else:
+        for name in _SHAPE_REFS:
+            if name in fields:
+                fields[name] = _resolve_style(fields[name], shapes, where)
+    for name in _LINK_REFS:
+        if name in fields:
+            fields[name] = _resolve_style(fields[name], links, where)
+    if kind == 'stack':
+        for i, slot in enumerate(fields['slots']):
+            _check_fields(slot, STACK_SLOT_FIELDS, f'{where}.slots[{i}]')
+    if kind == 'graph':
+        _parse_graph(fields, shapes, links, where)
+    if kind == 'legend':
+        entries = []
+        for label, ref in fields['entries']:
+            if not isinstance(ref, str):
+                raise SpecError(f'{where}: 图例条目应引用具名样式')
+            is_link = ref in links
+            entries.append((label, _resolve_style(ref, links if is_link else shapes, where),
+                            is_link))
+        fields['entries'] = entries
+    return Item(kind, fields)
+
+
+def _parse_graph(fields, shapes, links, where):
+    """校验 graph 图元的节点、边与色带，并解析其中的样式引用（原地修改 fields）"""
+    nodes, names = [], set()
+    for i, node in enumerate(fields['nodes']):
+        at = f'{where}.nodes[{i}]'
+        _check_fields(node, GRAPH_NODE_FIELDS, at)
+        if 'name' not in node:
+            raise SpecError(f'{at}: 缺少字段 name')
+        if node['name'] in names:
+            raise SpecError(f'{at}: 节点名 {node["name"]!r} 重复')
+        if node.get('kind', 'heap') not in ('stack', 'heap'):
+            raise SpecError(f'{at}: kind 应为 stack 或 heap')
+        names.add(node['name'])
+        node = dict(node)
+        if 'style' in node:
+            node['style'] = _resolve_style(node['style'], shapes, at)
+        nodes.append(node)
+    fields['nodes'] = nodes
+
+    edges = []
+    for i, edge in enumerate(fields.get('edges') or ()):
+        at = f'{where}.edges[{i}]'
+        _check_fields(edge, GRAPH_EDGE_FIELDS, at)
+        missing = [name for name in ('from', 'to', 'style') if name not in edge]
+        if missing:
+            raise SpecError(f'{at}: 缺少字段 {", ".join(missing)}')
+        unknown = [edge[name] for name in ('from', 'to') if edge[name] not in names]
+        if unknown:
+            raise SpecError(f'{at}: 未定义的节点 {", ".join(map(repr, unknown))}')
+        edges.append({**edge, 'style': _resolve_style(edge['style'], links, at)})
+    fields['edges'] = edges
+
+    for name in ('stack_region', 'heap_region'):
+        if name in fields:
+            at = f'{where}.{name}'
+            _check_fields(fields[name], GRAPH_REGION_FIELDS, at)
+            if 'label' not in fields[name] or 'style' not in fields[name]:
+                raise SpecError(f'{at}: 缺少字段 label 或 style')
+            fields[name] = {**fields[name],
+                            'style': _resolve_style(fields[name]['style'], shapes, at)}
+
+
+def _parse_panel(raw, shapes, links, where, prefix) -> Panel:
+    _check_fields(raw, PANEL_FIELDS, where)
+    title = raw.get('title')
+    if isinstance(title, str):
+        title = {'label': title}
+    items = tuple(_parse_item(item, shapes, links, f'{prefix}items[{i}]')
+                  for i, item in enumerate(raw.get('items') or ()))
+    return Panel(xlim=tuple(raw['xlim']) if 'xlim' in raw else None,
+                 ylim=tuple(raw['ylim']) if 'ylim' in raw else None,
+                 aspect=raw.get('aspect'), title=title, axis=raw.get('axis', False),
+                 items=items)
+
+
+def parse_spec(data, source: Path) -> DiagramSpec:
+    """
+    校验并解析已读入的描述数据
+
+    Args:
+        data: YAML/JSON 解析出的映射
+        source: 描述文件路径，用于错误信息和默认输出名
+
+    Raises:
+        SpecError: 字段缺失、类型未知或样式未定义
+    """
+    where = str(source)
+    _check_fields(data, SPEC_FIELDS, where)
+    shapes = data.get('shapes') or {}
+    links = data.get('links') or {}
+
+    if 'panels' in data:
+        if any(name in data for name in PANEL_FIELDS):
+            raise SpecError(f'{where}: 使用 panels 时，子图字段应写在 panels 列表中')
+        panels = tuple(_parse_panel(p, shapes, links, f'{where}: panels[{i}]',
+                                    f'{where}: panels[{i}].')
+                       for i, p in enumerate(data['panels']))
+    else:
+        panels = (_parse_panel({k: data[k] for k in PANEL_FIELDS if k in data},
+                               shapes, links, where, f'{where}: '),)
+
+    layout = tuple(data.get('layout') or (1, len(panels)))
+    if layout[0] * layout[1] < len(panels):
+        raise SpecError(f'{where}: layout {list(layout)} 放不下 {len(panels)} 个子图')
+    return DiagramSpec(source=Path(source),
+                       output=data.get('output') or f'{spec_name(source)}.png',
+                       figsize=tuple(data.get('figsize') or (8, 6)),
+                       layout=layout, panels=panels)
+
+
+@lru_cache(maxsize=1024)
+def _load(path: Path, mtime_ns: int, size: int) -> DiagramSpec:
+    data = read_spec(path)
+    if data is None:
+        data = {}
+    return parse_spec(data, path)
+
+
+def load_spec(path: Path) -> DiagramSpec:
+    """读取并解析描述文件；文件未变化时直接返回缓存的解析结果"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return _load(path, stat.st_mtime_ns, stat.st_size)
+
+
+class FigurePool:
+    """
+    按尺寸复用 Figure
+
+    Figure 直接绑定 Agg 画布创建，不注册到 pyplot；release() 清空后放回池中，
+    下一张同尺寸的图直接在上面绘制。每个尺寸只保留一个空闲 Figure。
+    """
+
+    def __init__(self):
+        self._free = {}
+        self.created = 0
+
+    def acquire(self, figsize):
+        figsize = tuple(float(v) for v in figsize)
+        fig = self._free.pop(figsize, None)
+        if fig is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            fig._pool_key = figsize
+            self.created += 1
+        return fig
+
+    def release(self, fig):
+        fig.clear()
+        self._free[fig._pool_key] = fig
+
+
+def _shape(style, fill=None):
+    from .primitives import ShapeStyle
+
+    if fill is not None:
+        style = {**style, 'facecolor': fill}
+    return ShapeStyle(**style)
+
+
+def _link(style):
+    from .primitives import LinkStyle
+
+    return LinkStyle(**style)
+
+
+def _draw_graph(sketch, f):
+    """自动布局并绘制 graph 图元：色带、节点、指针"""
+    from .layout import GraphNode, layout_graph
+
+    nodes, edges = f['nodes'], f['edges']
+    options = {name: tuple(f[name]) for name in ('node_size', 'gap', 'origin') if name in f}
+    layout = layout_graph(
+        [GraphNode(n['name'], n.get('kind', 'heap'), tuple(n['size']) if 'size' in n else None)
+         for n in nodes],
+        [(e['from'], e['to']) for e in edges], max_columns=f.get('max_columns'), **options)
+
+    fontsize = f.get('fontsize', 11)
+    for name, (xy, size) in (('stack_region', layout.stack_band),
+                             ('heap_region', layout.heap_band)):
+        if name in f and size[1] > 0:
+            region = dict(f[name])
+            style = _shape(region.pop('style'), region.pop('fill', None))
+            region.setdefault('fontsize', fontsize)
+            sketch.region(xy, size, region.pop('label'), style, **region)
+
+    # Sketch 按添加顺序绘制，不同样式交替添加时每个图形都会单独成为一个集合。
+    # 布局保证节点互不重叠，节点与边都按样式分组添加（组内保持原顺序）；
+    # 交叉的边按样式首次出现的顺序分层，后出现的样式画在上面
+    styles = [_shape(n.get('style', f['style']), n.get('fill')) for n in nodes]
+    for i in _grouped(styles):
+        node, xy, size = nodes[i], layout.xy[i], layout.size[i]
+        title = node.get('title', node['name'])
+        if node.get('kind', 'heap') == 'stack':
+            sketch.stack_slot(tuple(xy), tuple(size), title, styles[i],
+                              detail=node.get('detail'), fontsize=fontsize)
+        else:
+            sketch.heap_object(tuple(xy), tuple(size), title, styles[i],
+                               fields=node.get('fields', ()), fontsize=fontsize,
+                               field_fontsize=f.get('field_fontsize', fontsize - 2))
+
+    links = [_link(e['style']) for e in edges]
+    for i in _grouped(links):
+        sketch.pointer(tuple(layout.starts[i]), tuple(layout.ends[i]), links[i],
+                       rad=edges[i].get('rad', float(layout.rads[i])))
+
+
+def _grouped(styles):
+    """按样式首次出现的顺序分组后的下标，组内保持原顺序"""
+    first = {}
+    for style in styles:
+        first.setdefault(style, len(first))
+    return sorted(range(len(styles)), key=lambda i: first[styles[i]])
+
+
+def _draw_item(sketch, item: Item):
+    f = dict(item.fields)
+    kind = item.kind
+    if kind == 'pointer':
+        sketch.pointer(f['from'], f['to'], _link(f['style']), rad=f.get('rad', 0.0))
+    elif kind == 'line':
+        sketch.line(f['points'], _link(f['style']))
+    elif kind == 'text':
+        x, y = f.pop('xy')
+        sketch.ax.text(x, y, f.pop('text'), **f)
+    elif kind == 'legend':
+        entries = [(label, _link(style) if is_link else _shape(style))
+                   for label, style, is_link in f.pop('entries')]
+        sketch.legend(entries, **f)
+    elif kind == 'graph':
+        _draw_graph(sketch, f)
+    elif kind == 'stack':
+        x, y = f.pop('xy')
+        width, height = f.pop('size')
+        style = f.pop('style')
+        for i, slot in enumerate(f.pop('slots')):
+            slot = dict(slot)
+            sketch.stack_slot((x, y - i * height), (width, height), slot.pop('name'),
+                              _shape(style, slot.pop('fill', None)), **slot, **f)
+    else:
+        style = _shape(f.pop('style'), f.pop('fill', None))
+        xy, rest = f.pop('xy'), f
+        if kind == 'box':
+            sketch.box(xy, rest.pop('size'), style)
+        elif kind == 'region':
+            sketch.region(xy, rest.pop('size'), rest.pop('label'), style, **rest)
+        elif kind == 'slot':
+            sketch.stack_slot(xy, rest.pop('size'), rest.pop('name'), style, **rest)
+        elif kind == 'object':
+            sketch.heap_object(xy, rest.pop('size'), rest.pop('title'), style, **rest)
+        elif kind == 'cells':
+            sketch.cells(xy, rest.pop('values'), style, _link(rest.pop('divider')), **rest)
+
+
+def draw_spec(fig, spec: DiagramSpec):
+    """在 fig 上按描述绘制全部子图（不做 tight_layout）"""
+    from .primitives import Sketch
+
+    rows, cols = spec.layout
+    for index, panel in enumerate(spec.panels, start=1):
+        ax = fig.add_subplot(rows, cols, index)
+        with Sketch(ax) as sketch:
+            for item in panel.items:
+                _draw_item(sketch, item)
+        if panel.xlim:
+            ax.set_xlim(*panel.xlim)
+        if panel.ylim:
+            ax.set_ylim(*panel.ylim)
+        if panel.aspect:
+            ax.set_aspect(panel.aspect)
+        if not panel.axis:
+            ax.axis('off')
+        if panel.title:
+            options = dict(fontsize=12, fontweight='bold', pad=10)
+            options.update(panel.title)
+            ax.set_title(options.pop('label'), **options)
+
+
+class SpecRenderer:
+    """
+    批量渲染描述文件：复用解析缓存与 FigurePool
+
+    Args:
+        pool: Figure 池，默认新建
+    """
+
+    def __init__(self, pool: FigurePool = None):
+        self.pool = pool or FigurePool()
+
+    def render(self, spec: DiagramSpec):
+        """绘制一张图并 tight_layout，返回 Figure；用完后应调用 release()"""
+        fig = self.pool.acquire(spec.figsize)
+        try:
+            draw_spec(fig, spec)
+            fig.tight_layout()
+        except Exception:
+            self.pool.release(fig)
+            raise
+        return fig
+
+    def release(self, fig):
+        self.pool.release(fig)
+
+
+# 每个进程一个渲染器；fork 出的构建子进程各自持有自己的 Figure 池
+_renderer = SpecRenderer()
+
+
+def render_spec(path: Path):
+    """按描述文件绘制配图，返回 Figure（用完后调用 release_figure）"""
+    return _renderer.render(load_spec(path))
+
+
+def release_figure(fig):
+    """把 render_spec() 返回的 Figure 放回池中"""
+    _renderer.release(fig)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+layout_graph() 的布局中节点互不重叠，且都落在各自的色带内
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from tools.diagrams.layout import GraphNode, layout_graph
+
+
+def _overlaps(layout, eps=1e-9):
+    """返回相互重叠的节点对"""
+    x0, y0 = layout.xy[:, 0], layout.xy[:, 1]
+    x1, y1 = x0 + layout.size[:, 0], y0 + layout.size[:, 1]
+    hit = ((x0[:, None] < x1[None, :] - eps) & (x0[None, :] < x1[:, None] - eps) &
+           (y0[:, None] < y1[None, :] - eps) & (y0[None, :] < y1[:, None] - eps))
+    i, j = np.nonzero(np.triu(hit, k=1))
+    return [(layout.names[a], layout.names[b]) for a, b in zip(i, j)]
+
+
+def _inside(layout, mask, band):
+    (bx, by), (bw, bh) = band
+    xy, size = layout.xy[mask], layout.size[mask]
+    return bool(((xy[:, 0] >= bx) & (xy[:, 1] >= by) &
+                 (xy[:, 0] + size[:, 0] <= bx + bw) & (xy[:, 1] + size[:, 1] <= by + bh)).all())
+
+
+def _random_graph(seed, n_stack, n_heap, n_edges):
+    rng = random.Random(seed)
+    nodes = [GraphNode(f's{i}', 'stack') for i in range(n_stack)]
+    nodes += [GraphNode(f'h{i}', 'heap', (rng.choice((1.2, 1.8, 2.6)), rng.choice((0.8, 1.2, 2.0))))
+              for i in range(n_heap)]
+    names = [node.name for node in nodes]
+    edges = [(rng.choice(names), rng.choice(names[n_stack:])) for _ in range(n_edges)]
+    return nodes, edges
+
+
+def _check(nodes, edges, **kwargs):
+    layout = layout_graph(nodes, edges, **kwargs)
+    assert _overlaps(layout) == []
+    stack = np.array([GraphNode(*node).kind == 'stack' if isinstance(node, tuple) else
+                      node.kind == 'stack' for node in nodes])
+    assert _inside(layout, stack, layout.stack_band)
+    assert _inside(layout, ~stack, layout.heap_band)
+    return layout
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_graphs_do_not_overlap(seed):
+    rng = random.Random(seed)
+    _check(*_random_graph(seed, rng.randint(0, 4), rng.randint(1, 60), rng.randint(0, 120)))
+
+
+def test_chain_and_leaked_cycle():
+    # 链表会并成几行，栈变量够不到的环另起一组
+    nodes = [('head', 'stack')] + [(f'n{i}', 'heap') for i in range(12)]
+    nodes += [('a', 'heap'), ('b', 'heap'), ('c', 'heap')]
+    edges = [('head', 'n0')] + [(f'n{i}', f'n{i + 1}') for i in range(11)]
+    edges += [('a', 'b'), ('b', 'c'), ('c', 'a')]
+
+    layout = _check(nodes, edges)
+
+    assert layout.row[layout.names.index('a')] > layout.row[layout.names.index('n0')]
+
+
+def test_large_graph_wraps_rows():
+    nodes = [('root', 'stack')] + [(f'h{i}', 'heap') for i in range(300)]
+    edges = [('root', f'h{i}') for i in range(300)]
+
+    layout = _check(nodes, edges, max_columns=16)
+
+    assert np.bincount(layout.row).max() <= 16
+
+
+@pytest.mark.parametrize('nodes, edges', [
+    ([('a', 'heap'), ('a', 'heap')], []),
+    ([('a', 'queue')], []),
+    ([('a', 'heap')], [('a', 'b')]),
+])
+def test_invalid_graph(nodes, edges):
+    with pytest.raises(ValueError):
+        layout_graph(nodes, edges)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+optimize_png() 的有损量化必须保持在 MAX_CHANNEL_ERROR / MEAN_CHANNEL_ERROR 之内
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tools.diagrams.optimize import MAX_CHANNEL_ERROR, MEAN_CHANNEL_ERROR, optimize_png
+
+
+def _render(facecolor):
+    """用 Agg 画一张典型配图：半透明色块、抗锯齿文字和箭头，颜色远多于 256 种"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.patches import FancyArrowPatch, Rectangle
+
+    fig = Figure(figsize=(4, 3), dpi=100, facecolor=facecolor)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 8)
+    ax.axis('off')
+    colors = ('#1976D2', '#FFCDD2', '#FFF9C4', '#2E7D32', '#7B1FA2', '#F57C00')
+    for i, color in enumerate(colors):
+        ax.add_patch(Rectangle((0.5 + 1.5 * i, 1 + 0.7 * i), 2.2, 2.5, facecolor=color,
+                               edgecolor='black', linewidth=1.5, alpha=0.6))
+        ax.text(1.6 + 1.5 * i, 2.2 + 0.7 * i, f'slot {i}', ha='center', fontsize=9)
+    ax.add_patch(FancyArrowPatch((1, 7.5), (9, 0.5), arrowstyle='->', mutation_scale=15,
+                                 connectionstyle='arc3,rad=0.3', linewidth=2))
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def _decode(data: bytes, mode: str) -> np.ndarray:
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert(mode))
+
+
+def _assert_within_tolerance(rgba, result):
+    opaque = bool((rgba[..., 3] == 255).all())
+    reference = rgba[..., :3] if opaque else rgba
+    decoded = _decode(result.data, 'RGB' if opaque else 'RGBA').astype(np.int16)
+    diff = np.abs(decoded - reference.astype(np.int16))
+
+    assert diff.max() <= MAX_CHANNEL_ERROR
+    assert diff.mean() <= MEAN_CHANNEL_ERROR
+    # 报告的误差与解码后实测一致
+    assert result.max_error == diff.max()
+    assert result.mean_error == pytest.approx(diff.mean())
+
+
+def test_quantized_png_within_tolerance():
+    rgba = _render('white')
+    assert len(np.unique(rgba.reshape(-1, 4), axis=0)) > 256
+
+    result = optimize_png(rgba)
+
+    assert result.mode == 'P' and not result.lossless
+    assert len(result.data) < result.original_size
+    _assert_within_tolerance(rgba, result)
+
+
+def test_transparent_png_within_tolerance():
+    # 带 alpha 时只尝试 FASTOCTREE，超出容差就保留无损的 RGBA
+    rgba = _render('none')
+
+    result = optimize_png(rgba)
+
+    assert result.mode in ('P', 'RGBA')
+    _assert_within_tolerance(rgba, result)
+
+
+def test_lossless_when_lossy_disabled():
+    rgba = _render('white')
+
+    result = optimize_png(rgba, lossy=False)
+
+    assert result.lossless and result.mode == 'RGB'
+    assert np.array_equal(_decode(result.data, 'RGB'), rgba[..., :3])
+
+
+def test_falls_back_to_lossless_outside_tolerance():
+    # 随机噪声无法量化到 256 色而不超出容差
+    rgba = np.random.default_rng(0).integers(0, 256, (64, 64, 4), dtype=np.uint8)
+    rgba[..., 3] = 255
+
+    result = optimize_png(rgba)
+
+    assert result.lossless
+    assert np.array_equal(_decode(result.data, 'RGB'), rgba[..., :3])
+
+
+def test_few_colors_use_lossless_palette():
+    rgba = np.zeros((32, 48, 4), dtype=np.uint8)
+    rgba[..., 3] = 255
+    rgba[:, 16:] = (25, 118, 210, 255)
+    rgba[8:24, 30:40] = (255, 205, 210, 255)
+
+    result = optimize_png(rgba)
+
+    assert result.mode == 'P' and result.lossless
+    assert np.array_equal(_decode(result.data, 'RGB'), rgba[..., :3])
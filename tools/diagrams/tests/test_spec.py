@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配图描述文件的校验：格式错误的 YAML 在解析阶段就以 SpecError 报出
+"""
+
+import textwrap
+
+import pytest
+
+pytest.importorskip('yaml')
+
+from tools.diagrams.discover import IMAGES_DIR
+from tools.diagrams.spec import SpecError, load_spec
+
+VALID = """
+figsize: [6, 4]
+shapes:
+  slot: {edgecolor: black, linewidth: 1.5}
+links:
+  arrow: {color: '#1976D2'}
+xlim: [0, 10]
+ylim: [0, 8]
+items:
+  - box: {xy: [1, 1], size: [2, 1], style: slot}
+  - pointer: {from: [1, 1], to: [4, 4], style: arrow}
+  - graph:
+      style: slot
+      nodes:
+        - {name: p, kind: stack}
+        - {name: a}
+      edges:
+        - {from: p, to: a, style: arrow}
+"""
+
+
+def _write(tmp_path, text, name='case.diagram.yaml'):
+    path = tmp_path / name
+    path.write_text(textwrap.dedent(text), encoding='utf-8')
+    return path
+
+
+def test_valid_spec(tmp_path):
+    spec = load_spec(_write(tmp_path, VALID))
+
+    assert spec.output == 'case.png'
+    assert spec.figsize == (6, 4)
+    assert [item.kind for item in spec.panels[0].items] == ['box', 'pointer', 'graph']
+    assert spec.panels[0].items[0].fields['style'] == {'edgecolor': 'black', 'linewidth': 1.5}
+
+
+def test_repo_specs_parse():
+    paths = sorted(IMAGES_DIR.rglob('*.diagram.yaml'))
+    assert paths
+    for path in paths:
+        load_spec(path)
+
+
+@pytest.mark.parametrize('text, message', [
+    ('items: [\n', None),                                        # YAML 语法错误
+    ('- box\n', '应为映射'),                                      # 顶层不是映射
+    ('colour: red\n', '未知字段 colour'),
+    ('items:\n  - circle: {xy: [0, 0]}\n', '未知图元类型'),
+    ('items:\n  - {box: {}, text: {}}\n', '只有一个键'),
+    ('items:\n  - box: {xy: [0, 0], style: {}}\n', '缺少字段 size'),
+    ('items:\n  - box: {xy: [0, 0], size: [1, 1], style: slot}\n', "未定义的样式 'slot'"),
+    ('items:\n  - box: {xy: [0, 0], size: [1, 1], style: {}, colour: red}\n', '未知字段 colour'),
+    ('items:\n  - pointer: {from: [0, 0], to: [1, 1], style: 3}\n', '样式应为名称或映射'),
+    ('items:\n  - stack: {xy: [0, 0], size: [1, 1], style: {}, slots: [{nmae: a}]}\n',
+     '未知字段 nmae'),
+    ('items:\n  - graph: {style: {}, nodes: [{name: a}, {name: a}]}\n', "节点名 'a' 重复"),
+    ('items:\n  - graph: {style: {}, nodes: [{name: a, kind: queue}]}\n', 'kind 应为 stack 或 heap'),
+    ('items:\n  - graph: {style: {}, nodes: [{name: a}], edges: [{from: a, to: b, style: {}}]}\n',
+     "未定义的节点 'b'"),
+    ('panels: [{items: []}]\nitems: []\n', '使用 panels 时'),
+    ('layout: [1, 1]\npanels: [{}, {}]\n', '放不下 2 个子图'),
+])
+def test_invalid_spec(tmp_path, text, message):
+    path = _write(tmp_path, text)
+    with pytest.raises(SpecError) as error:
+        load_spec(path)
+    assert str(path) in str(error.value)
+    if message:
+        assert message in str(error.value)
+
+
+def test_invalid_json(tmp_path):
+    with pytest.raises(SpecError):
+        load_spec(_write(tmp_path, '{"items": [}', name='case.diagram.json'))
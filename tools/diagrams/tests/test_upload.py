@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+upload.sync() 在 moto 模拟的 S3 上的行为：首次同步、增量同步、失败重试与缓存头
+"""
+
+import gzip
+import json
+
+import pytest
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+from tools.diagrams import upload
+from tools.diagrams.assets import IMMUTABLE_CACHE_CONTROL, ImageManifest, hashed_name
+
+BUCKET = 'images'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket=BUCKET)
+        yield s3
+
+
+@pytest.fixture
+def root(tmp_path):
+    """一张带预压缩 SVG 的配图和一个普通文件"""
+    root = tmp_path / 'images'
+    (root / 'cpp').mkdir(parents=True)
+    (root / 'cpp' / 'a.png').write_bytes(b'\x89PNG a')
+    (root / 'cpp' / 'a.svg.gz').write_bytes(gzip.compress(b'<svg/>', mtime=0))
+    (root / 'cpp' / 'b.png').write_bytes(b'\x89PNG b')
+    return root
+
+
+def _manifest(root, tmp_path):
+    images = ImageManifest(path=tmp_path / 'images.json', root=root)
+    variants = {key: {'file': hashed_name(f'cpp/a{key}', (root / f'cpp/a{key}').read_bytes())}
+                for key in ('.png', '.svg.gz')}
+    images.entries = {'cpp/a.png': {'file': variants['.png']['file'], 'variants': variants}}
+    return images
+
+
+def _sync(client, root, tmp_path, **kwargs):
+    return upload.sync(client, BUCKET, root=root, workers=2,
+                       images=_manifest(root, tmp_path), **kwargs)
+
+
+def _keys(client):
+    response = client.list_objects_v2(Bucket=BUCKET, Prefix=upload.REMOTE_PREFIX)
+    return {obj['Key'] for obj in response.get('Contents', [])}
+
+
+def _remote_files(client):
+    body = client.get_object(Bucket=BUCKET, Key=upload.MANIFEST_KEY)['Body'].read()
+    return json.loads(body)['files']
+
+
+def test_first_run_compares_etags(client, root, tmp_path):
+    client.put_object(Bucket=BUCKET, Key='images/cpp/b.png', Body=b'\x89PNG b')
+    client.put_object(Bucket=BUCKET, Key='images/cpp/stale.png', Body=b'old')
+
+    report = _sync(client, root, tmp_path)
+
+    assert report.errors == []
+    # b.png 的 ETag 与本地 MD5 相同，不再上传；两个哈希别名照常上传
+    assert (report.uploaded, report.unchanged, report.deleted) == (4, 1, 1)
+    assert 'images/cpp/stale.png' not in _keys(client)
+    assert set(_remote_files(client)) == set(upload.local_manifest(
+        root, _manifest(root, tmp_path).aliases()))
+
+
+def test_rerun_is_a_noop(client, root, tmp_path):
+    _sync(client, root, tmp_path)
+    uploads = []
+    report = _sync(client, root, tmp_path, on_progress=lambda *a: uploads.append(a))
+
+    assert report.errors == []
+    assert (report.uploaded, report.deleted, report.unchanged) == (0, 0, 5)
+    assert uploads == []
+
+
+def test_changed_file_is_uploaded(client, root, tmp_path):
+    _sync(client, root, tmp_path)
+    (root / 'cpp' / 'b.png').write_bytes(b'\x89PNG b2')
+
+    report = _sync(client, root, tmp_path)
+
+    assert (report.uploaded, report.deleted) == (1, 0)
+    body = client.get_object(Bucket=BUCKET, Key='images/cpp/b.png')['Body'].read()
+    assert body == b'\x89PNG b2'
+
+
+def test_deleted_file_is_removed(client, root, tmp_path):
+    _sync(client, root, tmp_path)
+    (root / 'cpp' / 'b.png').unlink()
+
+    report = _sync(client, root, tmp_path)
+
+    assert (report.uploaded, report.deleted) == (0, 1)
+    assert 'images/cpp/b.png' not in _keys(client)
+    assert 'cpp/b.png' not in _remote_files(client)
+
+
+def test_failed_upload_keeps_manifest(client, root, tmp_path, monkeypatch):
+    (root / 'cpp' / 'old.png').write_bytes(b'old')
+    _sync(client, root, tmp_path)
+    before = _remote_files(client)
+    (root / 'cpp' / 'old.png').unlink()
+    (root / 'cpp' / 'b.png').write_bytes(b'\x89PNG b2')
+    (root / 'cpp' / 'c.png').write_bytes(b'\x89PNG c')
+
+    upload_file = client.upload_file
+
+    def flaky(filename, bucket, key, **kwargs):
+        if key.endswith('/c.png'):
+            raise OSError('connection reset')
+        return upload_file(filename, bucket, key, **kwargs)
+
+    monkeypatch.setattr(client, 'upload_file', flaky)
+    report = _sync(client, root, tmp_path)
+
+    assert len(report.errors) == 1 and 'cpp/c.png' in report.errors[0]
+    assert report.uploaded == 1
+    # 有上传失败时既不删除，也不写回清单
+    assert report.deleted == 0
+    assert 'images/cpp/old.png' in _keys(client)
+    assert _remote_files(client) == before
+
+    monkeypatch.setattr(client, 'upload_file', upload_file)
+    report = _sync(client, root, tmp_path)
+
+    assert report.errors == []
+    assert (report.uploaded, report.deleted) == (2, 1)
+    assert 'images/cpp/old.png' not in _keys(client)
+    assert 'cpp/c.png' in _remote_files(client)
+
+
+def test_headers(client, root, tmp_path):
+    _sync(client, root, tmp_path)
+    aliases = _manifest(root, tmp_path).aliases()
+    png = next(alias for alias, source in aliases.items() if source == 'cpp/a.png')
+    svgz = next(alias for alias, source in aliases.items() if source == 'cpp/a.svg.gz')
+
+    head = client.head_object(Bucket=BUCKET, Key=upload.REMOTE_PREFIX + png)
+    assert head['CacheControl'] == IMMUTABLE_CACHE_CONTROL
+    assert head['ContentType'] == 'image/png'
+    assert 'ContentEncoding' not in head
+
+    for key in (upload.REMOTE_PREFIX + svgz, 'images/cpp/a.svg.gz'):
+        head = client.head_object(Bucket=BUCKET, Key=key)
+        assert head['ContentType'] == 'image/svg+xml'
+        assert head['ContentEncoding'] == 'gzip'
+    head = client.head_object(Bucket=BUCKET, Key=upload.REMOTE_PREFIX + svgz)
+    assert head['CacheControl'] == IMMUTABLE_CACHE_CONTROL
+
+    # 固定文件名的原文件内容会变，不能带 immutable
+    head = client.head_object(Bucket=BUCKET, Key='images/cpp/a.png')
+    assert head.get('CacheControl') != IMMUTABLE_CACHE_CONTROL
+
+
+def test_stale_image_manifest_uploads_nothing(client, root, tmp_path):
+    images = _manifest(root, tmp_path)
+    (root / 'cpp' / 'a.png').write_bytes(b'\x89PNG a2')
+
+    report = upload.sync(client, BUCKET, root=root, images=images)
+
+    assert report.uploaded == 0
+    assert any('cpp/a.png' in e for e in report.errors)
+    assert _keys(client) == set()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨配图、跨构建共享的文字缓存
+
+同样的标签（'引用计数=1'、'栈 (Stack)'、'shared_ptr'……）在各张配图中反复出现，
+每次构建又要重新测量、排版、光栅化一遍。matplotlib 自带的尺寸缓存只在同一个
+渲染器内有效，每个 Figure、每次 savefig 都从 FreeType 重新开始。这里把文字相关的
+计算结果存进 .cache/diagrams/text.sqlite，同一次构建的各个子进程、watch 会话以及
+之后的构建都能复用：
+    - extent：文字的宽、高、下沉（Agg 光栅化与 SVG 输出各一份）
+    - layout：排版后的字形序列（字体文件、字形编号、偏移）
+    - glyph：单个字形光栅化后的灰度位图。FreeType 按 1/64 像素定位字形，
+      整像素平移不改变位图，所以键中只记录亚像素部分，命中时逐字节等同于重新渲染
+    - woff：SVG 内嵌的字体子集（见 fonts.subset_woff）
+键包含文字、字体文件（含回退字体）的内容哈希、字号、字重、dpi 与 hinting 设置，
+以及 matplotlib、FreeType 版本，任何一项变化都不会命中旧条目。
+总大小超过上限时按最近使用时间淘汰（LRU）。
+
+layout 与 glyph 要替换 RendererAgg.draw_text，照搬的是 matplotlib 3.11 的字形循环并用到
+其私有接口，只在 glyph_cache_supported() 为真时启用；其他版本仍缓存 extent 与 woff，
+文字绘制交给 matplotlib 自己完成。
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from .cache import CACHE_DIR, file_digest
+
+TEXT_CACHE_PATH = CACHE_DIR / 'text.sqlite'
+TEXT_CACHE_VERSION = 1
+MAX_BYTES = 64 * 1024 * 1024
+
+KINDS = ('extent', 'layout', 'glyph', 'woff')
+
+# 替换后的 draw_text 与这些版本的 RendererAgg.draw_text 逐字节一致
+GLYPH_CACHE_VERSIONS = ((3, 11),)
+
+# 内存中的已解码条目超过这个数量时整体清空
+MAX_MEMO = 200_000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+'''
+
+_GLYPH_HEADER = struct.Struct('<iiII')
+_EXTENT = struct.Struct('<3d')
+
+_digests = {}
+
+
+def font_digest(path) -> str:
+    """字体文件内容的 SHA-256（按路径、大小与修改时间记忆）"""
+    stat = os.stat(path)
+    memo = (str(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(memo)
+    if digest is None:
+        digest = _digests[memo] = file_digest(Path(path))
+    return digest
+
+
+def _salt() -> str:
+    """所有键共用的前缀：缓存格式与 matplotlib、FreeType 版本"""
+    import matplotlib
+    from matplotlib import ft2font
+
+    return f'{TEXT_CACHE_VERSION}:{matplotlib.__version__}:{ft2font.__freetype_version__}'
+
+
+@lru_cache(maxsize=None)
+def glyph_cache_supported() -> bool:
+    """当前 matplotlib 是否在 GLYPH_CACHE_VERSIONS 之内，且提供替换 draw_text 所需的全部内部接口"""
+    import matplotlib
+    from matplotlib import ft2font
+    from matplotlib.backends.backend_agg import RendererAgg
+    from matplotlib.text import Text
+
+    match = re.match(r'(\d+)\.(\d+)', matplotlib.__version__)
+    if not match or tuple(map(int, match.groups())) not in GLYPH_CACHE_VERSIONS:
+        return False
+    return (all(hasattr(Text, name) for name in ('get_fontfeatures', 'get_language'))
+            and all(hasattr(ft2font.FT2Font, name)
+                    for name in ('_layout', '_set_transform', '_render_glyph'))
+            and hasattr(ft2font, 'RenderMode')
+            and hasattr(RendererAgg, '_prepare_font'))
+
+
+class TextCache:
+    """
+    文字缓存：内存中保存已解码的条目，新条目与命中记录在 flush() 时批量写入 SQLite
+
+    子进程（fork）首次使用时会重新打开数据库连接，不与父进程共用。
+
+    Args:
+        path: SQLite 文件路径
+        max_bytes: 条目总字节数上限，超出时淘汰最久未使用的条目
+    """
+
+    def __init__(self, path: Path = TEXT_CACHE_PATH, max_bytes: int = MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self.seconds = 0.0   # 在文字测量与绘制中花费的时间（含命中）
+        self._salt = None
+        self._memo = {}
+        self._pending = {}   # {键哈希: (类别, 编码后的值)}
+        self._touched = set()
+        self._known = set()  # 打开数据库时已有的键，不在其中的键不必查询
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        self._inherited = []
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            if self._conn is not None:
+                # 从父进程继承的连接不能在子进程中关闭，只丢弃不用
+                self._inherited.append(self._conn)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(_SCHEMA)
+            self._known = {row[0] for row in self._conn.execute('SELECT key FROM entries')}
+            self._pid = os.getpid()
+        return self._conn
+
+    def _hash(self, key) -> bytes:
+        if self._salt is None:
+            self._salt = _salt()
+        return hashlib.sha256(f'{self._salt}:{key!r}'.encode('utf-8')).digest()[:20]
+
+    def lookup(self, kind: str, key, decode):
+        """
+        查找条目
+
+        Args:
+            kind: 条目类别，见 KINDS
+            key: 由字符串、数字组成的元组
+            decode: 把存储的字节还原为值的函数
+
+        Returns:
+            值，未命中时为 None
+        """
+        memo_key = (kind, key)
+        with self._lock:
+            value = self._memo.get(memo_key)
+            if value is not None:
+                self.hits[kind] += 1
+                return value
+            digest = self._hash(key)
+            conn = self._connection()
+            row = None
+            if digest in self._known:
+                # 其他进程可能已经淘汰了这个条目
+                row = conn.execute('SELECT value FROM entries WHERE key = ?', (digest,)).fetchone()
+            if row is None:
+                self.misses[kind] += 1
+                return None
+            value = decode(row[0])
+            self._remember(memo_key, value)
+            self._touched.add(digest)
+            self.hits[kind] += 1
+            return value
+
+    def store(self, kind: str, key, value, data: bytes):
+        """记录新条目：value 留在内存中，data 为其编码，在 flush() 时写入数据库"""
+        with self._lock:
+            self._remember((kind, key), value)
+            self._pending[self._hash(key)] = (kind, data)
+
+    def _remember(self, memo_key, value):
+        if len(self._memo) >= MAX_MEMO:
+            self._memo.clear()
+        self._memo[memo_key] = value
+
+    def flush(self):
+        """写入新条目、更新命中条目的使用时间，并按 LRU 淘汰超出上限的条目"""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+            conn = self._connection()
+            now = time.time_ns()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO entries (key, kind, value, size, used) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [(digest, kind, data, len(data) + len(digest), now)
+                     for digest, (kind, data) in self._pending.items()])
+                conn.executemany('UPDATE entries SET used = ? WHERE key = ?',
+                                 [(now, digest) for digest in self._touched])
+                self._evict(conn)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            self._known.update(self._pending)
+            self._pending.clear()
+            self._touched.clear()
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰
+        excess = total - self.max_bytes * 9 // 10
+        victims = []
+        for digest, size in conn.execute('SELECT key, size FROM entries ORDER BY used'):
+            victims.append((digest,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+
+    def stats(self) -> dict:
+        """{'hits': {类别: 次数}, 'misses': {类别: 次数}, 'seconds': 秒}"""
+        return {'hits': dict(self.hits), 'misses': dict(self.misses), 'seconds': self.seconds}
+
+    def entries(self) -> dict:
+        """数据库中各类别的 {类别: (条目数, 字节数)}"""
+        self.flush()
+        rows = self._connection().execute(
+            'SELECT kind, COUNT(*), SUM(size) FROM entries GROUP BY kind')
+        return {kind: (count, size) for kind, count, size in rows}
+
+
+def stats_delta(after: dict, before: dict) -> dict:
+    """两次 TextCache.stats() 之差"""
+    return {
+        'hits': {k: n - before['hits'].get(k, 0) for k, n in after['hits'].items()
+                 if n != before['hits'].get(k, 0)},
+        'misses': {k: n - before['misses'].get(k, 0) for k, n in after['misses'].items()
+                   if n != before['misses'].get(k, 0)},
+        'seconds': after['seconds'] - before['seconds'],
+    }
+
+
+def hit_rate(stats: dict) -> float:
+    """stats() 或 stats_delta() 结果的总命中率"""
+    hits, misses = sum(stats['hits'].values()), sum(stats['misses'].values())
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+_shared = None
+_active = None
+
+
+def shared_cache() -> TextCache:
+    """本进程（及 fork 出的子进程）共用的默认缓存"""
+    global _shared
+    if _shared is None:
+        _shared = TextCache()
+    return _shared
+
+
+def active_cache():
+    """当前 text_cache() 上下文使用的缓存，不在上下文中时为 None"""
+    return _active
+
+
+def _font_key(prop):
+    """(字体文件链, 字体文件哈希链, 字重, 字形风格)"""
+    from matplotlib.font_manager import fontManager
+
+    paths = tuple(fontManager._find_fonts_by_props(prop))
+    return (paths, tuple(font_digest(p) for p in paths), prop.get_weight(), prop.get_style())
+
+
+def _rc_key():
+    from matplotlib import rcParams
+
+    return (rcParams['text.hinting'], rcParams['text.hinting_factor'],
+            rcParams['text.kerning_factor'])
+
+
+def _encode_layout(items) -> bytes:
+    return json.dumps(items, separators=(',', ':')).encode('utf-8')
+
+
+def _decode_layout(data: bytes):
+    return [tuple(item) for item in json.loads(data)]
+
+
+def _encode_glyph(left, top, buffer) -> bytes:
+    return _GLYPH_HEADER.pack(left, top, *buffer.shape) + buffer.tobytes()
+
+
+def _decode_glyph(data: bytes):
+    import numpy as np
+
+    left, top, rows, cols = _GLYPH_HEADER.unpack_from(data)
+    # draw_text_image 只接受可写的数组
+    buffer = np.frombuffer(bytearray(data[_GLYPH_HEADER.size:]), np.uint8).reshape(rows, cols)
+    return left, top, buffer
+
+
+def _decode_extent(data: bytes):
+    return _EXTENT.unpack(data)
+
+
+def _cached_extent(cache, kind_key, s, prop, compute):
+    """查找或计算一段文字的 (宽, 高, 下沉)"""
+    _, digests, weight, style = _font_key(prop)
+    key = (*kind_key, s, digests, weight, style, prop.get_size_in_points(), _rc_key())
+    extent = cache.lookup('extent', key, _decode_extent)
+    if extent is None:
+        extent = tuple(compute())
+        cache.store('extent', key, extent, _EXTENT.pack(*extent))
+    return extent
+
+
+def _draw_glyphs(renderer, cache, gc, x, y, angle, size, items):
+    """
+    按 RendererAgg._draw_text_glyphs_and_boxes 的方式逐个合成字形，位图取自缓存
+
+    items 为 (字体文件, 字形编号, x 偏移, y 偏移)。
+    """
+    import math
+
+    import numpy as np
+    from matplotlib.backends.backend_agg import get_hinting_flag
+    from matplotlib.font_manager import get_font
+    from matplotlib.ft2font import RenderMode
+
+    cos = math.cos(math.radians(angle))
+    sin = math.sin(math.radians(angle))
+    matrix = (0x10000 * np.array([[cos, -sin], [sin, cos]])).round().astype(int)
+    load_flags = get_hinting_flag()
+    antialiased = gc.get_antialiased()
+    common = (size, renderer.dpi, tuple(matrix.flat), load_flags, antialiased, _rc_key())
+    height = renderer.height
+    digests = {}
+    for path, glyph_index, dx, dy in items:
+        tx = round(0x40 * (x + dx * cos - dy * sin))
+        ty = round(0x40 * (height - y + dx * sin + dy * cos))   # FreeType 的 y 轴向上
+        if path not in digests:
+            digests[path] = font_digest(path)
+        key = (digests[path], glyph_index, tx % 0x40, ty % 0x40, common)
+        glyph = cache.lookup('glyph', key, _decode_glyph)
+        if glyph is None:
+            font = get_font([path])
+            font.set_size(size, renderer.dpi)
+            font._set_transform(matrix, [tx % 0x40, ty % 0x40])
+            bitmap = font._render_glyph(
+                glyph_index, load_flags, RenderMode.NORMAL if antialiased else RenderMode.MONO)
+            buffer = bitmap.buffer
+            if not antialiased:
+                buffer *= 0xff
+            glyph = (bitmap.left, bitmap.top, buffer)
+            cache.store('glyph', key, glyph, _encode_glyph(*glyph))
+        left, top, buffer = glyph
+        top += ty // 0x40
+        renderer._renderer.draw_text_image(
+            buffer, left + tx // 0x40, int(height) - top + buffer.shape[0], 0, gc)
+
+
+@contextmanager
+def text_cache(cache: TextCache = None):
+    """
+    在此上下文中 Agg 的文字测量与绘制、SVG 的文字测量与字体子集都经过 cache
+
+    数学公式（ismath）和 TeX 文字不缓存，仍由 matplotlib 直接处理；
+    glyph_cache_supported() 为假时 Agg 的文字绘制也不经过缓存。
+    已在另一个 text_cache() 上下文中时直接沿用外层的缓存。
+
+    Args:
+        cache: 使用的缓存，默认为 shared_cache()
+    """
+    global _active
+    if _active is not None:
+        yield _active
+        return
+
+    from matplotlib.backends.backend_agg import RendererAgg, get_hinting_flag
+    from matplotlib.textpath import TextToPath
+
+    cache = cache or shared_cache()
+    agg_extent = RendererAgg.get_text_width_height_descent
+    agg_draw = RendererAgg.draw_text
+    path_extent = TextToPath.get_text_width_height_descent
+
+    def get_text_width_height_descent(self, s, prop, ismath):
+        if ismath:
+            return agg_extent(self, s, prop, ismath)
+        start = time.perf_counter()
+        try:
+            return _cached_extent(cache, ('agg', self.dpi), s, prop,
+                                  lambda: agg_extent(self, s, prop, ismath))
+        finally:
+            cache.seconds += time.perf_counter() - start
+
+    def draw_text(self, gc, x, y, s, prop, angle, ismath=False, mtext=None):
+        if ismath:
+            return agg_draw(self, gc, x, y, s, prop, angle, ismath, mtext)
+        start = time.perf_counter()
+        try:
+            features = mtext.get_fontfeatures() if mtext is not None else None
+            language = mtext.get_language() if mtext is not None else None
+            size = prop.get_size_in_points()
+            _, digests, weight, style = _font_key(prop)
+            key = (s, digests, weight, style, size, self.dpi,
+                   tuple(features) if features is not None else None, language, _rc_key())
+            items = cache.lookup('layout', key, _decode_layout)
+            if items is None:
+                font = self._prepare_font(prop)
+                items = [(item.ft_object.fname, item.glyph_index, item.x, item.y)
+                         for item in font._layout(s, flags=get_hinting_flag(),
+                                                  features=features, language=language)]
+                cache.store('layout', key, items, _encode_layout(items))
+            _draw_glyphs(self, cache, gc, x, y, angle, size, items)
+        finally:
+            cache.seconds += time.perf_counter() - start
+
+    def text_path_extent(self, s, prop, ismath):
+        if ismath:
+            return path_extent(self, s, prop, ismath)
+        start = time.perf_counter()
+        try:
+            # TextToPath 总在固定字号下测量再按比例缩放，键中仍带字号
+            return _cached_extent(cache, ('path',), s, prop,
+                                  lambda: path_extent(self, s, prop, ismath))
+        finally:
+            cache.seconds += time.perf_counter() - start
+
+    RendererAgg.get_text_width_height_descent = get_text_width_height_descent
+    if glyph_cache_supported():
+        RendererAgg.draw_text = draw_text
+    TextToPath.get_text_width_height_descent = text_path_extent
+    _active = cache
+    try:
+        yield cache
+    finally:
+        _active = None
+        RendererAgg.get_text_width_height_descent = agg_extent
+        RendererAgg.draw_text = agg_draw
+        TextToPath.get_text_width_height_descent = path_extent
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浅色/深色主题
+
+配图脚本里的颜色都是按白底写的（'#FFE0B2'、'#E3F2FD'……），在 Butterfly 的深色模式下
+很刺眼。这里不要求脚本准备两套配色，也不重新构建 Figure：几何与文字排版只计算一次，
+写出深色变体前把全部 artist 的颜色就地换成深色版本，光栅化、编码后再换回来。
+深色版本按 HLS 反转明度、保留色相：白色背景变为页面的深色卡片色，黑色文字变为浅灰，
+浅色填充变为同色相的深色，饱和的描边与箭头颜色基本不变。白色文字只出现在饱和的
+色块上，而色块的明度几乎不变，所以接近白色的文字保持原色。个别颜色可在 DARK_COLORS 中
+指定。
+
+深色变体只输出 WebP（见 export.DARK_VARIANTS）：支持 prefers-color-scheme 的浏览器
+都支持 WebP，图片清单中记录 <picture> 所需的 media 与 srcset（见 assets.py）。
+"""
+
+import colorsys
+from contextlib import contextmanager
+from functools import lru_cache
+
+THEMES = ('light', 'dark')
+
+# 各主题的画布背景色：深色与 Butterfly 深色模式的文章卡片背景一致
+FACECOLORS = {'light': 'white', 'dark': '#121212'}
+
+# 不按公式换算、直接指定的深色（小写十六进制）
+DARK_COLORS = {
+    '#ffffff': FACECOLORS['dark'],
+    '#000000': '#e6e6e6',
+}
+
+# 明度高于此值的文字颜色在深色主题中保持不变（见模块说明）
+LIGHT_TEXT = 0.9
+
+# 深色主题下 <picture> 的 media 条件
+DARK_MEDIA = '(prefers-color-scheme: dark)'
+
+
+@lru_cache(maxsize=4096)
+def dark_color(rgba: tuple) -> tuple:
+    """
+    把浅色主题下的一个 RGBA 颜色换算为深色主题下的颜色（alpha 不变）
+
+    明度 l 映射为 0.07 + 0.83 × (1 - l)：白色恰好落在背景色，黑色变为浅灰；
+    换算后很暗的颜色（原本的浅色填充）降低饱和度，避免在深色背景上发艳。
+    """
+    from matplotlib.colors import to_hex, to_rgb
+
+    r, g, b, a = rgba
+    named = DARK_COLORS.get(to_hex((r, g, b)))
+    if named is not None:
+        return (*to_rgb(named), a)
+    h, l, s = colorsys.rgb_to_hls(r, g, b)
+    l = 0.07 + 0.83 * (1 - l)
+    if l < 0.4:
+        s *= 0.7
+    return (*colorsys.hls_to_rgb(h, l, s), a)
+
+
+def _convert(color):
+    """单个颜色或 N×4 颜色数组 → 深色版本"""
+    import numpy as np
+    from matplotlib.colors import to_rgba, to_rgba_array
+
+    if isinstance(color, np.ndarray) and color.ndim == 2:
+        return np.array([dark_color(tuple(c)) for c in to_rgba_array(color)]).reshape(-1, 4)
+    return dark_color(to_rgba(color))
+
+
+def _convert_text(color):
+    """文字颜色 → 深色版本，接近白色的文字不变"""
+    from matplotlib.colors import to_rgba
+
+    rgba = to_rgba(color)
+    if colorsys.rgb_to_hls(*rgba[:3])[1] > LIGHT_TEXT:
+        return rgba
+    return dark_color(rgba)
+
+
+def _color_properties(artist):
+    """artist 上与颜色有关的 (取值函数, 设置函数, 换算函数) 列表"""
+    from matplotlib.collections import Collection
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+    from matplotlib.text import Text
+
+    if isinstance(artist, Text):
+        return [(artist.get_color, artist.set_color, _convert_text)]
+    if isinstance(artist, (Patch, Collection)):
+        return [(artist.get_facecolor, artist.set_facecolor, _convert),
+                (artist.get_edgecolor, artist.set_edgecolor, _convert)]
+    if isinstance(artist, Line2D):
+        return [(artist.get_color, artist.set_color, _convert),
+                (artist.get_markerfacecolor, artist.set_markerfacecolor, _convert),
+                (artist.get_markeredgecolor, artist.set_markeredgecolor, _convert)]
+    return []
+
+
+@contextmanager
+def themed(fig, theme: str = 'light'):
+    """
+    在此上下文中 fig 以 theme 主题的颜色绘制，退出后恢复原来的颜色
+
+    浅色主题即脚本原本的颜色，不做任何改动。
+    """
+    if theme not in THEMES:
+        raise ValueError(f'未知的主题: {theme}')
+    if theme == 'light':
+        yield fig
+        return
+
+    from matplotlib.text import Text
+
+    artists = fig.findobj()
+    # 文字的背景框（ax.text(..., bbox=...)）不在 findobj 的结果中
+    artists += [t.get_bbox_patch() for t in artists
+                if isinstance(t, Text) and t.get_bbox_patch() is not None]
+
+    undo = []
+    try:
+        for artist in artists:
+            for getter, setter, convert in _color_properties(artist):
+                original = getter()
+                if isinstance(original, str) and original in ('none', 'auto'):
+                    continue
+                undo.append((setter, original))
+                setter(convert(original))
+        yield fig
+    finally:
+        for setter, original in reversed(undo):
+            setter(original)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染分阶段计时
+
+构建与基准测试共用的计时钩子：
+    - Timings：按阶段累计耗时，export_figure() 等函数接收它并在各阶段记账
+    - timed_tight_layout()：统计 Figure.tight_layout() 的耗时，包括脚本内部的调用
+阶段名约定：construct（绘制图元）、layout（tight_layout 与边界测量）、
+rasterize（Agg 光栅化）、vector（SVG 等矢量输出的绘制）、encode（各格式编码与优化）、
+placeholder（占位图计算）。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ('construct', 'layout', 'rasterize', 'vector', 'encode', 'placeholder')
+
+
+class Timings(dict):
+    """{阶段: 累计秒数}；多个线程同时计时时各自的耗时都会累加（即各任务耗时之和）"""
+
+    _lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage: str):
+        """把 with 块的耗时累加到 stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self[stage] = self.get(stage, 0.0) + elapsed
+
+    @property
+    def total(self) -> float:
+        return sum(self.values())
+
+
+@contextmanager
+def timed_tight_layout(timings: Timings, stage: str = 'layout'):
+    """在此上下文中每次调用 Figure.tight_layout() 的耗时都累加到 timings[stage]"""
+    from matplotlib.figure import Figure
+
+    original = Figure.tight_layout
+
+    def tight_layout(self, *args, **kwargs):
+        with timings.measure(stage):
+            return original(self, *args, **kwargs)
+
+    Figure.tight_layout = tight_layout
+    try:
+        yield
+    finally:
+        Figure.tight_layout = original
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章图片增量上传到 R2（或任意 S3 兼容存储）
+
+在存储桶中保存一份内容哈希清单（images/.manifest.json），每次只在本地计算
+source/_posts/images 的哈希并与清单比较：
+    - 新增或内容变化的文件才上传
+    - 清单中有、本地已不存在的文件才删除
+不再需要每次列出整个远端前缀。上传使用带连接池和重试的 boto3 客户端并发进行，
+全部成功后才写回清单，中途失败时下次运行会自动补传。
+
+首次运行（远端还没有清单）时会列出一次远端对象，按 ETag（单段上传即 MD5）比较。
+
+source/_data/images.json 中的配图另以内容哈希文件名各上传一份，带长期 immutable 缓存头。
+哈希文件名与本地文件内容不符（改了图却没有重新构建清单）时整次同步直接失败，
+不会把新内容以旧哈希名上传。
+预压缩的 .svg.gz/.svg.br 带对应的 Content-Encoding 上传。
+
+本地可用 moto 或 MinIO 代替 R2 测试，例如：
+    moto_server -p 5000 &
+    python -m tools.diagrams upload --endpoint-url http://127.0.0.1:5000 --bucket test
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .assets import IMMUTABLE_CACHE_CONTROL, ImageManifest
+from .discover import IMAGES_DIR
+
+REMOTE_PREFIX = 'images/'
+MANIFEST_KEY = REMOTE_PREFIX + '.manifest.json'
+MANIFEST_VERSION = 1
+
+# 不上传的本地文件
+EXCLUDE_DIRS = {'__pycache__'}
+EXCLUDE_SUFFIXES = {'.pyc'}
+EXCLUDE_NAMES = {'.DS_Store'}
+
+DEFAULT_WORKERS = 16
+
+
+@dataclass
+class SyncPlan:
+    """本地与远端的差异"""
+    upload: list = field(default_factory=list)   # 需要上传的相对路径
+    delete: list = field(default_factory=list)   # 需要删除的相对路径
+    unchanged: int = 0
+
+
+@dataclass
+class SyncReport:
+    """一次同步的结果"""
+    uploaded: int = 0
+    uploaded_bytes: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _hash_file(path: Path):
+    """返回 (sha256, md5, 字节数)"""
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+            md5.update(chunk)
+            size += len(chunk)
+    return sha256.hexdigest(), md5.hexdigest(), size
+
+
+def local_manifest(root: Path = IMAGES_DIR, aliases: dict = None):
+    """
+    计算本地图片目录的内容清单
+
+    Args:
+        root: 本地图片目录
+        aliases: 额外的远端文件名，{哈希文件名: 本地相对路径}
+
+    Returns:
+        {远端相对路径: {'sha256', 'md5', 'size'}}；别名条目另有 'source' 指向本地文件
+    """
+    root = Path(root)
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDE_DIRS)
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            if name in EXCLUDE_NAMES or path.suffix in EXCLUDE_SUFFIXES:
+                continue
+            sha256, md5, size = _hash_file(path)
+            files[path.relative_to(root).as_posix()] = {'sha256': sha256, 'md5': md5, 'size': size}
+
+    for alias, source in (aliases or {}).items():
+        if source in files:
+            files[alias] = {**files[source], 'source': source}
+    return files
+
+
+def make_client(endpoint_url: str = None, workers: int = DEFAULT_WORKERS):
+    """
+    创建带连接池和重试的 S3 客户端
+
+    Args:
+        endpoint_url: S3 兼容服务地址；为空时根据 R2_ACCOUNT_ID 拼出 R2 地址
+        workers: 并发数，连接池大小与之相同
+    """
+    import boto3
+    from botocore.config import Config
+
+    if endpoint_url is None:
+        endpoint_url = f'https://{os.environ["R2_ACCOUNT_ID"]}.r2.cloudflarestorage.com'
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=os.environ.get('R2_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.environ.get('R2_SECRET_ACCESS_KEY'),
+        region_name='auto',
+        config=Config(max_pool_connections=workers,
+                      retries={'max_attempts': 8, 'mode': 'standard'}),
+    )
+
+
+def remote_manifest(client, bucket: str):
+    """读取远端清单，不存在时返回 None"""
+    try:
+        response = client.get_object(Bucket=bucket, Key=MANIFEST_KEY)
+    except client.exceptions.NoSuchKey:
+        return None
+    data = json.loads(response['Body'].read())
+    if data.get('version') != MANIFEST_VERSION:
+        return None
+    return data['files']
+
+
+def _remote_listing(client, bucket: str):
+    """列出远端全部对象，返回 {相对路径: md5}（仅在没有清单时使用）"""
+    listing = {}
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=REMOTE_PREFIX):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if key != MANIFEST_KEY:
+                listing[key[len(REMOTE_PREFIX):]] = obj['ETag'].strip('"')
+    return listing
+
+
+def plan_sync(local: dict, remote: dict = None, listing: dict = None) -> SyncPlan:
+    """
+    比较本地清单与远端状态，得到需要上传和删除的文件
+
+    Args:
+        local: local_manifest() 的结果
+        remote: 远端清单（{相对路径: {'sha256', ...}}）
+        listing: 没有远端清单时的对象列表（{相对路径: md5}）
+    """
+    plan = SyncPlan()
+    if remote is not None:
+        known = {name: entry['sha256'] for name, entry in remote.items()}
+        current = {name: entry['sha256'] for name, entry in local.items()}
+    else:
+        known = listing or {}
+        current = {name: entry['md5'] for name, entry in local.items()}
+
+    for name, digest in current.items():
+        if known.get(name) == digest:
+            plan.unchanged += 1
+        else:
+            plan.upload.append(name)
+    plan.delete = sorted(set(known) - set(current))
+    return plan
+
+
+def _content_headers(name: str) -> dict:
+    """按扩展名推断 Content-Type；预压缩的 .svg.gz/.svg.br 另带 Content-Encoding"""
+    content_type, encoding = mimetypes.guess_type(name)
+    headers = {'ContentType': content_type or 'application/octet-stream'}
+    if encoding in ('gzip', 'br'):
+        headers['ContentEncoding'] = encoding
+    return headers
+
+
+def sync(client, bucket: str, root: Path = IMAGES_DIR, workers: int = DEFAULT_WORKERS,
+         dry_run: bool = False, on_progress=None, images: ImageManifest = None) -> SyncReport:
+    """
+    把本地图片目录增量同步到存储桶
+
+    Args:
+        client: make_client() 创建的客户端
+        bucket: 存储桶名
+        root: 本地图片目录
+        workers: 并发上传数
+        dry_run: 只计算差异，不实际上传和删除
+        on_progress: 可选回调 on_progress(动作, 相对路径)，动作为 'upload' 或 'delete'
+        images: 图片清单，默认读取 source/_data/images.json
+
+    Returns:
+        SyncReport
+    """
+    root = Path(root)
+    images = images or ImageManifest(root=root)
+    local = local_manifest(root, images.aliases())
+    # 哈希名对应的内容一经上传就被 CDN 长期缓存，清单过期时什么都不上传
+    problems = images.mismatches({name: e['sha256'] for name, e in local.items()
+                                  if 'source' not in e})
+    if problems:
+        return SyncReport(errors=problems + ['请先运行 python -m tools.diagrams build 更新 images.json'])
+    remote = remote_manifest(client, bucket)
+    listing = _remote_listing(client, bucket) if remote is None else None
+    plan = plan_sync(local, remote, listing)
+
+    report = SyncReport(unchanged=plan.unchanged)
+    if dry_run:
+        report.uploaded = len(plan.upload)
+        report.uploaded_bytes = sum(local[name]['size'] for name in plan.upload)
+        report.deleted = len(plan.delete)
+        return report
+
+    def upload(name):
+        entry = local[name]
+        extra = _content_headers(name)
+        if 'source' in entry:
+            extra['CacheControl'] = IMMUTABLE_CACHE_CONTROL
+        client.upload_file(str(root / entry.get('source', name)), bucket, REMOTE_PREFIX + name,
+                           ExtraArgs=extra)
+        return name
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for name, future in [(n, pool.submit(upload, n)) for n in plan.upload]:
+            try:
+                future.result()
+            except Exception as e:
+                report.errors.append(f'上传 {name} 失败: {e}')
+                continue
+            report.uploaded += 1
+            report.uploaded_bytes += local[name]['size']
+            if on_progress:
+                on_progress('upload', name)
+
+    # 上传有失败时不删除也不更新清单，下次运行重新比较
+    if report.errors:
+        return report
+
+    for start in range(0, len(plan.delete), 1000):
+        batch = plan.delete[start:start + 1000]
+        response = client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': REMOTE_PREFIX + name} for name in batch], 'Quiet': True})
+        failed = {e['Key'][len(REMOTE_PREFIX):] for e in response.get('Errors', [])}
+        for name in batch:
+            if name in failed:
+                report.errors.append(f'删除 {name} 失败')
+                continue
+            report.deleted += 1
+            if on_progress:
+                on_progress('delete', name)
+
+    if not report.errors:
+        files = {name: {'sha256': e['sha256'], 'size': e['size']} for name, e in local.items()}
+        client.put_object(Bucket=bucket, Key=MANIFEST_KEY, ContentType='application/json',
+                          Body=json.dumps({'version': MANIFEST_VERSION, 'files': files},
+                                          indent=1, sort_keys=True).encode())
+    return report
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视觉回归检查：把配图渲染结果与基准图逐像素比较
+
+verify 只保证同一环境下两次渲染逐字节一致，却发现不了共享样式（primitives.py）的改动
+或 matplotlib 升级悄悄改变了 stack_frame.png。这里：
+    - 每张配图直接在 Agg 画布上渲染到内存中的 RGB 数组（与 build 的 1x 光栅化相同，
+      不编码、不优化、不写临时文件），分步动画逐帧渲染
+    - 与基准图比较：NumPy 逐像素求各通道最大差值，统计超出容差的像素比例；
+      同时计算感知哈希（32×32 灰度图的 DCT 低频分量）的汉明距离，
+      前者灵敏，后者反映整体版面是否变化
+    - 只有不一致时才写出 基准 | 本次 | 差异热力图 三联图，便于定位
+    - 各张图在 build 的进程池中并行检查
+基准图提交在仓库的 tools/diagrams/golden/ 中，同时记录生成基准时脚本（或描述文件）本身的哈希：
+脚本自身改过的配图，差异视为有意修改；脚本未改而输出变了，才算回归。
+没有基准的配图算作失败，只有 update/accept 才会写入基准，检查本身不会悄悄补上。
+不同机器的字体渲染略有差异，基准应在与 CI 相同的环境中生成（手动运行工作流并勾选
+accept-visual，由 CI 渲染并提交基准）。
+"""
+
+import io
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from .cache import CACHE_DIR, file_digest
+from .discover import IMAGES_DIR, Diagram
+
+GOLDEN_DIR = Path(__file__).parent / 'golden'
+GOLDEN_INDEX = 'golden.json'
+DIFF_DIR = CACHE_DIR / 'visual'
+
+# 单个像素任一通道的差值超过它才算变化，忽略抗锯齿边缘的细微抖动
+PIXEL_TOLERANCE = 8
+# 感知哈希（64 位）允许的最大汉明距离
+MAX_HASH_DISTANCE = 2
+
+# 各状态的显示文字；changed、error 与没有写入基准的 new 算作失败
+STATUS_LABELS = {
+    'same': '一致',
+    'changed': '不一致',
+    'modified': '脚本已修改',
+    'new': '没有基准',
+    'error': '渲染失败',
+}
+
+
+@dataclass
+class VisualResult:
+    """单张配图的视觉比较结果"""
+    name: str
+    status: str
+    seconds: float
+    frames: int = 0
+    changed: float = 0.0      # 超出容差的像素比例（各帧中最大者）
+    max_error: int = 0        # 单通道最大差值
+    distance: int = 0         # 感知哈希的汉明距离（各帧中最大者）
+    detail: str = ''          # 尺寸或帧数不同等说明
+    heatmap: Path = None      # 不一致时写出的三联图
+    error: str = None
+    entry: dict = None        # 本次写入的基准条目，未写入时为 None
+
+    @property
+    def ok(self) -> bool:
+        # 用 update/accept 写入了新基准的差异或缺失不算失败
+        return self.status != 'error' and (self.status not in ('changed', 'new')
+                                           or self.entry is not None)
+
+
+def golden_key(diagram: Diagram) -> str:
+    """基准图在索引中的键：主输出相对于图片目录的路径，如 cpp/stack_frame.png"""
+    return Path(diagram.output).resolve().relative_to(IMAGES_DIR).as_posix()
+
+
+def _rasterize(fig):
+    """按 build 的 1x 参数把 Figure 光栅化，返回 RGB 数组"""
+    from .export import SAVE_KWARGS, _frozen_layout, _measures_once, measure_tight_bbox
+
+    save_kwargs = dict(SAVE_KWARGS)
+    dpi = save_kwargs.pop('dpi')
+    frozen = nullcontext()
+    if _measures_once(fig):
+        save_kwargs['bbox_inches'] = measure_tight_bbox(fig, dpi)
+        frozen = _frozen_layout(fig)
+    with frozen:
+        fig.savefig(io.BytesIO(), format='raw', dpi=dpi, **save_kwargs)
+    return np.asarray(fig.canvas.renderer.buffer_rgba())[..., :3].copy()
+
+
+def render_pixels(diagram: Diagram):
+    """在内存中渲染配图，返回 RGB 数组列表（静态图一帧，动画每帧一个）"""
+    from .animate import render_frames
+    from .build import _build_figure
+    from .reproducible import deterministic_rc
+
+    with deterministic_rc():
+        built, release = _build_figure(diagram)
+        fig = built.fig if diagram.animated else built
+        try:
+            if diagram.animated:
+                return [frame[..., :3] for frame in render_frames(built)]
+            return [_rasterize(fig)]
+        finally:
+            release(fig)
+
+
+def load_golden(path: Path):
+    """读取基准图（动画为 APNG），返回 RGB 数组列表"""
+    from PIL import Image, ImageSequence
+
+    with Image.open(path) as image:
+        return [np.asarray(frame.convert('RGB')) for frame in ImageSequence.Iterator(image)]
+
+
+def save_golden(path: Path, frames):
+    """把帧写为无损 PNG（多帧时为 APNG）；基准要提交到仓库，按最高级别压缩"""
+    from PIL import Image
+
+    images = [Image.fromarray(frame) for frame in frames]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    images[0].save(path, format='PNG', compress_level=9, save_all=len(images) > 1,
+                   append_images=images[1:])
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(size: int):
+    """size 点 DCT-II 的变换矩阵"""
+    k = np.arange(size)[:, None]
+    return np.cos(np.pi * (2 * np.arange(size)[None, :] + 1) * k / (2 * size))
+
+
+def perceptual_hash(rgb) -> int:
+    """
+    64 位感知哈希（pHash）：缩小为 32×32 灰度图，取二维 DCT 左上 8×8 的低频系数，
+    高于中位数的记为 1。对抗锯齿、轻微缩放不敏感，对版面和大块颜色的变化敏感。
+    """
+    from PIL import Image
+
+    gray = Image.fromarray(rgb).convert('L').resize((32, 32), Image.Resampling.BOX)
+    d = _dct_matrix(32)
+    low = (d @ np.asarray(gray, dtype=float) @ d.T)[:8, :8].ravel()
+    # 直流分量不参与中位数，否则整体亮度会主导结果
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hash_distance(a: int, b: int) -> int:
+    """两个感知哈希的汉明距离"""
+    return bin(a ^ b).count('1')
+
+
+def _pad(rgb, shape):
+    """右侧和下方用白色补齐到 shape"""
+    out = np.full(shape + (3,), 255, dtype=np.uint8)
+    out[:rgb.shape[0], :rgb.shape[1]] = rgb
+    return out
+
+
+def pixel_diff(golden, actual):
+    """
+    逐像素比较两帧，尺寸不同时以左上角对齐、补白后比较
+
+    Returns:
+        (差值图, 超出容差的像素比例)：差值图为各像素各通道差值的最大者（uint8）
+    """
+    if golden.shape != actual.shape:
+        shape = (max(golden.shape[0], actual.shape[0]), max(golden.shape[1], actual.shape[1]))
+        golden, actual = _pad(golden, shape), _pad(actual, shape)
+    diff = (np.maximum(golden, actual) - np.minimum(golden, actual)).max(axis=2)
+    return diff, float(np.count_nonzero(diff > PIXEL_TOLERANCE)) / diff.size
+
+
+def heatmap(golden, actual, diff):
+    """基准 | 本次 | 差异热力图 三联图：热力图以淡化的基准为底，差异越大越红"""
+    shape = diff.shape
+    golden, actual = _pad(golden, shape), _pad(actual, shape)
+    gray = golden.mean(axis=2, keepdims=True)
+    base = 255 - (255 - gray) * 0.3
+    alpha = np.clip(diff[..., None] / 64, 0, 1)
+    heat = (base * (1 - alpha) + np.array([220, 0, 0]) * alpha).astype(np.uint8)
+    gap = np.full((shape[0], 8, 3), 128, dtype=np.uint8)
+    return np.hstack([golden, gap, actual, gap, heat])
+
+
+def check_diagram(diagram: Diagram, entry=None, golden_dir: Path = GOLDEN_DIR,
+                  diff_dir: Path = DIFF_DIR, update: bool = False, accept: bool = False,
+                  tolerance: float = 0.0) -> VisualResult:
+    """
+    渲染一张配图并与基准比较
+
+    Args:
+        diagram: 要检查的配图
+        entry: 基准索引中该图的条目，没有基准时为 None
+        golden_dir: 基准目录
+        diff_dir: 三联图的输出目录
+        update: 没有基准或脚本已修改时写入新的基准
+        accept: 不论比较结果如何都把本次渲染写为基准（确认改动符合预期后使用）
+        tolerance: 允许超出像素容差的像素比例
+
+    Returns:
+        VisualResult
+    """
+    from PIL import Image
+
+    key = golden_key(diagram)
+    golden_path = Path(golden_dir) / key
+    heatmap_path = Path(diff_dir) / Path(key).with_suffix('.diff.png')
+    start = time.perf_counter()
+    try:
+        frames = render_pixels(diagram)
+        digest = file_digest(diagram.script)
+        result = VisualResult(key, 'same', 0.0, frames=len(frames))
+
+        golden = load_golden(golden_path) if entry and golden_path.is_file() else None
+        if golden is None:
+            result.status = 'new'
+        else:
+            worst = None
+            if len(golden) != len(frames):
+                result.detail = f'帧数 {len(golden)} → {len(frames)}'
+            for i, (expected, actual) in enumerate(zip(golden, frames)):
+                diff, changed = pixel_diff(expected, actual)
+                distance = hash_distance(int(entry['hashes'][i], 16), perceptual_hash(actual))
+                result.max_error = max(result.max_error, int(diff.max(initial=0)))
+                result.distance = max(result.distance, distance)
+                if expected.shape != actual.shape and not result.detail:
+                    result.detail = (f'尺寸 {expected.shape[1]}×{expected.shape[0]} → '
+                                     f'{actual.shape[1]}×{actual.shape[0]}')
+                if worst is None or changed > result.changed:
+                    result.changed = changed
+                    worst = (i, expected, actual, diff)
+
+            differs = (result.detail or result.changed > tolerance
+                       or result.distance > MAX_HASH_DISTANCE)
+            if differs:
+                result.status = 'modified' if entry['script'] != digest else 'changed'
+                i, expected, actual, diff = worst
+                heatmap_path.parent.mkdir(parents=True, exist_ok=True)
+                Image.fromarray(heatmap(expected, actual, diff)).save(heatmap_path,
+                                                                      compress_level=1)
+                result.heatmap = heatmap_path
+                if len(frames) > 1:
+                    result.detail = '; '.join(filter(None, [result.detail, f'差异最大的是第 {i} 帧']))
+            else:
+                heatmap_path.unlink(missing_ok=True)
+
+        # 脚本改过但输出没变时也要更新记录的脚本哈希，否则之后的回归会被误认为有意修改
+        if accept or (update and (result.status in ('new', 'modified')
+                                  or entry['script'] != digest)):
+            save_golden(golden_path, frames)
+            result.entry = {'script': digest,
+                            'hashes': [f'{perceptual_hash(frame):016x}' for frame in frames]}
+    except Exception:
+        return VisualResult(key, 'error', time.perf_counter() - start,
+                            error=traceback.format_exc())
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def load_index(golden_dir: Path = GOLDEN_DIR) -> dict:
+    """读取基准索引 {键: {script, hashes}}"""
+    path = Path(golden_dir) / GOLDEN_INDEX
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def check_visual(diagrams, golden_dir: Path = GOLDEN_DIR, diff_dir: Path = DIFF_DIR,
+                 jobs: int = None, update: bool = False, accept: bool = False,
+                 tolerance: float = 0.0, on_result=None):
+    """
+    并行检查多张配图，写入的基准条目合并进索引
+
+    Args:
+        diagrams: Diagram 列表
+        golden_dir, diff_dir, update, accept, tolerance: 同 check_diagram
+        jobs: 进程数，默认为 CPU 核数；为 1 时在当前进程中串行检查
+        on_result: 可选回调，每完成一张图调用一次 on_result(VisualResult)
+
+    Returns:
+        与 diagrams 顺序一致的 VisualResult 列表
+    """
+    from .build import _pool_context, warm_up
+
+    diagrams = list(diagrams)
+    index = load_index(golden_dir)
+    jobs = min(jobs or os.cpu_count() or 1, max(len(diagrams), 1))
+    options = dict(golden_dir=golden_dir, diff_dir=diff_dir, update=update, accept=accept,
+                   tolerance=tolerance)
+    warm_up()
+
+    results = {}
+    if jobs == 1:
+        for diagram in diagrams:
+            results[diagram] = check_diagram(diagram, index.get(golden_key(diagram)), **options)
+            if on_result:
+                on_result(results[diagram])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=_pool_context(),
+                                 initializer=warm_up) as pool:
+            futures = {pool.submit(check_diagram, d, index.get(golden_key(d)), **options): d
+                       for d in diagrams}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if on_result:
+                    on_result(results[futures[future]])
+
+    written = {r.name: r.entry for r in results.values() if r.entry}
+    if written:
+        index.update(written)
+        path = Path(golden_dir) / GOLDEN_INDEX
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(index, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+    return [results[d] for d in diagrams]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监听模式：常驻进程保持 matplotlib 已加载，脚本保存后只重新渲染受影响的配图
+
+轮询 source/_posts/images 下的 .py 文件、配图描述文件以及它们依赖的仓库内共享模块，
+文件变化后在当前进程内重新执行对应脚本，只以草稿模式覆盖其 1x PNG（不做优化、
+不输出其余格式，保存后不到一秒即可看到新图）。本地预览时 scripts/cdn_images.js 的
+/images/ 中间件直接读取该文件，刷新浏览器即可看到新图。
+
+草稿 PNG 不是完整的构建结果：构建缓存与 images.json 都不更新，下次 build 时
+这些配图的 PNG 与记录的哈希不符，会被完整地重新输出。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from .build import render_diagram, warm_up
+from .cache import helper_files
+from .discover import IMAGES_DIR, discover, sources
+from .export import Variant
+from .spec import SpecError
+
+
+# 监听模式只输出浏览器预览用的 1x PNG
+WATCH_VARIANTS = (Variant('png'),)
+
+
+def _stat_key(path: Path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _forget_modules(paths):
+    """从 sys.modules 中移除已修改的共享模块，下次导入时重新执行"""
+    paths = {Path(p).resolve() for p in paths}
+    for name, module in list(sys.modules.items()):
+        file = getattr(module, '__file__', None)
+        if file and Path(file).resolve() in paths:
+            del sys.modules[name]
+
+
+class Watcher:
+    """
+    监听配图脚本并增量重新渲染
+
+    Args:
+        root: 监听的根目录，默认为 source/_posts/images
+        interval: 轮询间隔（秒）
+        on_result: 每渲染完一张图调用一次 on_result(BuildResult)
+        on_error: 脚本暂时无法解析（如保存了一半的语法错误）时调用 on_error(str)
+    """
+
+    def __init__(self, root: Path = IMAGES_DIR, interval: float = 0.2,
+                 on_result=None, on_error=None):
+        self.root = Path(root)
+        self.interval = interval
+        self.on_result = on_result
+        self.on_error = on_error
+        self.diagrams = []
+        self.deps = {}
+        self.snapshot = {}
+
+    def _refresh(self):
+        """重新发现配图并解析依赖，返回是否成功"""
+        try:
+            self.diagrams = discover(self.root)
+            self.deps = {d: {d.script.resolve(), *helper_files(d.script)} for d in self.diagrams}
+        except SyntaxError as e:
+            if self.on_error:
+                self.on_error(f'{e.filename}:{e.lineno}: {e.msg}')
+            return False
+        except SpecError as e:
+            # 描述文件格式错误，如保存了一半的 YAML
+            if self.on_error:
+                self.on_error(str(e))
+            return False
+        return True
+
+    def _watched_files(self):
+        files = {p.resolve() for p in sources(self.root)}
+        for deps in self.deps.values():
+            files.update(deps)
+        return files
+
+    def _scan(self):
+        return {p: _stat_key(p) for p in self._watched_files()}
+
+    def start(self):
+        """预热 matplotlib 并记录初始文件状态"""
+        warm_up()
+        self._refresh()
+        self.snapshot = self._scan()
+
+    def poll(self):
+        """检查一次文件变化，重新渲染受影响的配图，返回本次的 BuildResult 列表"""
+        current = self._scan()
+        changed = {p for p, key in current.items() if self.snapshot.get(p) != key}
+        self.snapshot = current
+        if not changed:
+            return []
+
+        _forget_modules(changed)
+        if not self._refresh():
+            return []
+        # 新增的共享模块也需要纳入监听
+        self.snapshot = self._scan()
+
+        results = []
+        for diagram in self.diagrams:
+            if not self.deps[diagram] & changed:
+                continue
+            # 只输出预览用的草稿 PNG，完整的多格式输出留给 build
+            result = render_diagram(diagram, variants=WATCH_VARIANTS, draft=True)
+            if self.on_result:
+                self.on_result(result)
+            results.append(result)
+        return results
+
+    def run(self):
+        """持续轮询，直到 KeyboardInterrupt（未调用过 start() 时会先调用）"""
+        if not self.snapshot:
+            self.start()
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt:
+            pass